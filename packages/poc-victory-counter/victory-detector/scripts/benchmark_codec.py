@@ -0,0 +1,99 @@
+"""イベントログ JSON コーデックのマイクロベンチマーク。
+
+従来の標準 json 経由の経路（`json.dumps(event.to_dict())` / `Event.from_dict(json.loads(line))`）と、
+`victory_detector.core.codec` で利用可能な各バックエンドでのエンコード／デコード時間を比較する。
+
+利用方法:
+    uv run python scripts/benchmark_codec.py --events 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable
+
+from victory_detector.core import codec, state
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark event JSON codecs.")
+    parser.add_argument("--events", type=int, default=100_000, help="ベンチマークに使うイベント数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数（最小値を採用）")
+    return parser.parse_args()
+
+
+def _make_events(count: int) -> list[state.Event]:
+    events: list[state.Event] = []
+    for i in range(count):
+        if i % 10 == 9:
+            events.append(
+                state.Event(
+                    type="adjustment",
+                    value="defeat",
+                    delta=1,
+                    timestamp="2025-01-01T12:34:56.123456+00:00",
+                    note="manual fix",
+                )
+            )
+        else:
+            events.append(
+                state.Event(
+                    type="result",
+                    value="victory" if i % 2 else "defeat",
+                    delta=1 if i % 3 else 0,
+                    timestamp="2025-01-01T12:34:56.123456+00:00",
+                    confidence=0.9876,
+                )
+            )
+    return events
+
+
+def _best_of(repeat: int, func: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    args = parse_args()
+    events = _make_events(args.events)
+    legacy_lines = [json.dumps(event.to_dict(), ensure_ascii=False) for event in events]
+    lines = state.encode_events(events).splitlines()
+
+    rows: list[tuple[str, float, float]] = []
+    rows.append(
+        (
+            "legacy (json + to_dict/from_dict)",
+            _best_of(args.repeat, lambda: [json.dumps(e.to_dict(), ensure_ascii=False) for e in events]),
+            _best_of(args.repeat, lambda: [state.Event.from_dict(json.loads(line)) for line in legacy_lines]),
+        )
+    )
+
+    original = codec.backend()
+    try:
+        for name in codec.available_backends():
+            codec.set_backend(name)
+            rows.append(
+                (
+                    f"codec[{name}] (encode_events/decode_event)",
+                    _best_of(args.repeat, lambda: state.encode_events(events)),
+                    _best_of(args.repeat, lambda: [state.decode_event(line) for line in lines]),
+                )
+            )
+    finally:
+        codec.set_backend(original)
+
+    print(f"[INFO] events={args.events} repeat={args.repeat} default_backend={codec.backend()}")
+    print(f"{'path':<45} {'encode (ms)':>12} {'decode (ms)':>12} {'decode µs/event':>16}")
+    for name, encode_s, decode_s in rows:
+        print(f"{name:<45} {encode_s * 1e3:>12.1f} {decode_s * 1e3:>12.1f} {decode_s * 1e6 / max(1, args.events):>16.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,8 +4,11 @@
 label ごとに画像を配置するだけで処理できる。
 
 `--crop x,y,width,height` を指定すると、共通の矩形でクロップできる。
-値はピクセル、または 0〜1 の比率指定。未指定時は推奨クロップ領域
-460,378,995,550 が使用される。
+値は 1920x1080 基準のピクセル、または 0〜1 の比率指定。未指定時は推奨クロップ領域
+460,378,995,550 が使用される。領域は VictoryPredictor と同じく
+`victory_detector.core.geometry` で画像サイズに合わせて変換される。
+`--absolute-pixels` を指定すると、以前と同じくピクセル値を各画像の絶対座標として扱う
+（1080p 以外のサンプルでは推論時のクロップと一致しなくなる）。
 
 出力は `dataset/<label>/` の構造で保存される。
 """
@@ -17,6 +20,13 @@ from pathlib import Path
 
 import cv2  # type: ignore
 
+from victory_detector.core.geometry import (
+    DEFAULT_CROP,
+    FrameGeometry,
+    Region,
+    RegionLike,
+)
+
 DATASET_ROOT = Path("dataset")
 SAMPLES_ROOT = Path("data/samples")
 
@@ -33,43 +43,50 @@ def parse_args() -> argparse.Namespace:
         help="クロップ矩形を 'x,y,width,height' 形式で指定 (値はピクセルまたは 0〜1 の比率)",
     )
     parser.add_argument("--mask", nargs='?', const='0,534,1920,295', default=None, help="マスク領域 (x,y,width,height)。値を省略した場合はデフォルト: 0,534,1920,295")
+    parser.add_argument(
+        "--absolute-pixels",
+        action="store_true",
+        help="--crop / --mask のピクセル値を 1920x1080 基準ではなく各画像の絶対座標として扱う（以前の動作）",
+    )
     return parser.parse_args()
 
 
+def _parse_region(text: str) -> tuple[float, ...]:
+    """``'x,y,width,height'`` を値のまま読む（解釈は画像ごとの基準解像度で行う）。"""
+
+    Region.parse(text)  # 形式の検証
+    return tuple(float(part.strip()) for part in text.split(","))
+
+
 def main() -> int:
     args = parse_args()
     if not args.samples.is_dir():
         print(f"[ERROR] サンプルディレクトリが見つかりません: {args.samples}")
         return 1
 
-    crop_rect = None
+    crop_rect: RegionLike = DEFAULT_CROP
     if args.crop:
         try:
-            crop_rect = tuple(float(part.strip()) for part in args.crop.split(","))
-            if len(crop_rect) != 4:
-                raise ValueError
+            crop_rect = _parse_region(args.crop)
         except ValueError as exc:
             print("[ERROR] --crop は 'x,y,width,height' 形式で指定してください。", exc)
             return 1
 
     # マスク領域のパース
-    mask_regions = None
+    mask_regions: list[RegionLike] | None = None
     if args.mask is not None:
-        mask_regions = []
-        mask_str = args.mask
         try:
-            parts = mask_str.split(",")
-            if len(parts) != 4:
-                print(f"[ERROR] マスク領域の形式が不正です: {mask_str}")
-                return 1
-            x, y, w, h = map(int, parts)
-            mask_regions.append((x, y, w, h))
+            mask_regions = [_parse_region(args.mask)]
         except ValueError:
-            print(f"[ERROR] マスク領域の形式が不正です: {mask_str}")
+            print(f"[ERROR] マスク領域の形式が不正です: {args.mask}")
             return 1
     print(f"[INFO] Mask regions: {mask_regions if mask_regions else 'disabled'}")
 
-    _process_structured_samples(args.samples, args.output, args.size, crop_rect, mask_regions)
+    if args.absolute_pixels:
+        print("[INFO] ピクセル値を各画像の絶対座標として扱います（--absolute-pixels）")
+    _process_structured_samples(
+        args.samples, args.output, args.size, crop_rect, mask_regions, args.absolute_pixels
+    )
     return 0
 
 
@@ -77,9 +94,13 @@ def _process_structured_samples(
     samples_root: Path,
     output_root: Path,
     size: int | None,
-    crop_rect: tuple[float, float, float, float] | None,
-    mask_regions: list[tuple[int, int, int, int]] | None = None,
+    crop: RegionLike,
+    masks: list[RegionLike] | None,
+    absolute_pixels: bool = False,
 ) -> None:
+    geometry = FrameGeometry.create(crop, masks)
+    # --absolute-pixels では画像の解像度を基準解像度にする（解像度ごとに作る）
+    by_size: dict[tuple[int, int], FrameGeometry] = {}
     for label_dir in sorted(samples_root.iterdir()):
         if not label_dir.is_dir():
             continue
@@ -88,30 +109,22 @@ def _process_structured_samples(
             image = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
             if image is None:
                 continue
-            height, width = image.shape[:2]
-            if crop_rect:
-                cx, cy, cw, ch = crop_rect
-                x = int(round(cx * width)) if abs(cx) <= 1 else int(round(cx))
-                y = int(round(cy * height)) if abs(cy) <= 1 else int(round(cy))
-                w = int(round(cw * width)) if abs(cw) <= 1 else int(round(cw))
-                h = int(round(ch * height)) if abs(ch) <= 1 else int(round(ch))
+            if absolute_pixels:
+                reference = (image.shape[1], image.shape[0])
+                if reference not in by_size:
+                    by_size[reference] = FrameGeometry.create(crop, masks, reference)
+                resolved = by_size[reference].resolve(image.shape)
             else:
-                # fallback: 推奨クロップ領域を使用
-                x, y, w, h = 460, 378, 995, 550
-
-            x = max(0, min(x, width - 1))
-            y = max(0, min(y, height - 1))
-            w = max(1, min(w, width - x))
-            h = max(1, min(h, height - y))
+                resolved = geometry.resolve(image.shape)
 
             _write_sample(
                 image=image,
-                crop=(x, y, w, h),
+                crop=resolved.crop,
                 output_root=output_root,
                 label=label,
                 file_name=image_path.name,
                 size=size,
-                mask_regions=mask_regions,
+                mask_regions=resolved.masks,
             )
 
 
@@ -141,18 +154,12 @@ def _write_sample(
     label: str,
     file_name: str,
     size: int | None,
-    mask_regions: list[tuple[int, int, int, int]] | None = None,
+    mask_regions: tuple[tuple[int, int, int, int], ...] = (),
 ) -> None:
-    # マスク適用（クロップより前）
+    # マスク適用（クロップより前、座標はクリッピング済み）
     if mask_regions:
         image = image.copy()  # 元画像を変更しないようコピー
         for mx, my, mw, mh in mask_regions:
-            height, width = image.shape[:2]
-            # マスク領域のクリッピング
-            mx = max(0, min(mx, width - 1))
-            my = max(0, min(my, height - 1))
-            mw = max(1, min(mw, width - mx))
-            mh = max(1, min(mh, height - my))
             image[my : my + mh, mx : mx + mw] = 0  # 黒で塗りつぶす
 
     x, y, w, h = crop
@@ -0,0 +1,50 @@
+"""複数マシンのイベントログ（JSONL）を 1 本にマージするスクリプト。
+
+配信 PC とバックアップ PC がそれぞれ書き出したログを時刻順に k-way マージし、
+クールダウン時間内に両方が記録した同一試合の検知を 1 件にまとめる。
+出力ログはそのまま `StateManager` / HTTP サーバの `--event-log` に指定できる。
+
+利用方法:
+    uv run python scripts/merge_event_logs.py logs/main.jsonl logs/backup.jsonl --output logs/merged.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from victory_detector.core.state import EventLog, merge_event_logs
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Merge victory-detector event logs.")
+    parser.add_argument("sources", type=Path, nargs="+", help="マージ対象のイベントログ")
+    parser.add_argument("--output", type=Path, required=True, help="マージ結果の出力先")
+    parser.add_argument("--dedupe-window", type=float, default=180, help="重複とみなす時間幅（秒、通常はクールダウンと同じ値）")
+    parser.add_argument("--force", action="store_true", help="出力先が既に存在する場合も上書きする")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    missing = [path for path in args.sources if not path.exists()]
+    if missing:
+        print(f"[ERROR] ログが見つかりません: {', '.join(map(str, missing))}")
+        return 1
+    if args.output.exists():
+        if not args.force:
+            print(f"[ERROR] 出力先が既に存在します: {args.output}（上書きする場合は --force）")
+            return 1
+        args.output.unlink()
+
+    stats = merge_event_logs(
+        [EventLog(path) for path in args.sources],
+        EventLog(args.output),
+        dedupe_window_seconds=args.dedupe_window,
+    )
+    print(f"[INFO] {stats.written} 件を書き出しました（重複 {stats.duplicates} 件を除外）: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -122,6 +122,8 @@ def _start_server(settings: obs.obs_data_t) -> None:
 
     try:
         _server_manager = state.StateManager(state.EventLog(event_log_path))
+        # 推論プロセスの追記を inotify（非対応環境ではポーリング）で逐次取り込む
+        _server_manager.follow()
     except Exception as exc:  # pragma: no cover - OBS 環境専用処理
         obs.script_log(
             obs.LOG_ERROR, f"Failed to initialise Victory Detector state: {exc}"
@@ -132,6 +134,7 @@ def _start_server(settings: obs.obs_data_t) -> None:
         _server_instance = server.create_server(host, port, _server_manager)
     except OSError as exc:  # pragma: no cover - OBS 環境専用処理
         obs.script_log(obs.LOG_ERROR, f"Failed to bind Victory Detector server: {exc}")
+        _server_manager.stop_following()
         _server_manager = None
         return
 
@@ -172,6 +175,8 @@ def _stop_server() -> None:
         _server_thread.join(timeout=1)
         _server_thread = None
 
+    if _server_manager:
+        _server_manager.stop_following()
     _server_manager = None
 
 
@@ -188,6 +193,7 @@ def _start_refresh_timer(settings: obs.obs_data_t) -> None:
 
 
 def _refresh_state() -> None:
-    # イベントログを読み直し、手動編集後も StateManager の内容を整合させる。
+    # 変更通知の取りこぼしに備えた保険。前回位置以降の追記のみを取り込み、
+    # ログが置き換えられた（手動編集など）場合だけ全体を読み直す。
     if _server_manager:
-        _server_manager.reload()
+        _server_manager.sync()
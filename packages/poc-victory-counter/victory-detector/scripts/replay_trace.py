@@ -0,0 +1,73 @@
+"""録画済みの検知トレースを状態機械に流し、正解データと照合するスクリプト。
+
+実時間を待たずにクールダウン・連続検知のパラメータを評価できる。
+トレース・正解データの形式は `victory_detector.core.replay` を参照。
+
+利用方法:
+    uv run python scripts/replay_trace.py traces/session.jsonl --ground-truth traces/session_truth.jsonl --cooldown 150
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+from victory_detector.core.replay import ReplayParams, load_ground_truth, load_trace, replay
+
+DEFAULT_PARAMS = ReplayParams()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay a detection trace through the counter state machine.")
+    parser.add_argument("trace", type=Path, help="フレームごとの判定結果（JSONL、または --trace-dir のバイナリトレース）")
+    parser.add_argument("--ground-truth", type=Path, default=None, help="正解データ（JSONL、イベントログも可）")
+    parser.add_argument("--cooldown", type=float, default=DEFAULT_PARAMS.cooldown_seconds, help="クールダウン時間（秒）")
+    parser.add_argument("--required-consecutive", type=int, default=DEFAULT_PARAMS.required_consecutive, help="カウントに必要な連続検知回数")
+    parser.add_argument("--none-required", type=int, default=DEFAULT_PARAMS.none_required_consecutive, help="READY に戻るのに必要な none 連続回数")
+    parser.add_argument("--none-seconds", type=float, default=None, help="READY に戻るのに必要な none の継続時間（秒）。指定時は --none-required の代わりに使う")
+    parser.add_argument("--tolerance", type=float, default=30.0, help="正解の試合とイベントを対応付ける時間幅（秒）")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.trace.exists():
+        print(f"[ERROR] トレースが見つかりません: {args.trace}")
+        return 1
+    trace = load_trace(args.trace)
+    truth = load_ground_truth(args.ground_truth) if args.ground_truth else None
+    params = ReplayParams(
+        cooldown_seconds=args.cooldown,
+        required_consecutive=args.required_consecutive,
+        none_required_consecutive=args.none_required,
+        none_required_seconds=args.none_seconds,
+    )
+    report = replay(trace, params, truth, tolerance_seconds=args.tolerance)
+
+    if args.json:
+        print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+        return 0
+
+    print(
+        f"[INFO] frames={report.frames} duration={trace.duration_seconds:.0f}s "
+        f"events={len(report.events)} replay={report.elapsed_seconds * 1e3:.1f}ms"
+    )
+    for event in report.events:
+        print(f"  {event.iso_timestamp} {event.value} (confidence={event.confidence:.3f})")
+    if truth is not None:
+        print(
+            f"[INFO] matches={report.matches} hits={report.hits} missed={report.missed} "
+            f"mislabeled={report.mislabeled} double={report.double_counts} false_positive={report.false_positives}"
+        )
+        if report.latencies_us:
+            print(
+                f"[INFO] latency mean={report.mean_latency:.2f}s p95={report.latency_percentile(95):.2f}s "
+                f"max={report.max_latency:.2f}s"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,13 @@
 """勝敗バナーの自動検出監視スクリプト。
 
 OBS スクリプトが保存するスクリーンショットディレクトリを監視し、
-新しい PNG が現れたら `poc_detect.py` を呼び出して勝敗を判定する。
+新しい PNG が現れたらその場で勝敗を判定する。
+
+監視は ``DirectoryWatcher``（Linux では inotify、それ以外はポーリング）で行い、
+判定器（テンプレート、または --model 指定時は CNN）は起動時に一度だけ読み込む。
+新しいファイルだけを処理するため、1 枚あたりの遅延はプロセス起動ではなく
+画像の読み込みと判定の時間（ミリ秒単位）になる。処理済みのファイル名は
+--state-file に記録し、再起動しても同じファイルを二度判定しない。
 
 ※ PoC 用の簡易スクリプト。大量運用時には削除処理や例外ハンドリングを拡張すること。
 """
@@ -9,9 +15,18 @@ OBS スクリプトが保存するスクリーンショットディレクトリ
 from __future__ import annotations
 
 import argparse
-import subprocess
+import json
+import threading
 import time
 from pathlib import Path
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from victory_detector.core.templates import TemplateMatcher
+from victory_detector.core.vision import DetectionResult
+from victory_detector.core.watch import DirectoryWatcher, ProcessedFiles
 
 CAPTURE_GLOB = "*.png"
 
@@ -27,60 +42,109 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--templates",
         type=Path,
-        required=True,
-        help="テンプレート画像のルートディレクトリ",
+        default=None,
+        help="テンプレート画像のルートディレクトリ（--model を指定しない場合は必須）",
+    )
+    parser.add_argument(
+        "--model",
+        type=Path,
+        default=None,
+        help="学習済みモデルのパス。指定時はテンプレートの代わりに CNN で判定する",
     )
     parser.add_argument(
         "--threshold",
         type=float,
         default=0.9,
-        help="検出時の閾値 (default: 0.9)",
+        help="テンプレート判定時の閾値 (default: 0.9)",
     )
     parser.add_argument(
         "--interval",
         type=float,
         default=2.0,
-        help="ディレクトリー監視間隔 (秒)",
+        help="ディレクトリーの再走査間隔 (秒)。inotify が使えない環境ではこの間隔でポーリングする",
     )
     parser.add_argument(
-        "--poc-script",
+        "--state-file",
         type=Path,
-        default=Path(__file__).with_name("poc_detect.py"),
-        help="poc_detect.py のパス",
+        default=None,
+        help="処理済みファイル名の記録先 (default: <capture-dir>/.processed.txt)",
+    )
+    parser.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="起動時に既にあるファイルを判定せずに処理済みとして記録する",
+    )
+    parser.add_argument(
+        "--no-inotify",
+        action="store_true",
+        help="inotify を使わずにポーリングする",
     )
     return parser.parse_args()
 
 
+def load_predict(args: argparse.Namespace) -> Callable[[np.ndarray], DetectionResult]:
+    if args.model is not None:
+        from victory_detector.inference import VictoryPredictor
+
+        predictor = VictoryPredictor(model_path=args.model)
+        print(f"[INFO] CNN で判定します: {args.model} (Device: {predictor.device})")
+        return predictor.predict
+    matcher = TemplateMatcher(args.templates, threshold=args.threshold)
+    print(f"[INFO] テンプレート {len(matcher.templates)} 枚で判定します（閾値 {args.threshold}）")
+    return matcher.predict
+
+
 def main() -> int:
     args = parse_args()
     capture_dir = args.capture_dir.resolve()
     if not capture_dir.exists():
         print(f"[ERROR] capture_dir {capture_dir} が存在しません。")
         return 1
+    if args.model is None and args.templates is None:
+        print("[ERROR] --templates または --model を指定してください。")
+        return 1
 
-    seen: set[Path] = set(capture_dir.glob(CAPTURE_GLOB))
-    print(f"[INFO] 監視を開始します: {capture_dir}")
+    try:
+        predict = load_predict(args)
+    except (ValueError, FileNotFoundError) as exc:
+        print(f"[ERROR] 判定器を初期化できません: {exc}")
+        return 1
+
+    processed = ProcessedFiles(args.state_file or capture_dir / ".processed.txt")
+    if args.skip_existing:
+        processed.add(sorted(path.name for path in capture_dir.glob(CAPTURE_GLOB)))
 
+    def on_new_files(paths: list[Path]) -> None:
+        print(f"[INFO] {len(paths)} 件の新しいキャプチャを検出しました。")
+        for path in paths:
+            started = time.perf_counter()
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is None:
+                print(f"[WARN] {path} を読み込めませんでした。")
+                continue
+            detection = predict(image)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            output = {
+                "file": path.name,
+                "outcome": detection.outcome,
+                "confidence": round(detection.confidence, 4),
+                "latency_ms": round(elapsed_ms, 2),
+            }
+            print(json.dumps(output, ensure_ascii=False))
+
+    watcher = DirectoryWatcher(
+        capture_dir,
+        on_new_files,
+        pattern=CAPTURE_GLOB,
+        processed=processed,
+        rescan_interval=max(args.interval, 0.1),
+        use_inotify=not args.no_inotify,
+    )
+    print(f"[INFO] 監視を開始します: {capture_dir}（処理済み {len(processed)} 件）")
     try:
-        while True:
-            current = set(capture_dir.glob(CAPTURE_GLOB))
-            new_files = sorted(current - seen)
-            if new_files:
-                print(f"[INFO] {len(new_files)} 件の新しいキャプチャを検出しました。")
-                sample_dir = capture_dir
-                cmd = [
-                    "python",
-                    str(args.poc_script),
-                    "--samples",
-                    str(sample_dir),
-                    "--templates",
-                    str(args.templates),
-                    "--threshold",
-                    str(args.threshold),
-                ]
-                subprocess.run(cmd, check=False)
-                seen.update(new_files)
-            time.sleep(max(args.interval, 0.5))
+        with watcher:
+            print(f"[INFO] 監視方式: {watcher.backend}")
+            threading.Event().wait()
     except KeyboardInterrupt:
         print("[INFO] 監視を終了します。")
     return 0
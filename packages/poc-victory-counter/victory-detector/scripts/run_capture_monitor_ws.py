@@ -2,27 +2,56 @@
 
 OBS 5.x の websocket API を使用し、指定ソースのスクリーンショットを
 一定間隔で取得してCNNで勝敗判定、結果とカウント状態を標準出力へログ出力する。
+
+取得・デコード・推論・状態更新は別スレッドの段として並行に動き、段の間は
+上限付きキュー（溢れたら古いフレームを捨てる）でつながる。
 """
 
 from __future__ import annotations
 
 import argparse
-import base64
 import json
+import tempfile
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
-import cv2  # type: ignore
 import numpy as np  # type: ignore
 from obsws_python import ReqClient
 
+from victory_detector.capture import TraceRecorder
+from victory_detector.capture.obsws import AsyncScreenshotClient, ObsError
+from victory_detector.capture.metrics import JsonlMetricsHook, MetricsReporter, StageTimers
+from victory_detector.capture.pipeline import Captured, Frame, Pipeline, Stage
+from victory_detector.capture.sources import (
+    AsyncObsScreenshotSource,
+    FrameSource,
+    ObsScreenshotSource,
+    open_source,
+)
+from victory_detector.capture.scheduler import AdaptiveRate
+from victory_detector.capture.shm import SharedMemorySource
+from victory_detector.capture.snapshots import SNAPSHOT_FORMATS, SnapshotWriter
+from victory_detector.capture.screenshot import (
+    IMAGE_FORMATS,
+    REDUCED_DECODE_FLAGS,
+    ScreenshotOptions,
+    decode_base64,
+    decode_image,
+    fetch_image_data,
+)
+from victory_detector.core.clock import ManualClock
+from victory_detector.core.geometry import DEFAULT_CROP, Region
 from victory_detector.core.state import EventLog, StateManager
+from victory_detector.core.vision import DetectionResult
 from victory_detector.inference import VictoryPredictor
+from victory_detector.inference.predictor import CLASS_TO_OUTCOME
 
 DEFAULT_INTERVAL = 0.25
 DEFAULT_COOLDOWN = 180
 DEFAULT_REQUIRED_CONSECUTIVE = 2
+DEFAULT_NONE_REQUIRED = 50
 
 
 def parse_args() -> argparse.Namespace:
@@ -30,62 +59,207 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--host", default="127.0.0.1", help="OBS WebSocket host")
     parser.add_argument("--port", type=int, default=4455, help="OBS WebSocket port")
     parser.add_argument("--password", default="", help="OBS WebSocket password")
-    parser.add_argument("--source", required=True, help="スクリーンショット対象のソース名")
+    parser.add_argument("--source", default=None, help="スクリーンショット対象のソース名（OBS から取得する場合は必須）")
+    parser.add_argument("--input", type=Path, default=None, help="OBS の代わりに動画ファイルまたは画像ディレクトリを入力にする（--interval ごとに間引き、処理できる限り速く読む）")
+    parser.add_argument("--shm", default=None, help="shm_producer.py が書き込む共有メモリのリングバッファ名。生のフレームをエンコードなしで読む")
     parser.add_argument("--model", type=Path, default=Path("artifacts/models/victory_classifier.pth"), help="学習済みモデルのパス")
     parser.add_argument("--size", type=int, default=None, help="推論時の画像サイズ（長辺、未指定時はオリジナルサイズ）")
-    parser.add_argument("--event-log", type=Path, default=Path("logs/detections.jsonl"), help="イベントログの保存先")
+    parser.add_argument("--event-log", type=Path, default=None, help="イベントログの保存先 (default: logs/detections.jsonl。--input 指定時は一時ディレクトリ)")
+    parser.add_argument("--segment-bytes", type=int, default=None, help="イベントログをこのサイズでセグメントに分割し、古いセグメントを圧縮する")
+    parser.add_argument("--rotate-daily", action="store_true", help="日付が変わったらイベントログをローテーションする")
     parser.add_argument("--cooldown", type=int, default=DEFAULT_COOLDOWN, help="クールダウン時間（秒）")
     parser.add_argument("--required-consecutive", type=int, default=DEFAULT_REQUIRED_CONSECUTIVE, help="カウントに必要な連続検知回数")
+    parser.add_argument("--none-required", type=int, default=DEFAULT_NONE_REQUIRED, help="クールダウン後に READY へ戻るのに必要な none 連続回数")
+    parser.add_argument("--none-required-seconds", type=float, default=None, help="READY へ戻るのに必要な none の継続時間（秒）。指定時は --none-required の代わりに使い、キャプチャ間隔に依存しない")
     parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="キャプチャ間隔（秒）")
-    parser.add_argument("--screenshot-width", type=int, default=1920, help="スクリーンショットの幅")
+    parser.add_argument("--adaptive-rate", action="store_true", help="クールダウン状態に応じてキャプチャ間隔を変える（COOLDOWN 中は残り時間だけ休み、試合中は --waiting-interval、READY と候補検知時は --interval）")
+    parser.add_argument("--waiting-interval", type=float, default=1.0, help="--adaptive-rate 時の WAITING_FOR_NONE（試合中）のキャプチャ間隔（秒）")
+    parser.add_argument("--cooldown-max-interval", type=float, default=10.0, help="--adaptive-rate 時に COOLDOWN 中に休む最長時間（秒）")
+    parser.add_argument("--async-client", action="store_true", help="asyncio クライアントで複数のスクリーンショット要求を並行に投げる（websockets が必要）")
+    parser.add_argument("--in-flight", type=int, default=2, help="--async-client 時に同時に応答待ちにしておく要求数")
+    parser.add_argument("--queue-size", type=int, default=2, help="段の間のキュー長（溢れたら古いフレームから捨てる）")
+    parser.add_argument("--stats-interval", type=float, default=10.0, help="段ごとの所要時間（p50/p95/最大）・fps・破棄数の集計を表示する間隔（秒）")
+    parser.add_argument("--print-frames", action="store_true", help="フレームごとに判定結果の JSON を表示する（既定ではカウントされたときのみ）")
+    parser.add_argument("--metrics-log", type=Path, default=None, help="集計を 1 行 1 JSON で追記するファイル（--stats-interval ごと）")
+    parser.add_argument("--screenshot-width", type=int, default=1920, help="スクリーンショットの幅（クロップ・マスク領域は取得サイズに合わせて自動で変換）")
     parser.add_argument("--screenshot-height", type=int, default=1080, help="スクリーンショットの高さ")
+    parser.add_argument("--screenshot-format", choices=IMAGE_FORMATS, default="png", help="スクリーンショットの形式（jpg は OBS 側の圧縮・転送・デコードが軽い）")
+    parser.add_argument("--screenshot-quality", type=int, default=-1, help="圧縮品質（jpg は 0〜100、-1 で OBS の既定値）")
+    parser.add_argument("--decode-reduce", type=int, choices=sorted(REDUCED_DECODE_FLAGS), default=1, help="縮小デコードの倍率（IMREAD_REDUCED_COLOR_N）")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="N", help="各形式・縮小倍率で N 回ずつ取得・デコードして所要時間を表示して終了する")
     parser.add_argument("--save-detections", type=Path, default=None, help="検知時のスクリーンショット保存先ディレクトリ（オプション）")
-    parser.add_argument("--mask", nargs='?', const='0,534,1920,295', default=None, help="マスク領域 (x,y,width,height)。値を省略した場合はデフォルト: 0,534,1920,295")
+    parser.add_argument("--save-format", choices=SNAPSHOT_FORMATS, default="source", help="検知時スクリーンショットの保存形式。source は OBS から受け取った画像を再エンコードせずに保存する")
+    parser.add_argument("--save-compression", type=int, default=3, help="png で保存するときの圧縮レベル（0〜9）")
+    parser.add_argument("--save-quality", type=int, default=90, help="jpg / webp で保存するときの品質（0〜100）")
+    parser.add_argument("--save-max-mb", type=int, default=0, help="保存先の画像の合計サイズの上限（MB、0 で無制限）。超えたら古いものから削除する")
+    parser.add_argument("--save-queue", type=int, default=8, help="保存待ちの上限。溢れたスクリーンショットは保存せずに数える")
+    parser.add_argument("--trace-dir", type=Path, default=None, help="フレームごとの推論結果（全クラスの確率・状態）をバイナリトレースとして記録するディレクトリ（オプション）")
+    parser.add_argument("--trace-max-mb", type=int, default=64, help="トレースファイル 1 つあたりの最大サイズ（MB）")
+    parser.add_argument("--mask", nargs='?', const='0,534,1920,295', default=None, help="マスク領域 (x,y,width,height)。1920x1080 基準のピクセル、または 0〜1 の比率。値を省略した場合はデフォルト: 0,534,1920,295")
     return parser.parse_args()
 
 
+def run_benchmark(client: ReqClient, args: argparse.Namespace) -> None:
+    """形式・縮小倍率ごとに取得・base64 デコード・画像デコードの所要時間を表示する。"""
+
+    print(f"[INFO] ベンチマーク: {args.screenshot_width}x{args.screenshot_height} を各 {args.benchmark} 回")
+    print(f"{'format':>6} {'reduce':>6} {'size(KB)':>9} {'fetch(ms)':>9} {'b64(ms)':>8} {'decode(ms)':>10} {'total(ms)':>9}")
+    for image_format in IMAGE_FORMATS:
+        for reduce in sorted(REDUCED_DECODE_FLAGS):
+            options = ScreenshotOptions(image_format, args.screenshot_width, args.screenshot_height, args.screenshot_quality, reduce)
+            fetch = b64 = decode = 0.0
+            size = 0
+            for _ in range(args.benchmark):
+                started = time.perf_counter()
+                image_data = fetch_image_data(client, args.source, options)
+                fetched = time.perf_counter()
+                if not image_data:
+                    continue
+                data = decode_base64(image_data)
+                decoded = time.perf_counter()
+                decode_image(data, reduce)
+                finished = time.perf_counter()
+                fetch += fetched - started
+                b64 += decoded - fetched
+                decode += finished - decoded
+                size += len(data)
+            n = max(1, args.benchmark)
+            print(
+                f"{image_format:>6} {reduce:>6} {size / n / 1024:>9.0f} {fetch / n * 1e3:>9.1f} {b64 / n * 1e3:>8.1f} "
+                f"{decode / n * 1e3:>10.1f} {(fetch + b64 + decode) / n * 1e3:>9.1f}"
+            )
+
+
+# 集計の表示順。取得 → base64 → 画像デコード → 前処理 → forward → 状態更新、最後に全体の遅延
+METRICS_ORDER = ["capture", "base64", "imdecode", "decode", "preprocess", "forward", "infer", "state", "latency"]
+
+
+def open_frame_source(args: argparse.Namespace, screenshot: ScreenshotOptions) -> FrameSource:
+    """引数に応じて OBS（同期 / asyncio）、共有メモリ、動画ファイル、画像ディレクトリのソースを開く。"""
+
+    if args.shm is not None:
+        source = SharedMemorySource(args.shm)
+        print(f"[INFO] 共有メモリ {args.shm} から読みます（{source.reader.slots} スロット）。Ctrl+C で終了します。")
+        return source
+    if args.input is not None:
+        source = open_source(args.input, args.interval)
+        print(f"[INFO] 入力: {args.input}（オフライン、{args.interval}秒ごと）")
+        return source
+    if not args.source:
+        raise ValueError("--source、--shm または --input を指定してください")
+    if args.async_client:
+        client = AsyncScreenshotClient(
+            args.source,
+            screenshot,
+            host=args.host,
+            port=args.port,
+            password=args.password,
+            in_flight=args.in_flight,
+            queue_size=args.queue_size,
+            interval=args.interval,
+        ).start()
+        print(f"[INFO] obs-websocket (5.x) に asyncio で接続しました（同時要求数 {args.in_flight}）。Ctrl+C で終了します。")
+        return AsyncObsScreenshotSource(client)
+    client = ReqClient(host=args.host, port=args.port, password=args.password)
+    print("[INFO] obs-websocket (5.x) に接続しました。Ctrl+C で終了します。")
+    return ObsScreenshotSource(client, args.source, screenshot)
+
+
 def main() -> int:
     args = parse_args()
 
+    try:
+        screenshot = ScreenshotOptions(
+            args.screenshot_format,
+            args.screenshot_width,
+            args.screenshot_height,
+            args.screenshot_quality,
+            args.decode_reduce,
+        )
+    except ValueError as exc:
+        print(f"[ERROR] {exc}")
+        return 1
+
+    if args.benchmark > 0:
+        if not args.source:
+            print("[ERROR] --benchmark には --source が必要です")
+            return 1
+        client = ReqClient(host=args.host, port=args.port, password=args.password)
+        try:
+            run_benchmark(client, args)
+        finally:
+            client.disconnect()
+        return 0
+
     # モデルファイルの存在確認
     if not args.model.exists():
         print(f"[ERROR] モデルファイルが見つかりません: {args.model}")
         return 1
 
-    # マスク領域のパース
+    # マスク領域のパース（1920x1080 基準のピクセル、または 0〜1 の比率）
     mask_regions = None
     if args.mask is not None:
-        mask_regions = []
-        mask_str = args.mask
         try:
-            parts = mask_str.split(",")
-            if len(parts) != 4:
-                print(f"[ERROR] マスク領域の形式が不正です: {mask_str}")
-                return 1
-            x, y, w, h = map(int, parts)
-            mask_regions.append((x, y, w, h))
+            mask_regions = [Region.parse(args.mask)]
         except ValueError:
-            print(f"[ERROR] マスク領域の形式が不正です: {mask_str}")
+            print(f"[ERROR] マスク領域の形式が不正です: {args.mask}")
             return 1
 
     # VictoryPredictorの初期化
     print("[INFO] CNN推論モジュールを初期化中...")
     predictor = VictoryPredictor(
         model_path=args.model,
-        crop_region=(460, 378, 995, 550),
+        crop_region=DEFAULT_CROP,
         image_size=args.size,
         mask_regions=mask_regions,
     )
     print(f"[INFO] Device: {predictor.device}")
     print(f"[INFO] Image size: {args.size if args.size else 'original (995x550)'}")
+    width, height = screenshot.decoded_size
+    resolved = predictor.geometry.resolve((height, width))
+    print(f"[INFO] Screenshot: {screenshot.format} {screenshot.width}x{screenshot.height} quality={screenshot.quality} reduce={screenshot.reduce}")
+    print(f"[INFO] クロップ領域（{width}x{height}）: {resolved.crop}")
     print(f"[INFO] Classes: {list(predictor.label_map.keys())}")
-    print(f"[INFO] Mask regions: {mask_regions if mask_regions else 'disabled'}")
+    print(f"[INFO] Mask regions: {list(resolved.masks) if resolved.masks else 'disabled'}")
+
+    # フレームの取得元
+    try:
+        source = open_frame_source(args, screenshot)
+    except (ObsError, RuntimeError, ValueError, FileNotFoundError) as exc:
+        print(f"[ERROR] 入力を開けません: {exc}")
+        return 1
+
+    # 段ごと・段の中の処理ごとの所要時間
+    timers = StageTimers()
+    source.timers = timers
+    predictor.timers = timers
+
+    # オフラインの入力は実時間より速く流れるため、フレームの時刻で状態を進める
+    clock = None if source.realtime else ManualClock()
+
+    # オフラインの入力で数えたイベントをライブのカウンタやクールダウンに混ぜない
+    if args.event_log is None:
+        if args.input is not None:
+            args.event_log = Path(tempfile.mkdtemp(prefix="victory-offline-")) / "detections.jsonl"
+        else:
+            args.event_log = Path("logs/detections.jsonl")
 
     # StateManagerの初期化
-    event_log = EventLog(args.event_log)
-    state_manager = StateManager(event_log, cooldown_seconds=args.cooldown, required_consecutive=args.required_consecutive)
+    event_log = EventLog(args.event_log, max_segment_bytes=args.segment_bytes, rotate_daily=args.rotate_daily)
+    state_manager = StateManager(
+        event_log,
+        cooldown_seconds=args.cooldown,
+        required_consecutive=args.required_consecutive,
+        none_required_consecutive=args.none_required,
+        none_required_seconds=args.none_required_seconds,
+        clock=clock,
+    )
     print(f"[INFO] クールダウン: {args.cooldown}秒")
     print(f"[INFO] 連続検知回数: {args.required_consecutive}回")
+    if args.none_required_seconds is not None:
+        print(f"[INFO] none 継続時間: {args.none_required_seconds}秒")
+    else:
+        print(f"[INFO] none 連続回数: {args.none_required}回")
     print(f"[INFO] イベントログ: {args.event_log}")
     print(
         f"[INFO] 現在のカウント: "
@@ -94,96 +268,185 @@ def main() -> int:
         f"Draw={state_manager.summary.draws}"
     )
 
+    # 状態に応じたキャプチャ間隔
+    rate: AdaptiveRate | None = None
+    if args.adaptive_rate and source.realtime:
+        rate = AdaptiveRate(args.interval, waiting=args.waiting_interval, cooldown_max=args.cooldown_max_interval)
+        print(f"[INFO] 適応キャプチャ間隔: READY={args.interval}秒 試合中={args.waiting_interval}秒 COOLDOWN 最長={args.cooldown_max_interval}秒")
+        if args.none_required_seconds is None:
+            print("[WARN] --adaptive-rate では none の連続回数がキャプチャ間隔で変わるため、--none-required-seconds の併用を推奨します")
+
     # スクリーンショット保存ディレクトリの作成
+    snapshots: SnapshotWriter | None = None
     if args.save_detections:
-        args.save_detections.mkdir(parents=True, exist_ok=True)
-        print(f"[INFO] 検知時スクリーンショット保存: {args.save_detections}")
-
-    # OBS接続
-    client = ReqClient(host=args.host, port=args.port, password=args.password)
-    print("[INFO] obs-websocket (5.x) に接続しました。Ctrl+C で終了します。")
+        snapshots = SnapshotWriter(
+            args.save_detections,
+            format=args.save_format,
+            compression=args.save_compression,
+            quality=args.save_quality,
+            max_bytes=(args.save_max_mb << 20) or None,
+            queue_size=args.save_queue,
+        ).start()
+        print(f"[INFO] 検知時スクリーンショット保存: {args.save_detections}（{args.save_format}、上限 {args.save_max_mb or '無制限'} MB）")
+
+    # トレース記録（バックグラウンドスレッドで書き出す）
+    recorder: TraceRecorder | None = None
+    class_names = [predictor.idx_to_label[i] for i in range(len(predictor.idx_to_label))]
+    class_index = {name: i for i, name in enumerate(class_names)}
+    if args.trace_dir:
+        recorder = TraceRecorder(
+            args.trace_dir,
+            class_names,
+            outcomes=[CLASS_TO_OUTCOME.get(name, "unknown") for name in class_names],
+            max_bytes=args.trace_max_mb << 20,
+        ).start()
+        print(f"[INFO] トレース記録: {args.trace_dir}")
+
+    # 各段は別スレッドで動き、段の間のキューが溢れたら古いフレームから捨てる
+    # （オフラインの入力では捨てずに待ち、入力の終わりまで処理したら終了する）
+
+    def capture() -> Captured | None:
+        """フレーム取得（ネットワーク / ファイル I/O）。"""
+
+        captured = source.grab()
+        if captured is None and source.realtime:
+            print("[WARN] 画像データが取得できませんでした。")
+        return captured
+
+    def decode(frame: Frame) -> tuple[np.ndarray, Any] | None:
+        """Base64 / 画像デコード。エンコード済みの中身は保存用に残す。"""
 
-    try:
-        while True:
-            # スクリーンショット取得
-            resp = client.get_source_screenshot(
-                args.source,
-                "png",
-                args.screenshot_width,
-                args.screenshot_height,
-                -1,
+        try:
+            image = source.decode(frame.payload)
+        except (ValueError, UnicodeEncodeError) as exc:
+            print(f"[WARN] デコードに失敗しました: {exc}")
+            return None
+        if image is None:
+            print("[WARN] 画像データのデコードに失敗しました。")
+            return None
+        return image, frame.payload
+
+    def infer(frame: Frame) -> tuple[np.ndarray, Any, DetectionResult]:
+        """CNN推論。"""
+
+        image, payload = frame.payload
+        return image, payload, predictor.predict(image)
+
+    def update_state(frame: Frame) -> bool:
+        """StateManager への記録・トレース記録・結果出力。"""
+
+        image, payload, detection = frame.payload
+
+        # StateManagerに記録（連続検知対応）
+        if clock is not None:
+            clock.set(max(clock.now_us(), frame.timestamp))
+        response = state_manager.record_detection(detection)
+
+        # 次のキャプチャまでの間隔を状態から決める
+        if rate is not None:
+            interval = rate.interval(state_manager)
+            if isinstance(source, AsyncObsScreenshotSource):
+                source.client.interval = interval
+            else:
+                pipeline.scheduler.interval = interval
+
+        if recorder is not None:
+            probabilities = getattr(detection, "probabilities", {})
+            recorder.record(
+                frame.timestamp,
+                class_index.get(detection.predicted_class or "", -1),
+                [probabilities.get(name, 0.0) for name in class_names],
+                state_manager.cooldown_state,
+                response.consecutive_count,
+                counted=response.event is not None,
             )
 
-            # レスポンスからimage_dataを取得
-            if isinstance(resp, dict):
-                image_data = resp.get("imageData") or resp.get("imageDataBase64")
+        # 検知時スクリーンショット保存（最初の検知のみ、バックグラウンドで書き出す）
+        if snapshots is not None and response.is_first_detection and detection.outcome in ("victory", "defeat", "draw"):
+            timestamp_str = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]  # ミリ秒まで
+            predicted_class = detection.predicted_class or "unknown"
+            stem = f"{timestamp_str}-{predicted_class}-first"
+            # 他の配列のビューは後で書き換わりうるためコピーしておく
+            snapshot = image if image.flags.owndata else image.copy()
+            if snapshots.save(stem, snapshot, source.encoded(payload)):
+                print(f"[INFO] スクリーンショット保存: {stem}")
             else:
-                image_data = getattr(resp, "image_data", None)
+                print(f"[WARN] 保存待ちが溢れたためスクリーンショットを破棄しました: {stem}")
+
+        # 結果出力
+        output: dict = {
+            "outcome": detection.outcome,
+            "confidence": round(detection.confidence, 4),
+            "counted": response.event is not None,
+            "consecutive_count": response.consecutive_count,
+            "timestamp": frame.timestamp / 1_000_000,
+            "counter": {
+                "victories": state_manager.summary.victories,
+                "defeats": state_manager.summary.defeats,
+                "draws": state_manager.summary.draws,
+            },
+        }
+
+        # カウントされた場合
+        if response.event:
+            output["predicted_class"] = detection.predicted_class
+
+        if args.print_frames or response.event:
+            print(json.dumps(output, ensure_ascii=False))
+        return True
+
+    pipeline = Pipeline(
+        [
+            Stage("capture", capture),
+            Stage("decode", decode),
+            Stage("infer", infer),
+            Stage("state", update_state),
+        ],
+        queue_size=args.queue_size,
+        # asyncio クライアントでは要求側で間隔を制御し、取得段は届いたフレームを受け取るだけ。
+        # オフラインの入力は間隔を空けずに読む。
+        interval=0.0 if isinstance(source, AsyncObsScreenshotSource) or not source.realtime else args.interval,
+        lossless=not source.realtime,
+        timers=timers,
+    )
 
-            if not image_data:
-                print("[WARN] 画像データが取得できませんでした。")
-            else:
-                # Base64デコード
-                if image_data.startswith("data:"):
-                    _, base64_data = image_data.split(",", 1)
-                else:
-                    base64_data = image_data
-
-                try:
-                    png_bytes = base64.b64decode(base64_data)
-                except Exception as exc:  # noqa: BLE001
-                    print(f"[WARN] base64 デコードに失敗しました: {exc}")
-                    png_bytes = b""
-
-                if png_bytes:
-                    # 画像デコード
-                    np_data = np.frombuffer(png_bytes, np.uint8)
-                    image = cv2.imdecode(np_data, cv2.IMREAD_COLOR)
-
-                    if image is not None:
-                        # CNN推論
-                        detection = predictor.predict(image)
-
-                        # StateManagerに記録（連続検知対応）
-                        response = state_manager.record_detection(detection)
-
-                        # 検知時スクリーンショット保存（最初の検知のみ）
-                        if args.save_detections and response.is_first_detection and detection.outcome in ("victory", "defeat", "draw"):
-                            timestamp_str = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]  # ミリ秒まで
-                            predicted_class = detection.predicted_class or "unknown"
-                            filename = f"{timestamp_str}-{predicted_class}-first.png"
-                            filepath = args.save_detections / filename
-                            cv2.imwrite(str(filepath), image)
-                            print(f"[INFO] スクリーンショット保存: {filename}")
-
-                        # 結果出力
-                        output: dict = {
-                            "outcome": detection.outcome,
-                            "confidence": round(detection.confidence, 4),
-                            "counted": response.event is not None,
-                            "consecutive_count": response.consecutive_count,
-                            "timestamp": time.time(),
-                            "counter": {
-                                "victories": state_manager.summary.victories,
-                                "defeats": state_manager.summary.defeats,
-                                "draws": state_manager.summary.draws,
-                            },
-                        }
-
-                        # カウントされた場合
-                        if response.event:
-                            output["predicted_class"] = detection.predicted_class
-
-                        print(json.dumps(output, ensure_ascii=False))
-                    else:
-                        print("[WARN] PNG データのデコードに失敗しました。")
-
-            time.sleep(args.interval)
+    # 段ごとの所要時間の集計（段の中の処理は段の前に並べる）
+    reporter = MetricsReporter(pipeline, timers, order=METRICS_ORDER)
+    if args.metrics_log:
+        reporter.add_hook(JsonlMetricsHook(args.metrics_log))
+        print(f"[INFO] 集計の記録: {args.metrics_log}")
+
+    try:
+        started = time.perf_counter()
+        pipeline.start()
+        while not pipeline.wait(args.stats_interval):
+            print(f"[INFO] metrics {reporter.collect().format()}")
+        if not source.realtime:
+            print(f"[INFO] metrics {reporter.collect().format()}")
+            processed = pipeline.stats().stages[-1].processed
+            elapsed = time.perf_counter() - started
+            print(f"[INFO] 入力の終わりまで処理しました: {processed} フレーム / {elapsed:.1f} 秒（{processed / max(elapsed, 1e-9):.1f} fps）")
 
     except KeyboardInterrupt:
         print("\n[INFO] 監視を終了します。")
     finally:
-        client.disconnect()
+        pipeline.stop()
+        print(f"[INFO] pipeline {pipeline.stats().format()}")
+        source.close()
+        if isinstance(source, AsyncObsScreenshotSource):
+            client = source.client
+            print(f"[INFO] obs-websocket: 要求 {client.sent} 件、応答 {client.received} 件、失敗 {client.failed} 件")
+        if isinstance(source, SharedMemorySource):
+            print(f"[INFO] 共有メモリ: 最新 {source.reader.last} フレーム目まで読み、読み飛ばし {source.reader.dropped} 件、書き換え中で破棄 {source.reader.torn} 件")
+        if recorder is not None:
+            recorder.close()
+            print(f"[INFO] トレース: {recorder.written} フレームを記録（破棄 {recorder.dropped}）")
+        if snapshots is not None:
+            snapshots.close()
+            print(
+                f"[INFO] スクリーンショット: {snapshots.written} 枚を保存（再エンコードなし {snapshots.reused}、"
+                f"破棄 {snapshots.dropped}、失敗 {snapshots.failed}、上限超過で削除 {snapshots.evicted}）"
+            )
 
     return 0
 
@@ -0,0 +1,169 @@
+"""録画済みの配信動画から勝敗を数え、イベントログへ書き込むスクリプト。
+
+動画を粗い間隔でサンプリングし、勝敗バナーの候補が見えた付近だけ細かく
+見直す（coarse-to-fine）。カウントが確定したらクールダウン明けまで読み飛ばすため、
+OBS で等倍再生するより桁違いに速い。イベントの時刻は動画内の時刻を
+録画開始時刻（OBS 形式のファイル名、または --start-time）に足したもの。
+
+--workers 2 以上では動画を --shard-minutes 分ずつの区間に分けてプロセスプールで
+並列に走査し（ワーカーごとにモデルを読み込む）、結果を時刻順にまとめてから
+状態機械に流す。クールダウンの読み飛ばしは効かないが、コア数に応じて速くなる。
+
+利用方法:
+    uv run python scripts/scan_vod.py "recordings/2025-01-01 20-15-33.mkv" --event-log logs/backfill.jsonl
+    uv run python scripts/scan_vod.py recordings/*.mkv --workers 8 --shard-minutes 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import time
+from pathlib import Path
+
+from victory_detector.capture.vod import ScanParams, ShardedVodScanner, VideoReader, VodScanner, feed_sample, video_start_us
+from victory_detector.core.geometry import DEFAULT_CROP, Region
+from victory_detector.core.state import EventLog, StateManager, format_timestamp, parse_timestamp
+from victory_detector.inference import VictoryPredictor
+
+DEFAULT_PARAMS = ScanParams()
+
+
+def load_predict(model_path: Path, image_size: int | None, mask_regions: list[Region] | None, threads: int | None = None):
+    """ワーカープロセスでモデルを読み込み、推論関数を返す。"""
+
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+    predictor = VictoryPredictor(model_path=model_path, crop_region=DEFAULT_CROP, image_size=image_size, mask_regions=mask_regions)
+    return predictor.predict
+
+
+def print_events(state_manager: StateManager, before: int, origin: int) -> int:
+    """``before`` 件目以降に確定したカウントを動画内の時刻付きで表示し、件数を返す。"""
+
+    added = state_manager.summary.total - before
+    events = state_manager.history(added) if added > 0 else []
+    for event in events:
+        offset = (event.timestamp - origin) / 1_000_000
+        print(f"  {int(offset // 3600):d}:{int(offset % 3600 // 60):02d}:{offset % 60:05.2f} {event.value} (confidence={event.confidence:.3f})")
+    return len(events)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Count victories/defeats from recorded videos.")
+    parser.add_argument("videos", type=Path, nargs="+", help="録画ファイル（複数指定時は順に処理）")
+    parser.add_argument("--model", type=Path, default=Path("artifacts/models/victory_classifier.pth"), help="学習済みモデルのパス")
+    parser.add_argument("--size", type=int, default=None, help="推論時の画像サイズ（長辺、未指定時はオリジナルサイズ）")
+    parser.add_argument("--mask", nargs='?', const='0,534,1920,295', default=None, help="マスク領域 (x,y,width,height)。値を省略した場合はデフォルト: 0,534,1920,295")
+    parser.add_argument("--event-log", type=Path, default=Path("logs/vod_detections.jsonl"), help="イベントログの保存先")
+    parser.add_argument("--start-time", default=None, help="録画開始時刻（ISO8601）。動画を 1 つだけ指定したときのみ。未指定時はファイル名または更新時刻から推定")
+    parser.add_argument("--cooldown", type=int, default=180, help="クールダウン時間（秒）")
+    parser.add_argument("--required-consecutive", type=int, default=2, help="カウントに必要な連続検知回数（--fine-interval 間隔で数える）")
+    parser.add_argument("--none-required-seconds", type=float, default=12.5, help="READY へ戻るのに必要な none の継続時間（秒）")
+    parser.add_argument("--coarse-interval", type=float, default=DEFAULT_PARAMS.coarse_interval, help="粗いサンプリング間隔（秒）。勝敗バナーの表示時間より短くする")
+    parser.add_argument("--fine-interval", type=float, default=DEFAULT_PARAMS.fine_interval, help="候補付近を見直す間隔（秒）")
+    parser.add_argument("--refine-after", type=float, default=DEFAULT_PARAMS.refine_after, help="候補が見えた後に見直す範囲（秒）")
+    parser.add_argument("--seek-seconds", type=float, default=5.0, help="これより離れた位置へは読み進めずにシークする（秒）")
+    parser.add_argument("--workers", type=int, default=1, help="並列に走査するプロセス数（2 以上で区間に分けて並列化）")
+    parser.add_argument("--shard-minutes", type=float, default=10.0, help="並列化するときの区間の長さ（分）")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="並列化するときのワーカーごとの推論スレッド数")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    missing = [str(path) for path in [args.model, *args.videos] if not path.exists()]
+    if missing:
+        print(f"[ERROR] ファイルが見つかりません: {', '.join(missing)}")
+        return 1
+    if args.start_time and len(args.videos) > 1:
+        print("[ERROR] --start-time は動画を 1 つだけ指定したときに使えます")
+        return 1
+
+    mask_regions = None
+    if args.mask is not None:
+        try:
+            mask_regions = [Region.parse(args.mask)]
+        except ValueError:
+            print(f"[ERROR] マスク領域の形式が不正です: {args.mask}")
+            return 1
+
+    state_manager = StateManager(
+        EventLog(args.event_log),
+        cooldown_seconds=args.cooldown,
+        required_consecutive=args.required_consecutive,
+        none_required_seconds=args.none_required_seconds,
+    )
+    params = ScanParams(coarse_interval=args.coarse_interval, fine_interval=args.fine_interval, refine_after=args.refine_after)
+
+    started = time.perf_counter()
+    if args.workers > 1:
+        scanner = scan_sharded(args, params, mask_regions, state_manager)
+    else:
+        print("[INFO] CNN推論モジュールを初期化中...")
+        predictor = VictoryPredictor(model_path=args.model, crop_region=DEFAULT_CROP, image_size=args.size, mask_regions=mask_regions)
+        print(f"[INFO] Device: {predictor.device}")
+        scanner = VodScanner(predictor.predict, params)
+        for path in args.videos:
+            with VideoReader(path, seek_seconds=args.seek_seconds) as reader:
+                origin = parse_timestamp(args.start_time) if args.start_time else video_start_us(path, reader.duration)
+                print(f"[INFO] {path.name}: {reader.duration / 3600:.2f} 時間 ({reader.fps:.0f} fps) 開始 {format_timestamp(origin)}")
+                before = state_manager.summary.total
+                video_started = time.perf_counter()
+                for _ in scanner.scan(reader, state=state_manager, origin_us=origin, note=f"vod:{path.name}"):
+                    pass
+                elapsed = time.perf_counter() - video_started
+                count = print_events(state_manager, before, origin)
+                print(
+                    f"[INFO] {path.name}: {count} 試合 / {elapsed:.1f} 秒 "
+                    f"（デコード {reader.decoded} フレーム、読み飛ばし {reader.grabbed}、シーク {reader.seeks}）"
+                )
+
+    stats = scanner.stats
+    summary = state_manager.summary
+    print(
+        f"[INFO] 合計: 動画 {stats.video_seconds / 3600:.2f} 時間を {time.perf_counter() - started:.1f} 秒で処理 "
+        f"（{stats.video_hours_per_minute:.2f} 動画時間/分、推論 {stats.predicted} 回、見直し {stats.refined_windows} 回、"
+        f"クールダウンで読み飛ばし {stats.skipped_seconds / 3600:.2f} 時間）"
+    )
+    print(f"[INFO] カウント: Victory={summary.victories}, Defeat={summary.defeats}, Draw={summary.draws}")
+    return 0
+
+
+def scan_sharded(args: argparse.Namespace, params: ScanParams, mask_regions: list[Region] | None, state_manager: StateManager) -> ShardedVodScanner:
+    """動画を区間に分けて並列に走査し、時刻順にまとめた判定を状態機械へ流す。"""
+
+    videos: list[tuple[Path, float]] = []
+    origins: list[int] = []
+    for path in args.videos:
+        with VideoReader(path) as reader:
+            duration = reader.duration
+        origin = parse_timestamp(args.start_time) if args.start_time else video_start_us(path, duration)
+        print(f"[INFO] {path.name}: {duration / 3600:.2f} 時間 開始 {format_timestamp(origin)}")
+        videos.append((path, duration))
+        origins.append(origin)
+
+    factory = functools.partial(load_predict, args.model, args.size, mask_regions, args.threads_per_worker)
+    scanner = ShardedVodScanner(factory, params, workers=args.workers, shard_seconds=args.shard_minutes * 60, seek_seconds=args.seek_seconds)
+    print(f"[INFO] {args.workers} プロセスで {args.shard_minutes:g} 分ずつの区間に分けて走査します")
+
+    current = -1
+    before = 0
+    for shard, sample in scanner.scan(videos):
+        if shard.video != current:
+            if current >= 0:
+                count = print_events(state_manager, before, origins[current])
+                print(f"[INFO] {args.videos[current].name}: {count} 試合")
+            current = shard.video
+            before = state_manager.summary.total
+        feed_sample(state_manager, sample, origins[current], note=f"vod:{args.videos[current].name}")
+    if current >= 0:
+        count = print_events(state_manager, before, origins[current])
+        print(f"[INFO] {args.videos[current].name}: {count} 試合")
+    return scanner
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""生の BGR フレームを共有メモリのリングバッファへ書き込む参照実装。
+
+動画ファイル（実時間のペースで再生）または画面キャプチャ（``mss`` が必要）から
+フレームを読み、エンコードせずにリングバッファへコピーする。検知側は
+``run_capture_monitor_ws.py --shm NAME`` で読む。
+
+利用方法:
+    uv run python scripts/shm_producer.py --name victory-frames --input recordings/match.mp4 --loop
+    uv run python scripts/shm_producer.py --name victory-frames --screen 1 --fps 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Iterator
+
+import cv2
+import numpy as np
+
+from victory_detector.capture.shm import FrameRingWriter
+
+try:  # pragma: no cover - インストール状況に依存
+    import mss  # type: ignore
+except ImportError:  # pragma: no cover
+    mss = None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Write raw BGR frames into a shared-memory ring buffer.")
+    parser.add_argument("--name", default="victory-frames", help="共有メモリの名前")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--input", type=Path, help="入力の動画ファイル")
+    group.add_argument("--screen", type=int, help="キャプチャするモニター番号（mss の monitors の添字、1 がプライマリ）")
+    parser.add_argument("--fps", type=float, default=None, help="書き込みレート（動画の既定は動画の fps、画面の既定は 30）")
+    parser.add_argument("--slots", type=int, default=8, help="リングバッファのスロット数（検知側のキュー長より大きくする）")
+    parser.add_argument("--loop", action="store_true", help="動画の終わりに達したら先頭から繰り返す")
+    return parser.parse_args()
+
+
+def video_frames(path: Path, loop: bool) -> Iterator[np.ndarray]:
+    capture = cv2.VideoCapture(str(path))
+    try:
+        while True:
+            ok, image = capture.read()
+            if not ok:
+                if not loop:
+                    return
+                capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            yield image
+    finally:
+        capture.release()
+
+
+def screen_frames(monitor: int) -> Iterator[np.ndarray]:
+    with mss.mss() as grabber:
+        area = grabber.monitors[monitor]
+        while True:
+            # BGRA のうち BGR だけを切り出したビュー（コピーは書き込み時の 1 回のみ）
+            yield np.asarray(grabber.grab(area))[:, :, :3]
+
+
+def main() -> int:
+    args = parse_args()
+
+    if args.input is not None:
+        capture = cv2.VideoCapture(str(args.input))
+        if not capture.isOpened():
+            print(f"[ERROR] 動画を開けません: {args.input}")
+            return 1
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = args.fps or capture.get(cv2.CAP_PROP_FPS) or 30.0
+        capture.release()
+        frames = video_frames(args.input, args.loop)
+    else:
+        if mss is None:
+            print("[ERROR] 画面キャプチャには mss が必要です（pip install mss）")
+            return 1
+        with mss.mss() as grabber:
+            if not 0 < args.screen < len(grabber.monitors):
+                print(f"[ERROR] モニター番号が不正です: {args.screen}")
+                return 1
+            area = grabber.monitors[args.screen]
+        width, height = area["width"], area["height"]
+        fps = args.fps or 30.0
+        frames = screen_frames(args.screen)
+
+    try:
+        writer = FrameRingWriter(args.name, width, height, slots=args.slots)
+    except FileExistsError:
+        print(f"[ERROR] 共有メモリ {args.name} は既に存在します（前回の実行が残っている場合は削除してください）")
+        return 1
+    print(f"[INFO] 共有メモリ {writer.name}: {width}x{height} × {args.slots} スロット、{fps:g} fps で書き込みます。Ctrl+C で終了します。")
+
+    interval = 1.0 / fps
+    next_write = time.monotonic()
+    started = time.perf_counter()
+    try:
+        for image in frames:
+            delay = next_write - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_write = max(next_write + interval, time.monotonic() - interval)
+            writer.write(image)
+    except KeyboardInterrupt:
+        print("\n[INFO] 書き込みを終了します。")
+    finally:
+        elapsed = time.perf_counter() - started
+        print(f"[INFO] {writer.sequence} フレームを書き込みました（{writer.sequence / max(elapsed, 1e-9):.1f} fps）")
+        writer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+"""クールダウン・連続検知・キャプチャ間隔のパラメータ探索スクリプト。
+
+録画済みトレースを各パラメータの組で再生し（`victory_detector.core.replay`）、
+正しくカウントできた割合と、勝敗画面の表示からカウント確定までの平均遅延で順位付けする。
+上位の組を `run_capture_monitor_ws.py` の既定値の見直しに使う。
+
+正解データは `--ground-truth` で順に指定するか、トレースと同じ場所の `<名前>.truth.jsonl` を使う。
+
+利用方法:
+    uv run python scripts/sweep_parameters.py traces/*.jsonl --cooldown 120,150,180 --required 1,2,3 --none-required 10,30,50 --interval 0.25,0.5,1.0
+    uv run python scripts/sweep_parameters.py traces/*.jsonl --random 200 --cooldown 60,240 --none-required 5,80 --interval 0.1,2.0
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import time
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+
+from victory_detector.core.replay import ReplayParams, SweepResult, grid_points, random_points, sweep
+
+DEFAULT_PARAMS = ReplayParams()
+T = TypeVar("T")
+
+
+def _list(cast: Callable[[str], T]) -> Callable[[str], list[T]]:
+    def parse(value: str) -> list[T]:
+        return [cast(item) for item in value.split(",") if item.strip()]
+
+    return parse
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sweep counter state machine parameters over recorded traces.")
+    parser.add_argument("traces", type=Path, nargs="+", help="フレームごとの判定結果（JSONL、または --trace-dir のバイナリトレース）")
+    parser.add_argument("--ground-truth", type=Path, nargs="+", default=None, help="各トレースの正解データ（トレースと同じ順）")
+    parser.add_argument("--cooldown", type=_list(float), default=[DEFAULT_PARAMS.cooldown_seconds], help="クールダウン時間の候補（秒、カンマ区切り）")
+    parser.add_argument("--required", type=_list(int), default=[DEFAULT_PARAMS.required_consecutive], help="連続検知回数の候補（カンマ区切り）")
+    parser.add_argument("--none-required", type=_list(int), default=[DEFAULT_PARAMS.none_required_consecutive], help="none 連続回数の候補（カンマ区切り）")
+    parser.add_argument("--none-seconds", type=_list(float), default=None, help="none 継続時間の候補（秒、カンマ区切り）。指定時は none 連続回数の代わりに使う")
+    parser.add_argument("--interval", type=_list(float), default=None, help="キャプチャ間隔の候補（秒、カンマ区切り）。未指定時はトレースのまま")
+    parser.add_argument("--random", type=int, default=None, help="総当たりの代わりに候補の最小〜最大から指定数をランダムに探索する")
+    parser.add_argument("--seed", type=int, default=None, help="ランダム探索の乱数シード")
+    parser.add_argument("--workers", type=int, default=None, help="並列プロセス数（既定: CPU 数）")
+    parser.add_argument("--tolerance", type=float, default=30.0, help="正解の試合とイベントを対応付ける時間幅（秒）")
+    parser.add_argument("--top", type=int, default=20, help="表示する上位件数")
+    parser.add_argument("--csv", type=Path, default=None, help="全結果の CSV 出力先")
+    return parser.parse_args()
+
+
+def _format_interval(value: Optional[float]) -> str:
+    return "trace" if value is None else f"{value:g}"
+
+
+def _format_latency(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:g}"
+
+
+def _write_csv(path: Path, results: list[SweepResult]) -> None:
+    with path.open("w", newline="", encoding="utf-8") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(
+            ["rank", "cooldown", "required", "none_required", "none_seconds", "interval", "accuracy", "mean_latency",
+             "matches", "hits", "missed", "mislabeled", "double_counts", "false_positives"]
+        )
+        for rank, result in enumerate(results, start=1):
+            params = result.point.params
+            writer.writerow(
+                [rank, params.cooldown_seconds, params.required_consecutive, params.none_required_consecutive, params.none_required_seconds or "",
+                 _format_interval(result.point.interval), f"{result.accuracy:.4f}", _format_latency(result.mean_latency),
+                 result.matches, result.hits, result.missed, result.mislabeled, result.double_counts, result.false_positives]
+            )
+
+
+def main() -> int:
+    args = parse_args()
+    truths = args.ground_truth or [path.with_name(f"{path.stem}.truth.jsonl") for path in args.traces]
+    if len(truths) != len(args.traces):
+        print("[ERROR] --ground-truth はトレースと同じ数だけ指定してください")
+        return 1
+    missing = [str(path) for path in [*args.traces, *truths] if not path.exists()]
+    if missing:
+        print(f"[ERROR] ファイルが見つかりません: {', '.join(missing)}")
+        return 1
+
+    intervals: list[Optional[float]] = args.interval or [None]
+    none_seconds: list[Optional[float]] = args.none_seconds or [None]
+    if args.random:
+        points = random_points(args.random, args.cooldown, args.required, args.none_required, intervals, args.seed, none_seconds)
+    else:
+        points = grid_points(args.cooldown, args.required, args.none_required, intervals, none_seconds)
+    print(f"[INFO] traces={len(args.traces)} combinations={len(points)} workers={args.workers or 'auto'}")
+
+    started = time.perf_counter()
+    results = sweep(list(zip(args.traces, truths)), points, workers=args.workers, tolerance_seconds=args.tolerance)
+    print(f"[INFO] {len(points)} 組を {time.perf_counter() - started:.1f} 秒で評価しました")
+
+    print(f"{'rank':>4} {'cooldown':>8} {'req':>4} {'none':>5} {'none_s':>6} {'interval':>8} {'accuracy':>9} {'latency(s)':>10} "
+          f"{'hit':>5} {'miss':>5} {'wrong':>5} {'double':>6} {'false':>5}")
+    for rank, result in enumerate(results[: args.top], start=1):
+        params = result.point.params
+        print(
+            f"{rank:>4} {params.cooldown_seconds:>8g} {params.required_consecutive:>4} {params.none_required_consecutive:>5} "
+            f"{_format_seconds(params.none_required_seconds):>6} "
+            f"{_format_interval(result.point.interval):>8} {result.accuracy:>9.3f} {_format_latency(result.mean_latency):>10} "
+            f"{result.hits:>5} {result.missed:>5} {result.mislabeled:>5} {result.double_counts:>6} {result.false_positives:>5}"
+        )
+
+    if results:
+        best = results[0]
+        params = best.point.params
+        flags = f"--cooldown {params.cooldown_seconds:g} --required-consecutive {params.required_consecutive} --none-required {params.none_required_consecutive}"
+        if params.none_required_seconds is not None:
+            flags += f" --none-required-seconds {params.none_required_seconds:g}"
+        if best.point.interval is not None:
+            flags += f" --interval {best.point.interval:g}"
+        print(f"[INFO] 推奨設定（run_capture_monitor_ws.py）: {flags}")
+    if args.csv:
+        _write_csv(args.csv, results)
+        print(f"[INFO] CSV を書き出しました: {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,7 @@
+"""キャプチャループ周辺のユーティリティ（torch に依存しない）。"""
+
+from __future__ import annotations
+
+from .trace import TraceFile, TraceRecorder, open_trace, read_traces
+
+__all__ = ["TraceFile", "TraceRecorder", "open_trace", "read_traces"]
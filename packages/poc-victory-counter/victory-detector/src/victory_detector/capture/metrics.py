@@ -0,0 +1,251 @@
+"""段ごとの所要時間の計測と定期的な集計。
+
+パイプラインの各段（取得・デコード・推論・状態更新）と、段の中の細かい処理
+（base64、画像デコード、前処理、forward など）の所要時間を
+``time.perf_counter_ns()`` で測り、名前ごとの対数ヒストグラムに積む。
+ヒストグラムは ``MetricsReporter.collect()`` のたびに入れ替わるため、
+集計は直近の区間（ローリングウィンドウ）の p50 / p95 / 最大になる。
+
+集計結果（``MetricsSnapshot``）は 1 行のログにでき、``add_hook()`` で登録した
+関数（JSONL への書き出しや外部の監視への送信など）にも渡される。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from victory_detector.core import codec
+
+from .pipeline import Pipeline
+
+logger = logging.getLogger(__name__)
+
+# 2 のべき乗ごとのバケットの分割数（相対誤差は約 1 / 2**SUB_BITS）
+SUB_BITS = 3
+
+MetricsHook = Callable[["MetricsSnapshot"], None]
+
+
+def _bucket(ns: int) -> int:
+    shift = max(0, ns.bit_length() - SUB_BITS - 1)
+    return (shift << SUB_BITS) + (ns >> shift)
+
+
+def _bucket_value(index: int) -> int:
+    """バケットの代表値（区間の中央、ns）。"""
+
+    shift = max(0, (index >> SUB_BITS) - 1)
+    lower = (index - (shift << SUB_BITS)) << shift
+    return lower + ((1 << shift) >> 1)
+
+
+class Histogram:
+    """ns 単位の所要時間の対数ヒストグラム。
+
+    値は 2 のべき乗ごとに ``2**SUB_BITS`` 個のバケットへ数えるだけなので、
+    記録は辞書の更新 1 回で済み、分位点は約 12% の誤差で求まる。
+    """
+
+    __slots__ = ("buckets", "count", "total_ns", "max_ns")
+
+    def __init__(self) -> None:
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int) -> None:
+        ns = max(0, ns)
+        index = _bucket(ns)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def merge(self, other: "Histogram") -> None:
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def quantile(self, q: float) -> int:
+        """``q``（0〜1）分位点の近似値（ns）。記録がなければ 0。"""
+
+        if self.count == 0:
+            return 0
+        if q >= 1.0:
+            return self.max_ns
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(_bucket_value(index), self.max_ns)
+        return self.max_ns
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.0
+
+
+class StageTimers:
+    """名前ごとの所要時間を直近の区間のヒストグラムに積む。
+
+    記録と ``roll()`` は同じロックの下で行うため、区間の境目の記録も必ず
+    どちらか一方の区間に入る（集計中の区間へ後から書き込まれることはない）。
+    ロックは記録 1 回につき 1 度取るだけで、競合はほとんどない。
+    """
+
+    def __init__(self) -> None:
+        self._window: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, ns: int) -> None:
+        with self._lock:
+            histogram = self._window.get(name)
+            if histogram is None:
+                histogram = self._window[name] = Histogram()
+            histogram.record(ns)
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - started)
+
+    def roll(self) -> dict[str, Histogram]:
+        """現在の区間のヒストグラムを返し、新しい区間を始める。"""
+
+        with self._lock:
+            window, self._window = self._window, {}
+        return window
+
+
+@dataclass(slots=True)
+class StageSummary:
+    name: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+
+    @classmethod
+    def from_histogram(cls, name: str, histogram: Histogram) -> "StageSummary":
+        return cls(
+            name,
+            histogram.count,
+            histogram.quantile(0.5) / 1e6,
+            histogram.quantile(0.95) / 1e6,
+            histogram.max_ns / 1e6,
+        )
+
+
+@dataclass(slots=True)
+class MetricsSnapshot:
+    """直近の区間の集計。"""
+
+    timestamp: float
+    elapsed: float
+    frames: int
+    fps: float
+    dropped: int
+    missed_ticks: int
+    errors: int
+    stages: list[StageSummary] = field(default_factory=list)
+
+    def format(self) -> str:
+        """1 行にまとめる（ログ出力用）。"""
+
+        parts = [
+            f"{self.fps:.2f}fps frames={self.frames} drop={self.dropped} "
+            f"missed={self.missed_ticks} err={self.errors}"
+        ]
+        for stage in self.stages:
+            parts.append(
+                f"{stage.name} p50={stage.p50_ms:.1f} p95={stage.p95_ms:.1f} "
+                f"max={stage.max_ms:.1f}ms"
+            )
+        return " | ".join(parts)
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class MetricsReporter:
+    """パイプラインの統計と StageTimers を区間ごとに集計し、フックへ渡す。
+
+    ``order`` に並べた名前はその順に、それ以外は名前順に表示する。
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        timers: StageTimers,
+        order: Optional[list[str]] = None,
+    ) -> None:
+        self.pipeline = pipeline
+        self.timers = timers
+        self.order = order or []
+        self._hooks: list[MetricsHook] = []
+        self._last = time.monotonic()
+        self._frames = 0
+        self._dropped = 0
+        self._missed = 0
+        self._errors = 0
+
+    def add_hook(self, hook: MetricsHook) -> None:
+        self._hooks.append(hook)
+
+    def collect(self) -> MetricsSnapshot:
+        """前回の collect() からの集計を返し、フックを呼ぶ。"""
+
+        now = time.monotonic()
+        stats = self.pipeline.stats()
+        frames = stats.stages[-1].processed
+        dropped = sum(stage.dropped for stage in stats.stages)
+        errors = sum(stage.errors for stage in stats.stages)
+        elapsed = now - self._last
+        window = self.timers.roll()
+        names = [name for name in self.order if name in window]
+        names += sorted(name for name in window if name not in self.order)
+        snapshot = MetricsSnapshot(
+            timestamp=time.time(),
+            elapsed=elapsed,
+            frames=frames - self._frames,
+            fps=(frames - self._frames) / elapsed if elapsed > 0 else 0.0,
+            dropped=dropped - self._dropped,
+            missed_ticks=stats.missed_ticks - self._missed,
+            errors=errors - self._errors,
+            stages=[StageSummary.from_histogram(name, window[name]) for name in names],
+        )
+        self._last = now
+        self._frames, self._dropped = frames, dropped
+        self._missed, self._errors = stats.missed_ticks, errors
+        for hook in self._hooks:
+            try:
+                hook(snapshot)
+            except Exception:  # noqa: BLE001 - フックの失敗でキャプチャを止めない
+                logger.exception("metrics hook failed")
+        return snapshot
+
+
+class JsonlMetricsHook:
+    """集計を 1 行 1 JSON で追記するフック。"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, snapshot: MetricsSnapshot) -> None:
+        with self.path.open("ab") as handle:
+            handle.write(codec.dumps(snapshot.as_dict()) + b"\n")
@@ -0,0 +1,295 @@
+"""asyncio で obs-websocket 5.x に複数のスクリーンショット要求を並行に投げるクライアント。
+
+同期の ``obsws_python.ReqClient`` は要求ごとに往復を待つため、取得レートが
+ネットワークと OBS の往復時間で頭打ちになる。本クライアントは ``in_flight`` 件の
+GetSourceScreenshot を常に投げておき、応答を requestId の順に並べ直して
+上限付きのフレームキューへ入れる。取得レートは OBS の描画・エンコード時間で決まる。
+
+イベントループは専用スレッドで動かし、パイプラインの取得段からは
+``frames.get()`` で受け取る。``websockets`` が必要。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from victory_detector.core import codec
+from victory_detector.core.state import utcnow_us
+
+from .pipeline import Captured, DropOldestQueue
+from .screenshot import ScreenshotOptions
+
+try:  # pragma: no cover - インストール状況に依存
+    import websockets  # type: ignore
+except ImportError:  # pragma: no cover
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+SUBPROTOCOL = "obswebsocket.json"
+RPC_VERSION = 1
+
+# obs-websocket の op コード
+OP_HELLO = 0
+OP_IDENTIFY = 1
+OP_IDENTIFIED = 2
+OP_REQUEST = 6
+OP_REQUEST_RESPONSE = 7
+
+
+class ObsError(RuntimeError):
+    """obs-websocket がエラーを返した、または接続が確立できなかった。"""
+
+
+def auth_string(password: str, salt: str, challenge: str) -> str:
+    """Hello の salt / challenge から Identify の authentication を作る。"""
+
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode()).digest())
+    return base64.b64encode(
+        hashlib.sha256(secret + challenge.encode()).digest()
+    ).decode()
+
+
+@dataclass(slots=True)
+class _Pending:
+    timestamp: int
+    image_data: Optional[str] = None
+    done: bool = False
+
+
+class AsyncScreenshotClient:
+    """``in_flight`` 件のスクリーンショット要求を投げ続け、順番どおりにキューへ入れる。"""
+
+    def __init__(
+        self,
+        source: str,
+        options: ScreenshotOptions = ScreenshotOptions(),
+        host: str = "127.0.0.1",
+        port: int = 4455,
+        password: str = "",
+        in_flight: int = 2,
+        queue_size: int = 2,
+        interval: float = 0.0,
+    ) -> None:
+        """
+        Args:
+            in_flight: 同時に応答待ちにしておく要求の数
+            queue_size: 受け取ったフレームのキュー長（溢れたら古いものを捨てる）
+            interval: 要求を送る最小間隔（秒）。0 なら応答が返りしだい次を送る。
+                実行中に変更でき、AdaptiveRate の出力をそのまま設定できる。
+        """
+
+        if websockets is None:
+            raise RuntimeError("websockets is required for AsyncScreenshotClient")
+        if in_flight < 1:
+            raise ValueError("in_flight must be >= 1")
+        self.url = f"ws://{host}:{port}"
+        self.source = source
+        self.options = options
+        self.password = password
+        self.in_flight = in_flight
+        self._interval = interval
+        self.frames: DropOldestQueue[Captured] = DropOldestQueue(queue_size)
+        self.sent = 0
+        self.received = 0
+        self.failed = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        # 間隔の変更で送信の待ちを起こすイベント（イベントループ内で作る）
+        self._wake: Optional[asyncio.Event] = None
+
+    # --- スレッドからの操作 -------------------------------------------------
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    @interval.setter
+    def interval(self, value: float) -> None:
+        """要求の間隔を変更する。送信を待っている最中なら新しい間隔で数え直す。"""
+
+        if value == self._interval:
+            return
+        self._interval = value
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    def start(self, timeout: float = 10.0) -> "AsyncScreenshotClient":
+        """専用スレッドで接続し、Identify が終わるまで待つ。"""
+
+        self._thread = threading.Thread(
+            target=self._run_thread, name="obsws-async", daemon=True
+        )
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            self.stop()
+            raise ObsError(f"connection to {self.url} timed out")
+        if self._error is not None:
+            raise ObsError(str(self._error)) from self._error
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(task.cancel)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.frames.close()
+
+    def get(self, timeout: Optional[float] = 1.0) -> Optional[Captured]:
+        """次のフレーム（取得時刻と base64 の画像データ）。なければ None。"""
+
+        return self.frames.get(timeout)
+
+    def __enter__(self) -> "AsyncScreenshotClient":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _run_thread(self) -> None:
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            self._task = loop.create_task(self.run())
+            loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as exc:  # noqa: BLE001 - start() 側へ伝える
+            self._error = exc
+            logger.exception("obs-websocket client stopped")
+        finally:
+            self._ready.set()
+            self.frames.close()
+            loop.close()
+
+    # --- イベントループ内 ---------------------------------------------------
+
+    async def run(self) -> None:
+        async with websockets.connect(
+            self.url, subprotocols=[SUBPROTOCOL], max_size=None
+        ) as ws:
+            await self._identify(ws)
+            self._ready.set()
+            await self._pump(ws)
+
+    async def _identify(self, ws: Any) -> None:
+        hello = codec.loads(await ws.recv())
+        if hello.get("op") != OP_HELLO:
+            raise ObsError(f"unexpected message before Hello: {hello}")
+        identify: dict[str, Any] = {
+            "rpcVersion": RPC_VERSION,
+            "eventSubscriptions": 0,
+        }
+        auth = hello["d"].get("authentication")
+        if auth:
+            identify["authentication"] = auth_string(
+                self.password, auth["salt"], auth["challenge"]
+            )
+        await ws.send(codec.dumps({"op": OP_IDENTIFY, "d": identify}).decode())
+        identified = codec.loads(await ws.recv())
+        if identified.get("op") != OP_IDENTIFIED:
+            raise ObsError(f"identify failed: {identified}")
+
+    async def _pump(self, ws: Any) -> None:
+        """送信と受信を並行に回す。応答は送信順（requestId 順）にキューへ入れる。"""
+
+        pending: dict[int, _Pending] = {}
+        slots = asyncio.Semaphore(self.in_flight)
+        next_emit = 1
+
+        wake = self._wake = asyncio.Event()
+
+        async def sender() -> None:
+            # 直前の要求の予定時刻。次の要求はここから interval 後に送る
+            scheduled: Optional[float] = None
+            request_id = 0
+            while True:
+                await slots.acquire()
+                while scheduled is not None and self._interval > 0:
+                    delay = scheduled + self._interval - time.monotonic()
+                    if delay <= 0:
+                        break
+                    wake.clear()
+                    try:
+                        # 間隔が変わったら起きて待ち時間を数え直す
+                        await asyncio.wait_for(wake.wait(), delay)
+                    except asyncio.TimeoutError:
+                        break
+                now = time.monotonic()
+                if scheduled is None or self._interval <= 0:
+                    scheduled = now
+                else:
+                    scheduled = max(scheduled + self._interval, now)
+                request_id += 1
+                pending[request_id] = _Pending(utcnow_us())
+                await ws.send(self._request(request_id))
+                self.sent += 1
+
+        async def receiver() -> None:
+            nonlocal next_emit
+            async for message in ws:
+                payload = codec.loads(message)
+                if payload.get("op") != OP_REQUEST_RESPONSE:
+                    continue
+                data = payload["d"]
+                try:
+                    request_id = int(data["requestId"])
+                except (KeyError, ValueError):
+                    continue
+                item = pending.get(request_id)
+                if item is None:
+                    continue
+                item.done = True
+                status = data.get("requestStatus", {})
+                if status.get("result"):
+                    response = data.get("responseData") or {}
+                    item.image_data = response.get("imageData")
+                    self.received += 1
+                else:
+                    self.failed += 1
+                    logger.warning("screenshot request failed: %s", status)
+                slots.release()
+                # 前の要求の応答がそろった分だけ順番に出す
+                while (head := pending.get(next_emit)) is not None and head.done:
+                    del pending[next_emit]
+                    next_emit += 1
+                    if head.image_data:
+                        self.frames.put(Captured(head.timestamp, head.image_data))
+
+        send_task = asyncio.ensure_future(sender())
+        try:
+            await receiver()
+        finally:
+            send_task.cancel()
+
+    def _request(self, request_id: int) -> str:
+        options = self.options
+        return codec.dumps(
+            {
+                "op": OP_REQUEST,
+                "d": {
+                    "requestType": "GetSourceScreenshot",
+                    "requestId": str(request_id),
+                    "requestData": {
+                        "sourceName": self.source,
+                        "imageFormat": options.format,
+                        "imageWidth": options.width,
+                        "imageHeight": options.height,
+                        "imageCompressionQuality": options.quality,
+                    },
+                },
+            }
+        ).decode()
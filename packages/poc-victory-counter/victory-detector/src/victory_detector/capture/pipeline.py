@@ -0,0 +1,354 @@
+"""スレッドとキューで段階ごとに並行動作させるキャプチャパイプライン。
+
+取得（ネットワーク I/O）→ デコード → 推論 → 状態更新 の各段を別スレッドで動かし、
+段の間を上限付きのキューでつなぐ。キューが満杯のときは最も古いフレームを捨てる
+（drop-oldest）ため、遅い段があっても古いフレームが溜まり続けることはなく、
+取得から状態更新までの遅延はキュー長で抑えられる。
+
+動画ファイルなどのオフラインのソースでは ``lossless=True`` とし、キューが満杯なら
+捨てずに待つ。取得段が ``EndOfStream`` を送出すると、残りのフレームを処理し終えた
+ところでパイプラインが止まる。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generic,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from victory_detector.core.state import utcnow_us
+
+from .scheduler import FixedRateScheduler
+
+if TYPE_CHECKING:
+    from .metrics import StageTimers
+
+T = TypeVar("T")
+
+DEFAULT_QUEUE_SIZE = 2
+
+logger = logging.getLogger(__name__)
+
+
+class EndOfStream(Exception):
+    """取得段が送出し、これ以上フレームがないことを知らせる。"""
+
+
+class DropOldestQueue(Generic[T]):
+    """上限付きのキュー。満杯で put すると最も古い要素を捨てる（put はブロックしない）。"""
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self._items: deque[T] = deque()
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item: T, block: bool = False) -> Optional[T]:
+        """要素を追加し、押し出した要素があれば返す。
+
+        ``block=True`` なら満杯のときは捨てずに空きを待つ（close() されたら捨てる）。
+        """
+
+        with self._cond:
+            evicted = None
+            if block:
+                while len(self._items) >= self._maxsize and not self._closed:
+                    self._cond.wait()
+            if len(self._items) >= self._maxsize:
+                evicted = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+            return evicted
+
+    def get(self, timeout: Optional[float] = None) -> Optional[T]:
+        """要素を取り出す。タイムアウトまたは close() 後に空なら None。"""
+
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+@dataclass(slots=True)
+class Frame:
+    """パイプラインを流れる 1 フレーム。``payload`` は段ごとに置き換わる。"""
+
+    seq: int
+    timestamp: int
+    started: float
+    payload: Any = None
+
+
+@dataclass(slots=True)
+class Captured:
+    """取得時刻付きのフレームの中身。
+
+    取得段がこれを返すと、呼び出し時刻の代わりに ``timestamp`` をフレームの時刻に使う
+    （取得を別スレッドで先行させるソースや、動画ファイルのように時刻を持つソース向け）。
+    """
+
+    timestamp: int
+    payload: Any
+
+
+@dataclass(slots=True)
+class Stage:
+    """パイプラインの 1 段。
+
+    先頭の段の ``func`` は引数なしで呼ばれ、フレームの中身を返す（None なら
+    そのフレームはなし）。2 段目以降は Frame を受け取り、次の段へ渡す中身を返す
+    （None ならそのフレームを捨てる）。最後の段の戻り値は成否の集計にのみ使う。
+    """
+
+    name: str
+    func: Callable[..., Any]
+    processed: int = 0
+    skipped: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+
+
+@dataclass(slots=True)
+class StageStats:
+    name: str
+    processed: int
+    skipped: int
+    errors: int
+    busy_seconds: float
+    depth: int = 0
+    dropped: int = 0
+
+
+@dataclass(slots=True)
+class PipelineStats:
+    stages: list[StageStats] = field(default_factory=list)
+    latency_last: Optional[float] = None
+    latency_max: Optional[float] = None
+    ticks: int = 0
+    missed_ticks: int = 0
+    achieved_rate: Optional[float] = None
+
+    def format(self) -> str:
+        """キュー長・破棄数・遅延を 1 行にまとめる（ログ出力用）。"""
+
+        parts = []
+        for stage in self.stages:
+            parts.append(
+                f"{stage.name}[q={stage.depth} drop={stage.dropped} "
+                f"ok={stage.processed} err={stage.errors}]"
+            )
+        rate = f"{self.achieved_rate:.2f}/s" if self.achieved_rate is not None else "-"
+        parts.append(f"rate={rate} missed={self.missed_ticks}")
+        if self.latency_last is not None and self.latency_max is not None:
+            parts.append(
+                f"latency={self.latency_last * 1e3:.0f}ms"
+                f"(max {self.latency_max * 1e3:.0f}ms)"
+            )
+        return " ".join(parts)
+
+
+class Pipeline:
+    """段ごとのスレッドと drop-oldest キューからなるパイプライン。"""
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        interval: float = 0.0,
+        lossless: bool = False,
+        timers: Optional["StageTimers"] = None,
+    ) -> None:
+        """
+        Args:
+            stages: 先頭が取得段、以降が処理段
+            queue_size: 段の間のキューの上限
+            interval: 取得段の呼び出し間隔（秒）。呼び出しの開始時刻どうしの間隔で、
+                取得が間に合わなかった回は飛ばして数える（FixedRateScheduler）。
+            lossless: True ならキューが満杯のとき古いフレームを捨てずに待つ
+                （オフラインのソースで全フレームを処理する場合）。
+            timers: 指定すると各段の所要時間を段の名前で、取得から最後の段までの
+                遅延を ``latency`` として記録する（``capture.metrics``）。
+        """
+
+        if len(stages) < 1:
+            raise ValueError("pipeline needs at least one stage")
+        self._stages = list(stages)
+        self._queues: list[DropOldestQueue[Frame]] = [
+            DropOldestQueue(queue_size) for _ in self._stages[1:]
+        ]
+        self._lossless = lossless
+        self.timers = timers
+        self._stop = threading.Event()
+        self.scheduler = FixedRateScheduler(interval, self._stop)
+        self._threads: list[threading.Thread] = []
+        self._seq = 0
+        self._latency_last: Optional[float] = None
+        self._latency_max: Optional[float] = None
+
+    def start(self) -> "Pipeline":
+        if self._threads:
+            return self
+        self._stop.clear()
+        self._threads.append(
+            threading.Thread(
+                target=self._run_source,
+                name=f"stage:{self._stages[0].name}",
+                daemon=True,
+            )
+        )
+        for index, stage in enumerate(self._stages[1:]):
+            self._threads.append(
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(index,),
+                    name=f"stage:{stage.name}",
+                    daemon=True,
+                )
+            )
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self.scheduler.wake()
+        for queue in self._queues:
+            queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def __enter__(self) -> "Pipeline":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """stop() されるか、ソースの終わりまで処理し終えるまで待つ。停止していれば True。"""
+
+        return self._stop.wait(timeout)
+
+    def stats(self) -> PipelineStats:
+        stats = PipelineStats(
+            latency_last=self._latency_last,
+            latency_max=self._latency_max,
+            ticks=self.scheduler.ticks,
+            missed_ticks=self.scheduler.missed,
+            achieved_rate=self.scheduler.achieved_rate,
+        )
+        for index, stage in enumerate(self._stages):
+            item = StageStats(
+                stage.name,
+                stage.processed,
+                stage.skipped,
+                stage.errors,
+                stage.busy_seconds,
+            )
+            if index > 0:
+                queue = self._queues[index - 1]
+                item.depth = len(queue)
+                item.dropped = queue.dropped
+            stats.stages.append(item)
+        return stats
+
+    def _call(self, stage: Stage, *args: Any) -> Any:
+        started = time.perf_counter_ns()
+        try:
+            result = stage.func(*args)
+        except EndOfStream:
+            raise
+        except Exception:  # noqa: BLE001 - 1 フレームの失敗でパイプラインを止めない
+            stage.errors += 1
+            logger.exception("pipeline stage %s failed", stage.name)
+            result = None
+        elapsed = time.perf_counter_ns() - started
+        stage.busy_seconds += elapsed / 1e9
+        if self.timers is not None:
+            self.timers.record(stage.name, elapsed)
+        if result is None:
+            stage.skipped += 1
+        else:
+            stage.processed += 1
+        return result
+
+    def _emit(self, index: int, frame: Frame) -> None:
+        if index < len(self._queues):
+            self._queues[index].put(frame, block=self._lossless)
+            return
+        latency = time.monotonic() - frame.started
+        self._latency_last = latency
+        if self._latency_max is None or latency > self._latency_max:
+            self._latency_max = latency
+        if self.timers is not None:
+            self.timers.record("latency", int(latency * 1e9))
+
+    def _run_source(self) -> None:
+        stage = self._stages[0]
+        while self.scheduler.wait():
+            started = time.monotonic()
+            timestamp = utcnow_us()
+            try:
+                payload = self._call(stage)
+            except EndOfStream:
+                self._finish(0)
+                return
+            if isinstance(payload, Captured):
+                timestamp, payload = payload.timestamp, payload.payload
+            if payload is not None:
+                self._seq += 1
+                self._emit(0, Frame(self._seq, timestamp, started, payload))
+
+    def _finish(self, index: int) -> None:
+        """``index`` 番目の段が終わった。後段へ終わりを伝え、最後なら停止する。"""
+
+        if index < len(self._queues):
+            self._queues[index].close()
+        else:
+            self._stop.set()
+
+    def _run_stage(self, index: int) -> None:
+        stage = self._stages[index + 1]
+        queue = self._queues[index]
+        while not self._stop.is_set():
+            frame = queue.get(timeout=0.1)
+            if frame is None:
+                if queue.closed:
+                    self._finish(index + 1)
+                    return
+                continue
+            payload = self._call(stage, frame)
+            if payload is not None:
+                frame.payload = payload
+                self._emit(index + 1, frame)
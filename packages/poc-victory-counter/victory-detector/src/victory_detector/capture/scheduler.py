@@ -0,0 +1,155 @@
+"""単調時計で開始時刻の間隔を揃える固定レートのスケジューラ。
+
+処理の後に一定時間 sleep する方式では、実際のサンプリング周期が処理時間の分だけ
+伸び、負荷によって変動する。本スケジューラは ``start + n * interval`` の格子上の
+時刻に合わせて待つため周期がずれず（ドリフトしない）、処理が間に合わなかった
+場合は遅れを取り戻そうと連続で発火せず、次の格子点まで飛ばして飛ばした数を数える。
+
+``AdaptiveRate`` は StateManager のクールダウン状態から間隔を決め、検知が
+無視される COOLDOWN や試合中（WAITING_FOR_NONE）のキャプチャと推論を減らす。
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from victory_detector.core.state import StateManager
+
+
+class FixedRateScheduler:
+    """``interval`` 秒ごとのティックを待つ。"""
+
+    def __init__(
+        self,
+        interval: float,
+        stop_event: Optional[threading.Event] = None,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            interval: ティックの間隔（秒）。0 以下なら待たない。
+            stop_event: セットされたら wait() が False を返すイベント。
+                待っている途中で止めるにはセットした後に ``wake()`` を呼ぶ。
+            monotonic: 時計（テスト用に差し替え可能）
+        """
+
+        self._interval = interval
+        self._stop = stop_event or threading.Event()
+        self._monotonic = monotonic
+        self._started: Optional[float] = None
+        self._next: Optional[float] = None
+        # 直前のティックの予定時刻と、wait() が次のティックを待っている最中か
+        self._previous: Optional[float] = None
+        self._waiting = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.ticks = 0
+        self.missed = 0
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    @interval.setter
+    def interval(self, value: float) -> None:
+        """間隔を変更する。次のティックは直前のティックから新しい間隔で数える。
+
+        wait() が待っている最中なら起こして待ち時間を数え直すため、COOLDOWN 中の
+        長い間隔から戻ったときに古い間隔の残りを眠り続けない。
+        """
+
+        with self._lock:
+            if value == self._interval:
+                return
+            self._interval = value
+            if not self._waiting or self._previous is None:
+                return
+            self._next = self._previous + max(value, 0.0)
+        self._wake.set()
+
+    def wake(self) -> None:
+        """待っている wait() を起こす（停止の要求後など）。"""
+
+        self._wake.set()
+
+    @property
+    def achieved_rate(self) -> Optional[float]:
+        """開始から現在までの実際のティック数 / 秒。"""
+
+        if self._started is None or self.ticks < 2:
+            return None
+        elapsed = self._monotonic() - self._started
+        return (self.ticks - 1) / elapsed if elapsed > 0 else None
+
+    def next_delay(self) -> float:
+        """次のティックまでの秒数を求め、予定時刻を確定する。
+
+        予定時刻を過ぎていれば、過ぎた格子点を飛ばした数を ``missed`` に加える。
+        """
+
+        now = self._monotonic()
+        if self._next is None:
+            self._started = self._next = now
+            return 0.0
+        self._previous = self._next
+        self._next += self._interval
+        if self._interval > 0 and now > self._next:
+            skipped = math.ceil((now - self._next) / self._interval)
+            self.missed += skipped
+            self._next += skipped * self._interval
+        return max(0.0, self._next - now)
+
+    def wait(self) -> bool:
+        """次のティックまで待つ。停止が要求されたら False を返す。"""
+
+        with self._lock:
+            delay = self.next_delay()
+            self._waiting = True
+        try:
+            while delay > 0 and not self._stop.is_set():
+                if not self._wake.wait(delay):
+                    break
+                # 間隔の変更（または停止の要求）で起きた。予定時刻から待ち直す
+                with self._lock:
+                    self._wake.clear()
+                    assert self._next is not None
+                    delay = self._next - self._monotonic()
+        finally:
+            with self._lock:
+                self._waiting = False
+        if self._stop.is_set():
+            return False
+        self.ticks += 1
+        return True
+
+
+@dataclass(slots=True)
+class AdaptiveRate:
+    """クールダウン状態に応じたキャプチャ間隔。
+
+    - READY、または勝敗の候補が出始めたら ``active``（通常の間隔）
+    - COOLDOWN は残り時間だけ眠る。ただし手動のリセットなどに追従できるよう
+      ``cooldown_max`` 秒より長くは眠らない
+    - WAITING_FOR_NONE（試合中）は ``waiting``
+    """
+
+    active: float
+    waiting: float = 1.0
+    cooldown_max: float = 10.0
+
+    def interval(self, manager: StateManager) -> float:
+        if manager.pending_outcome is not None:
+            return self.active
+        state = manager.cooldown_state
+        if state == "COOLDOWN":
+            remaining = manager.cooldown_remaining()
+            if remaining > 0:
+                return max(self.active, min(remaining, self.cooldown_max))
+            return max(self.active, self.waiting)
+        if state == "WAITING_FOR_NONE":
+            return max(self.active, self.waiting)
+        return self.active
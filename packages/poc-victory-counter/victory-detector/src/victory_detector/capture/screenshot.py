@@ -0,0 +1,88 @@
+"""obs-websocket のスクリーンショットの取得形式とデコード。
+
+OBS は要求された形式・サイズで画像をエンコードし、base64 文字列として返す。
+フル解像度の PNG は OBS 側の圧縮・転送量・デコードのいずれも重いため、
+形式（png / jpg / bmp と品質）、取得サイズ、縮小デコードを選べるようにする。
+"""
+
+from __future__ import annotations
+
+import binascii
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import cv2  # type: ignore
+import numpy as np
+
+from victory_detector.core.geometry import REFERENCE_SIZE
+
+IMAGE_FORMATS = ("png", "jpg", "bmp")
+
+# 縮小デコードの倍率 → imdecode のフラグ（JPEG は DCT の段階で縮小されるため特に速い）
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ScreenshotOptions:
+    """スクリーンショットの取得・デコード設定。"""
+
+    format: str = "png"
+    width: int = REFERENCE_SIZE[0]
+    height: int = REFERENCE_SIZE[1]
+    # OBS の imageCompressionQuality（-1 で既定値、jpg は 0〜100）
+    quality: int = -1
+    # 縮小デコードの倍率（1, 2, 4, 8）
+    reduce: int = 1
+
+    def __post_init__(self) -> None:
+        if self.format not in IMAGE_FORMATS:
+            raise ValueError(f"unsupported screenshot format: {self.format}")
+        if self.reduce not in REDUCED_DECODE_FLAGS:
+            raise ValueError(f"reduce must be one of {sorted(REDUCED_DECODE_FLAGS)}")
+
+    @property
+    def decoded_size(self) -> tuple[int, int]:
+        """デコード後の画像サイズ (width, height)。"""
+
+        return -(-self.width // self.reduce), -(-self.height // self.reduce)
+
+
+def fetch_image_data(
+    client: Any, source: str, options: ScreenshotOptions
+) -> Optional[str]:
+    """GetSourceScreenshot を呼び、base64 の画像データを返す。"""
+
+    resp = client.get_source_screenshot(
+        source,
+        options.format,
+        options.width,
+        options.height,
+        options.quality,
+    )
+    # レスポンスからimage_dataを取得
+    if isinstance(resp, dict):
+        return resp.get("imageData") or resp.get("imageDataBase64")
+    return getattr(resp, "image_data", None)
+
+
+def decode_base64(image_data: str) -> bytes:
+    """``data:image/...;base64,`` 接頭辞を除いて base64 をデコードする。
+
+    接頭辞を文字列のスライスで除くと本体がもう 1 回コピーされるため、
+    ASCII に変換したバッファの memoryview をそのままデコーダに渡す。
+    """
+
+    raw = image_data.encode("ascii")
+    start = raw.find(b",", 0, 64) + 1 if raw.startswith(b"data:") else 0
+    return binascii.a2b_base64(memoryview(raw)[start:])
+
+
+def decode_image(data: bytes, reduce: int = 1) -> Optional[np.ndarray]:
+    """エンコード済み画像を BGR 配列にデコードする（``reduce`` 倍に縮小）。"""
+
+    return cv2.imdecode(np.frombuffer(data, np.uint8), REDUCED_DECODE_FLAGS[reduce])
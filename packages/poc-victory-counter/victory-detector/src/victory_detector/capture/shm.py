@@ -0,0 +1,288 @@
+"""共有メモリのリングバッファで生の BGR フレームを受け渡す。
+
+OBS のスクリーンショットは PNG / JPEG へのエンコード、base64、websocket での
+転送とデコードが 1 フレームごとにかかる。同じマシンでキャプチャするプロセス
+（``scripts/shm_producer.py`` など）が ``multiprocessing.shared_memory`` に
+生のフレームを書き込み、検知側はエンコードもデコードもせずに画素をそのまま
+（1 回のコピーで）読む。
+
+レイアウト（リトルエンディアン）::
+
+    ヘッダ: magic, version, slots, closed, slot_bytes, sequence
+    スロット × slots: sequence, timestamp, width, height, stride, channels, 画素
+
+書き込み側はスロットの sequence を 0 にしてから画素を書き、書き終えたら
+sequence を設定してからヘッダの sequence（最新のフレーム番号）を進める。
+読み取り側は画素を手元の配列へコピーし、その前後でスロットの sequence を
+確かめて、書き換え中・上書き済みのフレームを捨てる（seqlock と同じ考え方）。
+``copy=False`` で読んだビューは書き込み側がそのスロットに戻ってくると書き換わる
+ため、使い終わってから ``RingFrame.valid()`` で確かめること。
+"""
+
+from __future__ import annotations
+
+import struct
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import numpy as np
+
+from victory_detector.core.state import utcnow_us
+
+from .pipeline import Captured, EndOfStream
+from .sources import FrameSource
+
+MAGIC = b"VDFR"
+VERSION = 1
+
+# magic, version, slots, closed, slot_bytes, sequence
+HEADER = struct.Struct("<4sIIIQQ")
+# sequence, timestamp (エポックマイクロ秒), width, height, stride, channels
+SLOT_HEADER = struct.Struct("<QqIIII")
+# 画素の先頭をキャッシュラインに揃える
+ALIGN = 64
+
+_SEQUENCE_OFFSET = HEADER.size - 8
+_CLOSED_OFFSET = 12
+
+
+def _aligned(size: int) -> int:
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """既存の共有メモリを開く。
+
+    Python 3.12 以前は開いただけで resource_tracker に登録され、読み取り側の
+    終了時に共有メモリが削除されてしまうため、開く間だけ登録を止める。
+    """
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore
+    except TypeError:
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None  # type: ignore
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register  # type: ignore
+
+
+class FrameRingWriter:
+    """リングバッファを作成し、フレームを書き込む（キャプチャ側）。"""
+
+    def __init__(
+        self,
+        name: str,
+        max_width: int,
+        max_height: int,
+        slots: int = 4,
+        channels: int = 3,
+    ) -> None:
+        if slots < 2:
+            raise ValueError("slots must be >= 2")
+        self.channels = channels
+        self.slots = slots
+        self.slot_bytes = _aligned(
+            SLOT_HEADER.size + ALIGN + max_width * max_height * channels
+        )
+        size = _aligned(HEADER.size) + self.slot_bytes * slots
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+        self.sequence = 0
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, slots, 0, self.slot_bytes, 0)
+
+    def write(self, image: np.ndarray, timestamp: Optional[int] = None) -> int:
+        """``image``（height × width × channels の uint8）を次のスロットへコピーする。
+
+        行がパディングされたビュー（画面キャプチャの BGRA から切り出した BGR など）
+        もそのまま渡せる。戻り値はフレーム番号（1 から）。
+        """
+
+        height, width = image.shape[:2]
+        channels = image.shape[2] if image.ndim == 3 else 1
+        if channels != self.channels or image.dtype != np.uint8:
+            raise ValueError(f"expected uint8 frames with {self.channels} channels")
+        stride = width * channels
+        if SLOT_HEADER.size + ALIGN + stride * height > self.slot_bytes:
+            raise ValueError(f"frame {width}x{height} does not fit in a slot")
+
+        sequence = self.sequence + 1
+        offset = _aligned(HEADER.size) + (sequence - 1) % self.slots * self.slot_bytes
+        buf = self.shm.buf
+        # 書き込み中はスロットの sequence を 0 にしておく
+        SLOT_HEADER.pack_into(buf, offset, 0, 0, 0, 0, 0, 0)
+        target = np.ndarray(
+            (height, width, channels), np.uint8, buf, offset + ALIGN
+        )
+        np.copyto(target, image.reshape(height, width, channels))
+        del target
+        SLOT_HEADER.pack_into(
+            buf,
+            offset,
+            sequence,
+            utcnow_us() if timestamp is None else timestamp,
+            width,
+            height,
+            stride,
+            channels,
+        )
+        struct.pack_into("<Q", buf, _SEQUENCE_OFFSET, sequence)
+        self.sequence = sequence
+        return sequence
+
+    def close(self, unlink: bool = True) -> None:
+        """終わりを読み取り側へ知らせ、共有メモリを閉じる。"""
+
+        struct.pack_into("<I", self.shm.buf, _CLOSED_OFFSET, 1)
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+    def __enter__(self) -> "FrameRingWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+@dataclass(slots=True)
+class RingFrame:
+    """リングバッファから読んだフレーム。
+
+    ``image`` は手元へのコピー。``copy=False`` で読んだ場合は共有メモリへの
+    読み取り専用ビューで、使い終わったら ``valid()`` で確かめる。
+    """
+
+    sequence: int
+    timestamp: int
+    image: np.ndarray
+    reader: "FrameRingReader"
+
+    def valid(self) -> bool:
+        """ビューがまだ上書きされていないか。"""
+
+        return self.reader.slot_sequence(self.sequence) == self.sequence
+
+
+class FrameRingReader:
+    """リングバッファの最新フレームを読む（検知側）。"""
+
+    def __init__(self, name: str) -> None:
+        self.shm = _attach(name)
+        magic, version, slots, _, slot_bytes, _ = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f"not a frame ring buffer: {name}")
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.last = 0
+        # 読む前に上書きされた（追いつけなかった）フレーム数
+        self.dropped = 0
+        # 読んでいる間に書き換えられて捨てたフレーム数
+        self.torn = 0
+
+    @property
+    def sequence(self) -> int:
+        """書き込み済みの最新のフレーム番号。"""
+
+        return struct.unpack_from("<Q", self.shm.buf, _SEQUENCE_OFFSET)[0]
+
+    @property
+    def closed(self) -> bool:
+        return bool(struct.unpack_from("<I", self.shm.buf, _CLOSED_OFFSET)[0])
+
+    def _offset(self, sequence: int) -> int:
+        return _aligned(HEADER.size) + (sequence - 1) % self.slots * self.slot_bytes
+
+    def slot_sequence(self, sequence: int) -> int:
+        return struct.unpack_from("<Q", self.shm.buf, self._offset(sequence))[0]
+
+    def latest(self, copy: bool = True) -> Optional[RingFrame]:
+        """前回より新しいフレームがあれば最新のものを返す。
+
+        ``copy=True`` では画素をコピーし終えてからスロットの sequence を確かめるため、
+        返すフレームは書き換え途中のものではなく、その後も変わらない。
+        """
+
+        sequence = self.sequence
+        if sequence <= self.last:
+            return None
+        offset = self._offset(sequence)
+        slot, timestamp, width, height, stride, channels = SLOT_HEADER.unpack_from(
+            self.shm.buf, offset
+        )
+        if slot != sequence:
+            self.torn += 1
+            return None
+        image = np.ndarray(
+            (height, width, channels),
+            np.uint8,
+            self.shm.buf,
+            offset + ALIGN,
+            (stride, channels, 1),
+        )
+        image.flags.writeable = False
+        if copy:
+            image = image.copy()
+        if self.slot_sequence(sequence) != sequence:
+            self.torn += 1
+            return None
+        if self.last:
+            self.dropped += sequence - self.last - 1
+        self.last = sequence
+        return RingFrame(sequence, timestamp, image, self)
+
+    def wait(
+        self, timeout: Optional[float] = 1.0, poll: float = 0.001, copy: bool = True
+    ) -> Optional[RingFrame]:
+        """新しいフレームが書き込まれるまで待つ。"""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            frame = self.latest(copy)
+            if frame is not None or self.closed:
+                return frame
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def close(self) -> None:
+        try:
+            self.shm.close()
+        except BufferError:
+            # ビューがまだ参照されている。マッピングはプロセス終了時に解放される
+            pass
+
+    def __enter__(self) -> "FrameRingReader":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class SharedMemorySource(FrameSource):
+    """``FrameRingReader`` の最新フレームを取得する。デコードは不要。
+
+    フレームは取得時にコピーする。推論は取得よりずっと後に画素を読むため、
+    共有メモリへのビューのまま流すと、その間に書き込み側が一周して上書きした
+    フレームを気づかずに判定してしまう。
+    """
+
+    def __init__(self, name: str, timeout: float = 1.0) -> None:
+        self.reader = FrameRingReader(name)
+        self.timeout = timeout
+
+    def grab(self) -> Optional[Captured]:
+        frame = self.reader.wait(self.timeout)
+        if frame is None:
+            if self.reader.closed:
+                raise EndOfStream
+            return None
+        return Captured(frame.timestamp, frame.image)
+
+    def close(self) -> None:
+        self.reader.close()
@@ -0,0 +1,178 @@
+"""検知時のスクリーンショットをバックグラウンドスレッドで保存する。
+
+フル解像度の PNG を ``cv2.imwrite`` でエンコードすると数十ミリ秒かかり、
+状態更新の段で同期的に行うと、ちょうど判定遅延が重要な瞬間にパイプラインが
+止まる。``SnapshotWriter`` は上限付きのキューに積むだけで戻り、満杯なら
+待たずに捨てて数える。OBS から受け取ったエンコード済みの画像があれば
+再エンコードせずにそのまま書き出す。
+"""
+
+from __future__ import annotations
+
+import collections
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import cv2  # type: ignore
+import numpy as np
+
+from .screenshot import decode_base64
+
+logger = logging.getLogger(__name__)
+
+# "source" は受け取ったエンコード済みの画像をそのまま使う（なければ png）
+SNAPSHOT_FORMATS = ("source", "png", "jpg", "webp", "bmp")
+
+# エンコード済みの画像と形式（png / jpg / bmp）。base64 文字列も受け付ける
+EncodedImage = tuple[Union[bytes, memoryview, str], str]
+
+_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+
+
+class SnapshotWriter:
+    """スクリーンショットを上限付きキュー経由で書き出す。
+
+    ``max_bytes`` を指定すると、ディレクトリ内の画像の合計がそれを超えないよう
+    名前順（ファイル名の先頭は時刻）で古いものから削除する。
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        format: str = "source",
+        compression: int = 3,
+        quality: int = 90,
+        max_bytes: Optional[int] = None,
+        queue_size: int = 8,
+    ) -> None:
+        """
+        Args:
+            directory: 保存先ディレクトリ
+            format: 保存形式（``SNAPSHOT_FORMATS``）
+            compression: png の圧縮レベル（0〜9、大きいほど小さく遅い）
+            quality: jpg / webp の品質（0〜100）
+            max_bytes: 保存先の画像の合計サイズの上限。None なら無制限
+            queue_size: 書き込み待ちの上限。超えた分は捨てる。
+        """
+
+        if format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"unsupported snapshot format: {format}")
+        self.directory = directory
+        self.format = format
+        self.max_bytes = max_bytes
+        self._params = {
+            "png": [cv2.IMWRITE_PNG_COMPRESSION, compression],
+            "jpg": [cv2.IMWRITE_JPEG_QUALITY, quality],
+            "webp": [cv2.IMWRITE_WEBP_QUALITY, quality],
+            "bmp": [],
+        }
+        self._queue: queue.Queue[Optional[tuple[Any, ...]]] = queue.Queue(
+            maxsize=queue_size
+        )
+        self._thread: Optional[threading.Thread] = None
+        # 保存先の画像（名前順）とその合計サイズ
+        self._files: collections.deque[tuple[Path, int]] = collections.deque()
+        self.total_bytes = 0
+        self.written = 0
+        self.reused = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.failed = 0
+
+    def start(self) -> "SnapshotWriter":
+        if self._thread is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for path in sorted(self.directory.iterdir()):
+                if path.suffix.lower() in _SUFFIXES and path.is_file():
+                    size = path.stat().st_size
+                    self._files.append((path, size))
+                    self.total_bytes += size
+            self._evict()
+            self._thread = threading.Thread(
+                target=self._run, name="snapshot-writer", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """キューに残った画像を書き出してから停止する。"""
+
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def save(
+        self,
+        stem: str,
+        image: np.ndarray,
+        encoded: Optional[EncodedImage] = None,
+    ) -> bool:
+        """``<stem>.<拡張子>`` として保存するよう積む。キューが満杯なら捨てて False。
+
+        ``image`` は共有メモリのビューなど後で書き換わるものであってはならない。
+        """
+
+        try:
+            self._queue.put_nowait((stem, image, encoded))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            stem, image, encoded = item
+            try:
+                path, data = self._encode(stem, image, encoded)
+                path.write_bytes(data)
+            except Exception:  # noqa: BLE001 - 保存失敗でキャプチャを止めない
+                self.failed += 1
+                logger.exception("failed to save snapshot: %s", stem)
+                continue
+            self.written += 1
+            self._files.append((path, len(data)))
+            self.total_bytes += len(data)
+            self._evict()
+
+    def _encode(
+        self, stem: str, image: np.ndarray, encoded: Optional[EncodedImage]
+    ) -> tuple[Path, Union[bytes, memoryview]]:
+        if encoded is not None:
+            data, source_format = encoded
+            if self.format in ("source", source_format):
+                self.reused += 1
+                if isinstance(data, str):
+                    data = decode_base64(data)
+                return self.directory / f"{stem}.{source_format}", data
+        format = "png" if self.format == "source" else self.format
+        ok, buffer = cv2.imencode(f".{format}", image, self._params[format])
+        if not ok:
+            raise ValueError(f"failed to encode {format}")
+        return self.directory / f"{stem}.{format}", buffer.data
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        # 直前に書いた 1 枚は残す
+        while self.total_bytes > self.max_bytes and len(self._files) > 1:
+            path, size = self._files.popleft()
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+            self.evicted += 1
@@ -0,0 +1,253 @@
+"""タイムスタンプ付きの BGR フレームを供給するソース。
+
+OBS のスクリーンショット（同期 / asyncio）、動画ファイル、画像ディレクトリを
+同じインターフェースで扱い、検知パイプラインをオフラインで動かしたり
+ベンチマーク・回帰テストに使えるようにする。
+
+取得（I/O）とデコードはパイプラインの別の段で並行に動かせるよう、
+``grab()`` と ``decode()`` に分けている。単に順に読むだけなら反復すればよい::
+
+    with VideoFileSource("match.mp4", interval=0.25) as source:
+        for frame in source:
+            predictor.predict(frame.payload)
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+import cv2  # type: ignore
+import numpy as np
+
+from victory_detector.core.state import utcnow_us
+
+from .metrics import StageTimers
+from .obsws import AsyncScreenshotClient
+from .pipeline import Captured, EndOfStream
+from .screenshot import (
+    ScreenshotOptions,
+    decode_base64,
+    decode_image,
+    fetch_image_data,
+)
+from .vod import video_start_us
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class FrameSource:
+    """フレームの取得元。
+
+    ``grab()`` は取得時刻とエンコード済みの中身（``Captured``）を返し、
+    ``decode()`` がそれを BGR 配列にする。終わりに達したら ``grab()`` は
+    ``EndOfStream`` を送出し、今回は取得できなかっただけなら None を返す。
+    """
+
+    # 実時間で流れるソースか。False ならパイプラインは間隔を空けず、
+    # フレームを捨てずに処理できる限り速く読む。
+    realtime = True
+    # 設定すると decode() の中の処理ごとの所要時間を記録する
+    timers: Optional[StageTimers] = None
+
+    def grab(self) -> Optional[Captured]:
+        raise NotImplementedError
+
+    def decode(self, payload: Any) -> Optional[np.ndarray]:
+        return payload
+
+    def encoded(self, payload: Any) -> Optional[tuple[Any, str]]:
+        """``payload`` がエンコード済みの画像なら (データ, 形式) を返す。
+
+        検知時のスクリーンショットを再エンコードせずに保存するのに使う。
+        """
+
+        return None
+
+    def read(self) -> Optional[Captured]:
+        """取得とデコードをまとめて行う。"""
+
+        captured = self.grab()
+        if captured is None:
+            return None
+        image = self.decode(captured.payload)
+        return Captured(captured.timestamp, image) if image is not None else None
+
+    def close(self) -> None:
+        pass
+
+    def __iter__(self) -> Iterator[Captured]:
+        while True:
+            try:
+                frame = self.read()
+            except EndOfStream:
+                return
+            if frame is not None:
+                yield frame
+
+    def __enter__(self) -> "FrameSource":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class ObsScreenshotSource(FrameSource):
+    """同期の obs-websocket クライアント（``obsws_python.ReqClient``）で取得する。"""
+
+    def __init__(
+        self,
+        client: Any,
+        source: str,
+        options: ScreenshotOptions = ScreenshotOptions(),
+    ) -> None:
+        self.client = client
+        self.source = source
+        self.options = options
+
+    def grab(self) -> Optional[Captured]:
+        timestamp = utcnow_us()
+        image_data = fetch_image_data(self.client, self.source, self.options)
+        return Captured(timestamp, image_data) if image_data else None
+
+    def decode(self, payload: str) -> Optional[np.ndarray]:
+        if self.timers is None:
+            return decode_image(decode_base64(payload), self.options.reduce)
+        with self.timers.time("base64"):
+            data = decode_base64(payload)
+        with self.timers.time("imdecode"):
+            return decode_image(data, self.options.reduce)
+
+    def encoded(self, payload: str) -> Optional[tuple[Any, str]]:
+        # base64 のまま渡し、デコードは保存側のスレッドで行う
+        return payload, self.options.format
+
+    def close(self) -> None:
+        self.client.disconnect()
+
+
+class AsyncObsScreenshotSource(ObsScreenshotSource):
+    """``AsyncScreenshotClient`` が先行して取得したフレームを受け取る。"""
+
+    def __init__(self, client: AsyncScreenshotClient, timeout: float = 1.0) -> None:
+        super().__init__(client, client.source, client.options)
+        self.timeout = timeout
+
+    def grab(self) -> Optional[Captured]:
+        captured = self.client.get(self.timeout)
+        if captured is None and self.client.frames.closed:
+            raise EndOfStream
+        return captured
+
+    def close(self) -> None:
+        self.client.stop()
+
+
+class VideoFileSource(FrameSource):
+    """``cv2.VideoCapture`` で動画ファイルを読む。
+
+    時刻は ``start_us`` に動画内の再生位置を足したもの。``start_us`` の既定は
+    録画開始時刻（``video_start_us``）で、実行するたびに同じ時刻になる。
+    ``interval`` を指定するとその間隔でフレームを間引き、間引いたフレームは
+    デコードせずに読み飛ばす。
+    """
+
+    realtime = False
+
+    def __init__(
+        self,
+        path: Path | str,
+        interval: Optional[float] = None,
+        start_us: Optional[int] = None,
+    ) -> None:
+        self.path = Path(path)
+        self._capture = cv2.VideoCapture(str(self.path))
+        if not self._capture.isOpened():
+            raise ValueError(f"cannot open video: {self.path}")
+        self.fps = self._capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self._capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.interval = interval
+        if start_us is None:
+            start_us = video_start_us(self.path, self.duration_seconds)
+        self.start_us = start_us
+        self._index = -1
+        self._next_us = 0
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frame_count / self.fps if self.fps else 0.0
+
+    def grab(self) -> Optional[Captured]:
+        while True:
+            if not self._capture.grab():
+                raise EndOfStream
+            self._index += 1
+            offset_us = int(self._index * 1_000_000 / self.fps)
+            if self.interval is None or offset_us >= self._next_us:
+                break
+        if self.interval is not None:
+            self._next_us += int(self.interval * 1_000_000)
+        ok, image = self._capture.retrieve()
+        if not ok:
+            return None
+        return Captured(self.start_us + offset_us, image)
+
+    def close(self) -> None:
+        self._capture.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """ディレクトリ内の画像をファイル名順に読む。時刻は ``interval`` 秒ずつ進める。
+
+    ``start_us`` の既定は先頭の画像の更新時刻で、実行するたびに同じ時刻になる。
+    """
+
+    realtime = False
+
+    def __init__(
+        self,
+        directory: Path | str,
+        interval: float = 0.25,
+        start_us: Optional[int] = None,
+        suffixes: Sequence[str] = IMAGE_SUFFIXES,
+    ) -> None:
+        self.directory = Path(directory)
+        if not self.directory.is_dir():
+            raise ValueError(f"not a directory: {self.directory}")
+        self.paths = sorted(
+            path
+            for path in self.directory.iterdir()
+            if path.suffix.lower() in suffixes
+        )
+        self.interval = interval
+        if start_us is None:
+            start_us = (
+                int(self.paths[0].stat().st_mtime * 1_000_000) if self.paths else 0
+            )
+        self.start_us = start_us
+        self._index = 0
+
+    def grab(self) -> Optional[Captured]:
+        if self._index >= len(self.paths):
+            raise EndOfStream
+        path = self.paths[self._index]
+        timestamp = self.start_us + int(self._index * self.interval * 1_000_000)
+        self._index += 1
+        try:
+            return Captured(timestamp, path.read_bytes())
+        except OSError:
+            return None
+
+    def decode(self, payload: bytes) -> Optional[np.ndarray]:
+        return decode_image(payload)
+
+
+def open_source(path: Path | str, interval: Optional[float] = None) -> FrameSource:
+    """パスが動画ファイルなら VideoFileSource、ディレクトリなら ImageDirectorySource。"""
+
+    path = Path(path)
+    if path.is_dir():
+        return ImageDirectorySource(path, interval or 0.25)
+    if not path.exists():
+        raise FileNotFoundError(str(path))
+    return VideoFileSource(path, interval)
@@ -0,0 +1,326 @@
+"""フレームごとの推論結果を記録するトレースファイル。
+
+1 フレーム 1 レコードの固定長バイナリで、NumPy の構造化配列としてそのまま
+``np.memmap`` で読める。ファイル構成::
+
+    MAGIC (8 bytes) | ヘッダ長 (uint32 LE) | ヘッダ JSON（64 バイト境界まで空白埋め）| レコード...
+
+ヘッダ JSON にはクラス名と各クラスの勝敗（``outcomes``）を持つ。レコードは
+時刻（エポックマイクロ秒）、推論クラスの番号、全クラスの確率、状態機械の状態、
+連続検知回数、カウント確定フラグからなる。書き込み途中の末尾レコードは
+読み込み時に無視される。
+
+記録はキャプチャループをブロックしないよう、キューに積んだレコードを
+バックグラウンドスレッドがまとめて書き出す。キューが溢れた場合は捨てて数える。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import re
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Optional, Sequence
+
+import numpy as np
+
+from victory_detector.core.replay import Trace
+from victory_detector.core.state import OUTCOMES, CooldownState
+from victory_detector.core.vision import DetectionResult
+
+MAGIC = b"VDTRACE\x01"
+HEADER_ALIGN = 64
+FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 64 << 20
+SUFFIX = ".vdt"
+
+# 状態機械の状態コード（レコードの ``state`` 欄）
+STATE_CODES: dict[str, int] = {"COOLDOWN": 0, "WAITING_FOR_NONE": 1, "READY": 2}
+STATE_NAMES: tuple[str, ...] = tuple(STATE_CODES)
+FLAG_COUNTED = 0x01
+
+_PREFIX = struct.Struct("<8sI")
+
+logger = logging.getLogger(__name__)
+
+
+def record_dtype(num_classes: int) -> np.dtype:
+    """``num_classes`` クラス分の確率を持つレコードの構造化 dtype（パディングなし）。"""
+
+    return np.dtype(
+        [
+            ("timestamp", "<i8"),
+            ("class_index", "<i2"),
+            ("state", "u1"),
+            ("flags", "u1"),
+            ("consecutive", "<u2"),
+            ("probabilities", "<f4", (num_classes,)),
+        ]
+    )
+
+
+def _encode_header(classes: Sequence[str], outcomes: Sequence[str]) -> bytes:
+    payload = json.dumps(
+        {"version": FORMAT_VERSION, "classes": list(classes), "outcomes": list(outcomes)},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    total = _PREFIX.size + len(payload)
+    padded = payload + b" " * (-total % HEADER_ALIGN)
+    return _PREFIX.pack(MAGIC, len(padded)) + padded
+
+
+@dataclass(slots=True)
+class TraceFile:
+    """読み込んだトレース。``records`` は構造化配列（単一ファイルなら memmap）。"""
+
+    classes: list[str]
+    outcomes: list[str]
+    records: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.records["timestamp"]
+
+    @property
+    def probabilities(self) -> np.ndarray:
+        return self.records["probabilities"]
+
+    def to_replay_trace(self) -> Trace:
+        """再生エンジン（``core.replay``）で使えるトレースに変換する。"""
+
+        outcome_of = [
+            outcome if outcome in OUTCOMES else "unknown" for outcome in self.outcomes
+        ]
+        indices = self.records["class_index"]
+        probabilities = self.records["probabilities"]
+        trace = Trace(timestamps=self.records["timestamp"].tolist())
+        for row, index in enumerate(indices.tolist()):
+            if 0 <= index < len(outcome_of):
+                trace.detections.append(
+                    DetectionResult(
+                        outcome_of[index],
+                        float(probabilities[row, index]),
+                        predicted_class=self.classes[index],
+                    )
+                )
+            else:
+                trace.detections.append(DetectionResult("unknown", 0.0))
+        return trace
+
+
+def open_trace(path: Path) -> TraceFile:
+    """トレースファイルを memmap で開く。
+
+    Raises:
+        ValueError: トレースファイルの形式でない場合。
+    """
+
+    with path.open("rb") as fp:
+        prefix = fp.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"not a trace file: {path}")
+        magic, length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"not a trace file: {path}")
+        header = json.loads(fp.read(length))
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"unsupported trace version: {header.get('version')!r}")
+
+    classes = list(header["classes"])
+    dtype = record_dtype(len(classes))
+    offset = _PREFIX.size + length
+    count = max(0, (path.stat().st_size - offset) // dtype.itemsize)
+    if count:
+        records = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+    else:
+        records = np.empty(0, dtype=dtype)
+    return TraceFile(classes, list(header.get("outcomes", [])), records)
+
+
+def trace_files(directory: Path, prefix: str = "trace") -> list[Path]:
+    """``directory`` 内のローテーション済みトレースファイルを連番順に返す。"""
+
+    pattern = re.compile(rf"^{re.escape(prefix)}\.(\d+){re.escape(SUFFIX)}$")
+    found = []
+    for path in directory.iterdir() if directory.exists() else ():
+        match = pattern.match(path.name)
+        if match is not None:
+            found.append((int(match.group(1)), path))
+    return [path for _, path in sorted(found)]
+
+
+def read_traces(directory: Path, prefix: str = "trace") -> TraceFile:
+    """ディレクトリ内のトレースをすべて連結して返す。
+
+    Raises:
+        ValueError: トレースがない、またはクラス構成の異なるファイルが混在する場合。
+    """
+
+    files = [open_trace(path) for path in trace_files(directory, prefix)]
+    if not files:
+        raise ValueError(f"no trace files in {directory}")
+    first = files[0]
+    if any(f.classes != first.classes for f in files[1:]):
+        raise ValueError("trace files have different class layouts")
+    if len(files) == 1:
+        return first
+    return TraceFile(
+        first.classes,
+        first.outcomes,
+        np.concatenate([f.records for f in files]),
+    )
+
+
+class TraceRecorder:
+    """推論結果をバックグラウンドスレッドでトレースファイルへ追記する。
+
+    ファイルは ``<prefix>.000001.vdt`` のような連番で、``max_bytes`` を超えると
+    次のファイルへ切り替える。
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        classes: Sequence[str],
+        outcomes: Optional[Sequence[str]] = None,
+        prefix: str = "trace",
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        queue_size: int = 4096,
+    ) -> None:
+        """
+        Args:
+            directory: 出力先ディレクトリ
+            classes: クラス名（確率ベクトルの並び順）
+            outcomes: 各クラスの勝敗（victory/defeat/draw/unknown）。省略時はクラス名と同じ。
+            max_bytes: 1 ファイルの最大サイズ
+            queue_size: 書き込み待ちレコードの上限。超えた分は捨てる。
+        """
+
+        self._directory = directory
+        self._classes = list(classes)
+        self._outcomes = list(outcomes) if outcomes is not None else list(classes)
+        if len(self._outcomes) != len(self._classes):
+            raise ValueError("outcomes must have the same length as classes")
+        self._prefix = prefix
+        self._max_bytes = max_bytes
+        self._dtype = record_dtype(len(self._classes))
+        self._header = _encode_header(self._classes, self._outcomes)
+        self._queue: queue.Queue[Optional[tuple]] = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._fp: Optional[IO[bytes]] = None
+        self._path: Optional[Path] = None
+        self._sequence = 0
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def path(self) -> Optional[Path]:
+        """書き込み中のファイル。"""
+
+        return self._path
+
+    def start(self) -> "TraceRecorder":
+        if self._thread is None:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            existing = trace_files(self._directory, self._prefix)
+            if existing:
+                self._sequence = int(existing[-1].name.split(".")[-2])
+            self._thread = threading.Thread(
+                target=self._run, name="trace-recorder", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """キューに残ったレコードを書き出してから停止する。"""
+
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> "TraceRecorder":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def record(
+        self,
+        timestamp_us: int,
+        class_index: int,
+        probabilities: Sequence[float],
+        cooldown_state: CooldownState,
+        consecutive_count: int = 0,
+        counted: bool = False,
+    ) -> bool:
+        """1 フレーム分を書き込みキューに積む。キューが満杯なら捨てて False を返す。"""
+
+        try:
+            self._queue.put_nowait(
+                (
+                    timestamp_us,
+                    class_index,
+                    STATE_CODES[cooldown_state],
+                    FLAG_COUNTED if counted else 0,
+                    min(consecutive_count, 0xFFFF),
+                    probabilities,
+                )
+            )
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= 1024:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = item is None
+            if batch:
+                try:
+                    self._write(np.array(batch, dtype=self._dtype))
+                    self.written += len(batch)
+                except Exception:  # noqa: BLE001 - 記録失敗でキャプチャを止めない
+                    logger.exception("failed to write trace records")
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def _write(self, records: np.ndarray) -> None:
+        itemsize = self._dtype.itemsize
+        while len(records):
+            if self._fp is None or self._fp.tell() + itemsize > self._max_bytes:
+                self._open_next()
+            assert self._fp is not None
+            # 1 ファイルに最低 1 レコードは書く
+            capacity = max(1, (self._max_bytes - self._fp.tell()) // itemsize)
+            self._fp.write(records[:capacity].tobytes())
+            records = records[capacity:]
+        if self._fp is not None:
+            self._fp.flush()
+
+    def _open_next(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+        self._sequence += 1
+        self._path = self._directory / f"{self._prefix}.{self._sequence:06d}{SUFFIX}"
+        self._fp = self._path.open("xb")
+        self._fp.write(self._header)
@@ -0,0 +1,406 @@
+"""録画済みの動画（VOD）から勝敗を数え直すスキャナ。
+
+全フレームを OBS 経由で等倍再生する代わりに、動画を ``coarse_interval`` 秒ごとに
+まばらにサンプリングし、勝敗バナーの候補が見えた付近だけ ``fine_interval`` 秒
+（ライブのキャプチャ間隔相当）で細かく見直す（coarse-to-fine）。判定は
+StateManager の状態機械に動画内の時刻で流すため、連続検知・クールダウンの
+挙動はライブと同じになり、カウントが確定したらクールダウン明けまで読み飛ばす。
+
+サンプリングしないフレームは ``grab()`` で読み進めるだけで色変換・コピーをせず、
+離れた位置へはシークで移動する。推論は ``predict`` として注入するため、
+本モジュール自体は torch に依存しない。
+
+長い動画や複数の動画は ``ShardedVodScanner`` で時間の区間に分け、ワーカー
+プロセスごとに自前のデコーダと推論関数を持たせて並列に走査できる。区間は
+前の区間と少し重ねて走査し、境目をまたぐ勝敗バナーを取りこぼさない。
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Protocol, Sequence
+
+import cv2  # type: ignore
+import numpy as np
+
+from victory_detector.core.state import OUTCOMES, StateManager
+from victory_detector.core.vision import DetectionResult
+
+Predict = Callable[[np.ndarray], DetectionResult]
+
+# OBS の録画ファイル名（例: "2025-01-01 20-15-33.mkv"）から開始時刻を読む
+_OBS_NAME = re.compile(r"(\d{4}-\d{2}-\d{2})[ _](\d{2})-(\d{2})-(\d{2})")
+
+
+class FrameReader(Protocol):
+    duration: float
+
+    def read_at(self, seconds: float) -> Optional[np.ndarray]:
+        """動画内の ``seconds`` 秒のフレームを返す（範囲外なら None）。"""
+        ...
+
+
+class VideoReader:
+    """``cv2.VideoCapture`` を時刻指定で読む。
+
+    前方の近い位置へは ``grab()`` で読み進め（デコードのみで色変換しない）、
+    ``seek_seconds`` より離れた位置や後方へはシークする。
+    """
+
+    def __init__(self, path: Path | str, seek_seconds: float = 5.0) -> None:
+        self.path = Path(path)
+        self._capture = cv2.VideoCapture(str(self.path))
+        if not self._capture.isOpened():
+            raise ValueError(f"cannot open video: {self.path}")
+        self.fps = self._capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self._capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.duration = self.frame_count / self.fps
+        self._seek_frames = max(1, int(seek_seconds * self.fps))
+        # 次に grab() で読まれるフレーム番号
+        self._position = 0
+        self.grabbed = 0
+        self.decoded = 0
+        self.seeks = 0
+
+    def read_at(self, seconds: float) -> Optional[np.ndarray]:
+        target = int(round(seconds * self.fps))
+        if target >= self.frame_count or target < 0:
+            return None
+        if target < self._position or target - self._position > self._seek_frames:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+            self._position = target
+            self.seeks += 1
+        while self._position < target:
+            if not self._capture.grab():
+                return None
+            self._position += 1
+            self.grabbed += 1
+        if not self._capture.grab():
+            return None
+        self._position += 1
+        ok, image = self._capture.retrieve()
+        if not ok:
+            return None
+        self.decoded += 1
+        return image
+
+    def close(self) -> None:
+        self._capture.release()
+
+    def __enter__(self) -> "VideoReader":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def video_start_us(path: Path | str, duration: float = 0.0) -> int:
+    """動画の録画開始時刻（エポックマイクロ秒）。
+
+    OBS 形式のファイル名ならその時刻（ローカル時刻）、そうでなければ
+    更新時刻から長さを引いた時刻とする。
+    """
+
+    path = Path(path)
+    match = _OBS_NAME.search(path.stem)
+    if match:
+        date, hour, minute, second = match.groups()
+        started = datetime.fromisoformat(f"{date}T{hour}:{minute}:{second}")
+        return int(started.astimezone().timestamp() * 1_000_000)
+    return int((path.stat().st_mtime - duration) * 1_000_000)
+
+
+@dataclass(slots=True)
+class ScanParams:
+    # 粗いサンプリング間隔（秒）。勝敗バナーが表示される時間より短くする
+    coarse_interval: float = 2.0
+    # 候補付近を見直す間隔（秒）。ライブのキャプチャ間隔に合わせる
+    fine_interval: float = 0.25
+    # 候補が見えたサンプルの前後に見直す範囲（秒）。前は既定で粗い間隔 1 つ分
+    refine_before: Optional[float] = None
+    refine_after: float = 4.0
+
+
+@dataclass(slots=True)
+class Sample:
+    """動画内の時刻（秒）とその判定。"""
+
+    seconds: float
+    detection: DetectionResult
+
+
+@dataclass(slots=True)
+class ScanStats:
+    predicted: int = 0
+    refined_windows: int = 0
+    skipped_seconds: float = 0.0
+    video_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+    @property
+    def video_hours_per_minute(self) -> float:
+        """壁時計 1 分あたりに処理した動画の時間数。"""
+
+        if self.wall_seconds <= 0:
+            return 0.0
+        return self.video_seconds / 3600 / (self.wall_seconds / 60)
+
+
+@dataclass(slots=True)
+class VodScanner:
+    """coarse-to-fine で動画をサンプリングし、判定を時刻順に返す。"""
+
+    predict: Predict
+    params: ScanParams = field(default_factory=ScanParams)
+    stats: ScanStats = field(default_factory=ScanStats)
+
+    def scan(
+        self,
+        reader: FrameReader,
+        start: float = 0.0,
+        end: Optional[float] = None,
+        state: Optional[StateManager] = None,
+        origin_us: int = 0,
+        note: str = "",
+    ) -> Iterator[Sample]:
+        """``start``〜``end`` 秒を走査し、判定したサンプルを時刻順に返す。
+
+        ``state`` を渡すと各サンプルを ``origin_us`` 起点の時刻で状態機械に流し、
+        COOLDOWN の間はサンプリングせずにクールダウン明けまで読み飛ばす。
+        """
+
+        params = self.params
+        end = reader.duration if end is None else min(end, reader.duration)
+        before = (
+            params.coarse_interval
+            if params.refine_before is None
+            else params.refine_before
+        )
+        started = time.perf_counter()
+        cursor = start
+        # 直前に出したサンプルの時刻（見直し範囲が重ならないようにする）
+        last = start - params.fine_interval
+        try:
+            while cursor < end:
+                if state is not None:
+                    resume = self._cooldown_end(state, origin_us)
+                    if resume is not None and resume > cursor:
+                        self.stats.skipped_seconds += min(resume, end) - cursor
+                        cursor = resume
+                        continue
+                sample = self._sample(reader, cursor)
+                if sample is None:
+                    break
+                if sample.detection.outcome in OUTCOMES and self._may_count(state):
+                    # 候補: 前後を細かく見直す（候補のサンプルもこの中に含まれる）
+                    self.stats.refined_windows += 1
+                    window_end = min(cursor + params.refine_after, end)
+                    fine = max(last + params.fine_interval, cursor - before)
+                    while fine <= window_end:
+                        refined = (
+                            sample
+                            if abs(fine - cursor) < 1e-9
+                            else self._sample(reader, fine)
+                        )
+                        if refined is None:
+                            break
+                        last = fine
+                        yield refined
+                        if feed_sample(state, refined, origin_us, note):
+                            break
+                        fine += params.fine_interval
+                    cursor = max(cursor, last) + params.coarse_interval
+                    continue
+                last = cursor
+                yield sample
+                feed_sample(state, sample, origin_us, note)
+                cursor += params.coarse_interval
+        finally:
+            self.stats.video_seconds += max(0.0, min(cursor, end) - start)
+            self.stats.wall_seconds += time.perf_counter() - started
+
+    def _sample(self, reader: FrameReader, seconds: float) -> Optional[Sample]:
+        image = reader.read_at(seconds)
+        if image is None:
+            return None
+        self.stats.predicted += 1
+        return Sample(seconds, self.predict(image))
+
+    @staticmethod
+    def _may_count(state: Optional[StateManager]) -> bool:
+        # WAITING_FOR_NONE の候補は数えられないため見直さない
+        return state is None or state.cooldown_state == "READY"
+
+    @staticmethod
+    def _cooldown_end(state: StateManager, origin_us: int) -> Optional[float]:
+        remaining_at = state.cooldown_until()
+        if remaining_at is None:
+            return None
+        return (remaining_at - origin_us) / 1_000_000
+
+
+def feed_sample(
+    state: Optional[StateManager], sample: Sample, origin_us: int, note: str = ""
+) -> bool:
+    """サンプルを ``origin_us`` 起点の時刻で状態機械に流し、カウントが確定したら True。"""
+
+    if state is None:
+        return False
+    timestamp = origin_us + int(round(sample.seconds * 1_000_000))
+    steps = state.record_detections([sample.detection], [timestamp], note=note)
+    return any(step.event is not None for step in steps)
+
+
+# --- 複数プロセスでの分割処理 -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Shard:
+    """``video`` 番目（入力順）の動画の ``[start, end)`` 秒を担当する区間。
+
+    走査は ``lead`` 秒前から始め、区間の先頭をまたぐ勝敗バナーも見直し範囲ごと
+    捉える。前の区間と重なった分のサンプルはマージ時に捨てる。
+    """
+
+    video: int
+    path: str
+    start: float
+    end: float
+    lead: float = 0.0
+
+
+@dataclass(slots=True)
+class ShardResult:
+    shard: Shard
+    samples: list[Sample]
+    stats: ScanStats
+
+
+def plan_shards(
+    videos: Sequence[tuple[Path | str, float]],
+    shard_seconds: float,
+    params: ScanParams = ScanParams(),
+    overlap: Optional[float] = None,
+) -> list[Shard]:
+    """(パス, 長さ秒) の列を ``shard_seconds`` 秒ずつの区間に分ける。
+
+    区間の境目と重なり（既定は候補の前後に見直す範囲の合計）は粗い間隔の
+    倍数に切り上げ、粗いサンプリング位置を 1 プロセスで走査した場合と揃える。
+    """
+
+    if shard_seconds <= 0:
+        raise ValueError("shard_seconds must be positive")
+    coarse = params.coarse_interval
+    step = max(1, math.ceil(shard_seconds / coarse)) * coarse
+    if overlap is None:
+        before = coarse if params.refine_before is None else params.refine_before
+        overlap = before + params.refine_after
+    lead = math.ceil(overlap / coarse) * coarse
+    shards: list[Shard] = []
+    for number, (path, duration) in enumerate(videos):
+        for index in range(max(1, math.ceil(duration / step))):
+            start = index * step
+            end = min(start + step, duration)
+            shards.append(Shard(number, str(path), start, end, min(lead, start)))
+    return shards
+
+
+def merge_shards(results: Iterable[ShardResult]) -> Iterator[tuple[Shard, Sample]]:
+    """区間の順に並んだ結果を、動画ごとに時刻順の 1 本の列へまとめる。
+
+    前の区間が出したサンプル以前の時刻のもの（重なり部分）は捨てる。
+    """
+
+    video = -1
+    last = -math.inf
+    for result in results:
+        if result.shard.video != video:
+            video = result.shard.video
+            last = -math.inf
+        for sample in result.samples:
+            if sample.seconds > last + 1e-9:
+                last = sample.seconds
+                yield result.shard, sample
+
+
+# ワーカープロセスごとに一度だけ作る推論関数と走査の設定
+_worker: dict[str, Any] = {}
+
+
+def _init_shard_worker(
+    predictor_factory: Callable[[], Predict], params: ScanParams, seek_seconds: float
+) -> None:
+    _worker.update(
+        predict=predictor_factory(), params=params, seek_seconds=seek_seconds
+    )
+
+
+def _scan_shard(shard: Shard) -> ShardResult:
+    scanner = VodScanner(_worker["predict"], _worker["params"])
+    with VideoReader(shard.path, seek_seconds=_worker["seek_seconds"]) as reader:
+        samples = list(scanner.scan(reader, shard.start - shard.lead, shard.end))
+    return ShardResult(shard, samples, scanner.stats)
+
+
+@dataclass(slots=True)
+class ShardedVodScanner:
+    """動画を時間の区間に分け、プロセスプールで並列に走査する。
+
+    各ワーカーは起動時に ``predictor_factory()`` で推論関数を一度だけ作り、
+    区間ごとに自前の VideoReader で状態なしの ``VodScanner.scan`` を行う。
+    結果は区間の順に受け取ってマージするので、``feed_sample`` で状態機械へ
+    そのまま流せる。COOLDOWN の読み飛ばしは効かない代わりに、コア数に応じて速くなる。
+    ``predictor_factory`` はワーカーへ送るため pickle できること。
+    """
+
+    predictor_factory: Callable[[], Predict]
+    params: ScanParams = field(default_factory=ScanParams)
+    workers: Optional[int] = None
+    shard_seconds: float = 600.0
+    overlap: Optional[float] = None
+    seek_seconds: float = 5.0
+    stats: ScanStats = field(default_factory=ScanStats)
+
+    def scan(
+        self, videos: Sequence[tuple[Path | str, float]]
+    ) -> Iterator[tuple[Shard, Sample]]:
+        """(パス, 長さ秒) の動画を順に走査し、(区間, サンプル) を動画・時刻順に返す。
+
+        ``workers=1`` の場合はプロセスを起動しない。
+        """
+
+        shards = plan_shards(videos, self.shard_seconds, self.params, self.overlap)
+        workers = min(self.workers or os.cpu_count() or 1, max(1, len(shards)))
+        initargs = (self.predictor_factory, self.params, self.seek_seconds)
+        started = time.perf_counter()
+        try:
+            if workers == 1:
+                _init_shard_worker(*initargs)
+                yield from merge_shards(self._collect(map(_scan_shard, shards)))
+                return
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_shard_worker,
+                initargs=initargs,
+            )
+            try:
+                results = pool.map(_scan_shard, shards)
+                yield from merge_shards(self._collect(results))
+            finally:
+                pool.shutdown(cancel_futures=True)
+        finally:
+            self.stats.wall_seconds += time.perf_counter() - started
+
+    def _collect(self, results: Iterable[ShardResult]) -> Iterator[ShardResult]:
+        for result in results:
+            self.stats.predicted += result.stats.predicted
+            self.stats.refined_windows += result.stats.refined_windows
+            self.stats.video_seconds += result.shard.end - result.shard.start
+            yield result
@@ -0,0 +1,47 @@
+"""StateManager に注入する時計。
+
+通常は壁時計（``SystemClock``）を使い、テストや録画済みトレースの再生では
+``ManualClock`` で時刻を明示的に進めることで、クールダウンの挙動を実時間を
+待たずに決定的に再現できる。時刻はいずれもエポックマイクロ秒の int。
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Protocol
+
+
+class Clock(Protocol):
+    def now_us(self) -> int:
+        """現在時刻（エポックマイクロ秒）。"""
+        ...
+
+
+class SystemClock:
+    """壁時計。"""
+
+    def now_us(self) -> int:
+        return time.time_ns() // 1_000
+
+
+class ManualClock:
+    """呼び出し側が時刻を設定・前進させる時計。"""
+
+    def __init__(self, start_us: int = 0) -> None:
+        self._now = start_us
+
+    def now_us(self) -> int:
+        return self._now
+
+    def set(self, timestamp_us: int) -> None:
+        if timestamp_us < self._now:
+            raise ValueError("ManualClock cannot move backwards")
+        self._now = timestamp_us
+
+    def advance(self, seconds: float) -> int:
+        """``seconds`` 秒進め、進めた後の時刻を返す。"""
+
+        if seconds < 0:
+            raise ValueError("ManualClock cannot move backwards")
+        self._now += int(seconds * 1_000_000)
+        return self._now
@@ -0,0 +1,142 @@
+"""JSON エンコード／デコードのバックエンド選択モジュール。
+
+orjson または msgspec がインストールされていればそれを使い、なければ標準ライブラリの
+``json`` にフォールバックする。いずれのバックエンドも UTF-8 の ``bytes`` を返し、
+区切り文字は空白なし（``{"a":1}``）で揃えているため、出力はバックエンドに依存しない。
+
+環境変数 ``VICTORY_DETECTOR_JSON`` に ``orjson`` / ``msgspec`` / ``json`` を指定すると
+既定のバックエンドを固定できる。指定したバックエンドがインストールされていなければ
+警告を出して利用可能なものを使う。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Callable
+
+try:  # pragma: no cover - インストール状況に依存
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:  # pragma: no cover - インストール状況に依存
+    import msgspec  # type: ignore
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+BACKEND_ENV = "VICTORY_DETECTOR_JSON"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Codec:
+    """JSON バックエンドの dumps / loads の組。"""
+
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes | str], Any]
+
+
+def _stdlib_codec() -> Codec:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(obj: Any) -> bytes:
+        return encoder.encode(obj).encode("utf-8")
+
+    return Codec(name="json", dumps=dumps, loads=json.loads)
+
+
+def _orjson_codec() -> Codec:
+    assert orjson is not None
+    return Codec(name="orjson", dumps=orjson.dumps, loads=orjson.loads)
+
+
+def _msgspec_codec() -> Codec:
+    assert msgspec is not None
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+
+    def loads(data: bytes | str) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as exc:
+            # 他のバックエンドと同様に ValueError として扱えるよう揃える
+            raise ValueError(str(exc)) from exc
+
+    return Codec(name="msgspec", dumps=encoder.encode, loads=loads)
+
+
+def available_backends() -> list[str]:
+    """利用可能なバックエンド名を優先順に返す。"""
+
+    names = []
+    if orjson is not None:
+        names.append("orjson")
+    if msgspec is not None:
+        names.append("msgspec")
+    names.append("json")
+    return names
+
+
+def get_codec(name: str | None = None) -> Codec:
+    """バックエンドを取得する。
+
+    ``name`` 省略時は環境変数 ``VICTORY_DETECTOR_JSON`` のもの、未指定または
+    利用できなければ利用可能な最速のものを返す。
+
+    Raises:
+        ValueError: ``name`` が未知のバックエンド名、またはインストールされていない場合。
+    """
+
+    if name is None:
+        name = os.environ.get(BACKEND_ENV)
+        if name and name not in available_backends():
+            logger.warning(
+                "%s=%s is not available; falling back to %s",
+                BACKEND_ENV,
+                name,
+                available_backends()[0],
+            )
+            name = None
+        name = name or available_backends()[0]
+    if name not in available_backends():
+        raise ValueError(f"JSON backend is not available: {name}")
+    if name == "orjson":
+        return _orjson_codec()
+    if name == "msgspec":
+        return _msgspec_codec()
+    return _stdlib_codec()
+
+
+_default = get_codec()
+
+
+def backend() -> str:
+    """既定バックエンドの名前。"""
+
+    return _default.name
+
+
+def set_backend(name: str | None) -> str:
+    """既定バックエンドを切り替え、切り替え前の名前を返す（ベンチマーク・テスト用）。"""
+
+    global _default
+    previous = _default.name
+    _default = get_codec(name)
+    return previous
+
+
+def dumps(obj: Any) -> bytes:
+    """既定バックエンドで ``obj`` を UTF-8 の JSON バイト列へ変換する。"""
+
+    return _default.dumps(obj)
+
+
+def loads(data: bytes | str) -> Any:
+    """既定バックエンドで JSON をデコードする。不正な JSON は ValueError。"""
+
+    return _default.loads(data)
@@ -0,0 +1,132 @@
+"""解像度に依存しないクロップ・マスク領域。
+
+領域はフレームに対する 0〜1 の比率で保持し、実際のフレームサイズに合わせて
+ピクセル座標へ変換する。従来のピクセル指定（1920x1080 基準）もそのまま使え、
+基準解像度と異なるサイズで取得したフレームでは自動で拡大・縮小される。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Sequence, Union
+
+# ピクセル指定の領域の基準解像度 (width, height)
+REFERENCE_SIZE = (1920, 1080)
+
+# 推奨クロップ領域と既定のマスク領域（基準解像度のピクセル）
+DEFAULT_CROP = (460, 378, 995, 550)
+DEFAULT_MASK = (0, 534, 1920, 295)
+
+PixelRect = tuple[int, int, int, int]
+RegionLike = Union["Region", Sequence[float]]
+
+
+@dataclass(frozen=True, slots=True)
+class Region:
+    """フレームに対する比率で表した矩形 (x, y, width, height)。"""
+
+    x: float
+    y: float
+    width: float
+    height: float
+
+    @classmethod
+    def from_values(
+        cls, values: Sequence[float], reference: tuple[int, int] = REFERENCE_SIZE
+    ) -> "Region":
+        """値ごとに、絶対値が 1 以下なら比率、それ以外は基準解像度のピクセルとみなす。
+
+        ``build_dataset.py --crop`` と同じ解釈。
+        """
+
+        if len(values) != 4:
+            raise ValueError("region needs 4 values: x,y,width,height")
+        ref_w, ref_h = reference
+        scales = (ref_w, ref_h, ref_w, ref_h)
+        x, y, w, h = (
+            float(value) if abs(value) <= 1 else value / scale
+            for value, scale in zip(values, scales)
+        )
+        return cls(x, y, w, h)
+
+    @classmethod
+    def parse(
+        cls, text: str, reference: tuple[int, int] = REFERENCE_SIZE
+    ) -> "Region":
+        """``'x,y,width,height'`` 形式の文字列を読む。"""
+
+        try:
+            values = [float(part.strip()) for part in text.split(",")]
+        except ValueError as exc:
+            raise ValueError(f"invalid region: {text}") from exc
+        return cls.from_values(values, reference)
+
+    @classmethod
+    def coerce(
+        cls, value: RegionLike, reference: tuple[int, int] = REFERENCE_SIZE
+    ) -> "Region":
+        return value if isinstance(value, Region) else cls.from_values(value, reference)
+
+    def resolve(self, width: int, height: int) -> PixelRect:
+        """``width`` x ``height`` のフレーム内に収まるピクセル座標を返す。"""
+
+        x = max(0, min(round(self.x * width), width - 1))
+        y = max(0, min(round(self.y * height), height - 1))
+        w = max(1, min(round(self.width * width), width - x))
+        h = max(1, min(round(self.height * height), height - y))
+        return x, y, w, h
+
+
+@dataclass(frozen=True, slots=True)
+class ResolvedGeometry:
+    """あるフレームサイズでのクロップ・マスクのピクセル座標。"""
+
+    crop: Optional[PixelRect]
+    masks: tuple[PixelRect, ...]
+    # 基準解像度と異なるフレームで、クロップを基準解像度での大きさ (w, h) に
+    # 戻すためのサイズ。同じ解像度なら None。
+    crop_size: Optional[tuple[int, int]]
+
+
+@dataclass(slots=True)
+class FrameGeometry:
+    """クロップ・マスク領域と、フレームの形ごとの変換結果のキャッシュ。"""
+
+    crop: Optional[Region]
+    masks: tuple[Region, ...] = ()
+    reference: tuple[int, int] = REFERENCE_SIZE
+    _cache: dict[tuple[int, int], ResolvedGeometry] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    @classmethod
+    def create(
+        cls,
+        crop: Optional[RegionLike] = DEFAULT_CROP,
+        masks: Optional[Iterable[RegionLike]] = None,
+        reference: tuple[int, int] = REFERENCE_SIZE,
+    ) -> "FrameGeometry":
+        return cls(
+            Region.coerce(crop, reference) if crop is not None else None,
+            tuple(Region.coerce(mask, reference) for mask in masks or ()),
+            reference,
+        )
+
+    def resolve(self, shape: Sequence[int]) -> ResolvedGeometry:
+        """``image.shape`` に対するピクセル座標を返す（同じ形なら 2 回目以降は辞書引きのみ）。"""
+
+        height, width = shape[0], shape[1]
+        resolved = self._cache.get((height, width))
+        if resolved is None:
+            resolved = self._resolve(width, height)
+            self._cache[(height, width)] = resolved
+        return resolved
+
+    def _resolve(self, width: int, height: int) -> ResolvedGeometry:
+        crop = self.crop.resolve(width, height) if self.crop else None
+        crop_size = None
+        if crop is not None and (width, height) != self.reference:
+            _, _, ref_w, ref_h = self.crop.resolve(*self.reference)
+            crop_size = (ref_w, ref_h)
+        masks = tuple(mask.resolve(width, height) for mask in self.masks)
+        return ResolvedGeometry(crop, masks, crop_size)
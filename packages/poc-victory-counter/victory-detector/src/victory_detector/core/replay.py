@@ -0,0 +1,476 @@
+"""録画済みの検知トレースを状態機械に流して評価する再生エンジン。
+
+フレームごとの判定結果（トレース）を元の時刻のまま ``StateManager`` に流し、
+確定したイベントを正解データ（勝敗画面が表示された時刻と結果）と照合して
+取りこぼし・二重カウント・判定までの遅延を集計する。実時間を待たないため、
+``cooldown_seconds`` などのパラメータ調整を録画データだけで行える。
+
+トレースは JSON Lines で 1 行 1 フレーム::
+
+    {"timestamp": "2025-01-01T12:00:00.100000+00:00", "outcome": "unknown", "confidence": 0.12}
+
+``timestamp`` は ISO8601 文字列またはエポックマイクロ秒の整数。正解データも同じ形式で
+``timestamp`` / ``outcome`` を持つ行を並べる（イベントログの ``value`` も受け付けるため、
+確認済みのイベントログをそのまま正解データに使える）。
+
+``sweep()`` は複数のトレースに対してパラメータの組（キャプチャ間隔を含む）を
+プロセスプールで総当たり・ランダム探索し、精度と判定遅延で順位付けする。
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import product
+from pathlib import Path
+from typing import Any, Iterable, Optional, Sequence
+
+from . import codec
+from .clock import ManualClock
+from .state import (
+    OUTCOMES,
+    DetectionStep,
+    Event,
+    EventLog,
+    Outcome,
+    StateManager,
+    parse_timestamp,
+)
+from .vision import DetectionResult
+
+
+@dataclass(slots=True)
+class Trace:
+    """時刻昇順に並んだフレームごとの判定結果。"""
+
+    timestamps: list[int] = field(default_factory=list)
+    detections: list[DetectionResult] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def duration_seconds(self) -> float:
+        if len(self.timestamps) < 2:
+            return 0.0
+        return (self.timestamps[-1] - self.timestamps[0]) / 1_000_000
+
+
+@dataclass(frozen=True, slots=True)
+class GroundTruth:
+    """正解データの 1 試合。``timestamp`` は勝敗画面が表示され始めた時刻。"""
+
+    timestamp: int
+    outcome: Outcome
+
+
+@dataclass(frozen=True, slots=True)
+class ReplayParams:
+    """StateManager に渡す状態機械のパラメータ。"""
+
+    cooldown_seconds: float = 180
+    required_consecutive: int = 2
+    none_required_consecutive: int = 50
+    # 指定時は none の連続回数ではなく継続時間（秒）で READY に戻る
+    none_required_seconds: Optional[float] = None
+
+
+@dataclass(slots=True)
+class ReplayReport:
+    """再生結果と正解データとの照合結果。"""
+
+    params: ReplayParams
+    frames: int
+    events: list[Event]
+    steps: list[DetectionStep]
+    elapsed_seconds: float
+    matches: int = 0
+    hits: int = 0
+    missed: int = 0
+    mislabeled: int = 0
+    double_counts: int = 0
+    false_positives: int = 0
+    latencies_us: list[int] = field(default_factory=list)
+
+    @property
+    def errors(self) -> int:
+        """取りこぼし・誤判定・二重カウント・誤検知の合計。"""
+
+        return self.missed + self.mislabeled + self.double_counts + self.false_positives
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        """勝敗画面の表示からカウント確定までの平均遅延（秒）。"""
+
+        if not self.latencies_us:
+            return None
+        return sum(self.latencies_us) / len(self.latencies_us) / 1_000_000
+
+    @property
+    def max_latency(self) -> Optional[float]:
+        if not self.latencies_us:
+            return None
+        return max(self.latencies_us) / 1_000_000
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self.latencies_us:
+            return None
+        ordered = sorted(self.latencies_us)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index] / 1_000_000
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "params": asdict(self.params),
+            "frames": self.frames,
+            "events": [event.to_dict() for event in self.events],
+            "elapsed_seconds": self.elapsed_seconds,
+            "matches": self.matches,
+            "hits": self.hits,
+            "missed": self.missed,
+            "mislabeled": self.mislabeled,
+            "double_counts": self.double_counts,
+            "false_positives": self.false_positives,
+            "errors": self.errors,
+            "latency": {
+                "mean": self.mean_latency,
+                "p50": self.latency_percentile(50),
+                "p95": self.latency_percentile(95),
+                "max": self.max_latency,
+            },
+        }
+
+
+def _parse_time(value: Any) -> int:
+    if isinstance(value, str):
+        return parse_timestamp(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    raise ValueError(f"invalid timestamp: {value!r}")
+
+
+def _iter_records(path: Path) -> Iterable[dict[str, Any]]:
+    with path.open("rb") as fp:
+        for number, line in enumerate(fp, start=1):
+            if not line.strip():
+                continue
+            record = codec.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{number}: record must be a JSON object")
+            yield record
+
+
+def load_trace(path: Path) -> Trace:
+    """JSON Lines のトレースを読み込む。
+
+    ``TraceRecorder`` が書き出したバイナリトレース（``.vdt`` ファイル、または
+    それを含むディレクトリ）も受け付ける。
+
+    Raises:
+        ValueError: 時刻が昇順でない、または行の形式が不正な場合。
+    """
+
+    if path.is_dir() or path.suffix == ".vdt":
+        # capture パッケージは本モジュールに依存するため遅延インポートする
+        from victory_detector.capture.trace import open_trace, read_traces
+
+        binary = read_traces(path) if path.is_dir() else open_trace(path)
+        return binary.to_replay_trace()
+
+    trace = Trace()
+    for record in _iter_records(path):
+        outcome = record.get("outcome", "unknown")
+        if outcome not in OUTCOMES:
+            outcome = "unknown"
+        timestamp = _parse_time(record["timestamp"])
+        if trace.timestamps and timestamp < trace.timestamps[-1]:
+            raise ValueError(f"trace timestamps must be ascending: {path}")
+        trace.timestamps.append(timestamp)
+        trace.detections.append(
+            DetectionResult(outcome, float(record.get("confidence", 0.0)))
+        )
+    return trace
+
+
+def load_ground_truth(path: Path) -> list[GroundTruth]:
+    """正解データを読み込む。イベントログの場合はカウントされた result のみを使う。"""
+
+    truth: list[GroundTruth] = []
+    for record in _iter_records(path):
+        if record.get("type", "result") != "result" or record.get("delta", 1) <= 0:
+            continue
+        outcome = record.get("outcome", record.get("value"))
+        if outcome not in OUTCOMES:
+            raise ValueError(f"invalid outcome in ground truth: {outcome!r}")
+        truth.append(GroundTruth(_parse_time(record["timestamp"]), outcome))
+    truth.sort(key=lambda item: item.timestamp)
+    return truth
+
+
+def evaluate(
+    report: ReplayReport,
+    ground_truth: Sequence[GroundTruth],
+    tolerance_seconds: float = 30.0,
+) -> ReplayReport:
+    """確定イベントを正解データと照合し、``report`` の集計欄を埋める。
+
+    各イベントは、その時刻以前で ``tolerance_seconds`` 以内に始まった直近の試合に
+    対応付ける。対応する試合がなければ誤検知、既に対応付け済みの試合なら
+    二重カウント、結果が異なれば誤判定として数える。
+    """
+
+    tolerance = int(tolerance_seconds * 1_000_000)
+    starts = [item.timestamp for item in ground_truth]
+    claimed = [False] * len(ground_truth)
+    report.matches = len(ground_truth)
+    report.hits = report.mislabeled = report.double_counts = report.false_positives = 0
+    report.latencies_us = []
+
+    for event in report.events:
+        index = bisect_right(starts, event.timestamp) - 1
+        if index < 0 or event.timestamp - starts[index] > tolerance:
+            report.false_positives += 1
+            continue
+        if claimed[index]:
+            report.double_counts += 1
+            continue
+        claimed[index] = True
+        if event.value == ground_truth[index].outcome:
+            report.hits += 1
+            report.latencies_us.append(event.timestamp - starts[index])
+        else:
+            report.mislabeled += 1
+    report.missed = claimed.count(False)
+    return report
+
+
+def replay(
+    trace: Trace,
+    params: ReplayParams = ReplayParams(),
+    ground_truth: Optional[Sequence[GroundTruth]] = None,
+    tolerance_seconds: float = 30.0,
+) -> ReplayReport:
+    """トレースを元の時刻のまま最高速度で状態機械に流す。
+
+    イベントログは一時ディレクトリに書き出すため、実運用のログには影響しない。
+    """
+
+    with tempfile.TemporaryDirectory(prefix="victory-replay-") as workdir:
+        manager = StateManager(
+            EventLog(Path(workdir) / "replay.jsonl"),
+            cooldown_seconds=params.cooldown_seconds,
+            required_consecutive=params.required_consecutive,
+            none_required_consecutive=params.none_required_consecutive,
+            none_required_seconds=params.none_required_seconds,
+            # 状態機械がトレースの時刻以外を参照しないよう壁時計を使わない
+            clock=ManualClock(trace.timestamps[0] if trace.timestamps else 0),
+        )
+        started = time.perf_counter()
+        steps = manager.record_detections(trace.detections, trace.timestamps)
+        elapsed = time.perf_counter() - started
+
+    report = ReplayReport(
+        params=params,
+        frames=len(trace),
+        events=[step.event for step in steps if step.event is not None],
+        steps=steps,
+        elapsed_seconds=elapsed,
+    )
+    if ground_truth is not None:
+        evaluate(report, ground_truth, tolerance_seconds)
+    return report
+
+
+def resample(trace: Trace, interval_seconds: Optional[float]) -> Trace:
+    """キャプチャ間隔 ``interval_seconds`` で取得した場合のトレースを間引いて作る。
+
+    元のトレースより粗い間隔のみ再現できる。None または 0 以下なら元のまま返す。
+    """
+
+    if not interval_seconds or interval_seconds <= 0 or not trace.timestamps:
+        return trace
+    step = int(interval_seconds * 1_000_000)
+    timestamps = trace.timestamps
+    sampled = Trace()
+    index = 0
+    while index < len(timestamps):
+        sampled.timestamps.append(timestamps[index])
+        sampled.detections.append(trace.detections[index])
+        index = bisect_left(timestamps, timestamps[index] + step, lo=index + 1)
+    return sampled
+
+
+@dataclass(frozen=True, slots=True)
+class SweepPoint:
+    """パラメータ探索の 1 組。``interval`` はキャプチャ間隔（秒、None は元のまま）。"""
+
+    params: ReplayParams
+    interval: Optional[float] = None
+
+
+@dataclass(slots=True)
+class SweepResult:
+    """1 組のパラメータを全トレースで再生した合計。"""
+
+    point: SweepPoint
+    matches: int = 0
+    hits: int = 0
+    missed: int = 0
+    mislabeled: int = 0
+    double_counts: int = 0
+    false_positives: int = 0
+    latencies_us: list[int] = field(default_factory=list)
+
+    @property
+    def accuracy(self) -> float:
+        """正しくカウントできた試合の割合。余分なカウントも分母に含める。"""
+
+        total = self.matches + self.double_counts + self.false_positives
+        return self.hits / total if total else 0.0
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        if not self.latencies_us:
+            return None
+        return sum(self.latencies_us) / len(self.latencies_us) / 1_000_000
+
+    def add(self, report: ReplayReport) -> None:
+        self.matches += report.matches
+        self.hits += report.hits
+        self.missed += report.missed
+        self.mislabeled += report.mislabeled
+        self.double_counts += report.double_counts
+        self.false_positives += report.false_positives
+        self.latencies_us.extend(report.latencies_us)
+
+    def sort_key(self) -> tuple[float, float, float, int]:
+        """精度の高い順、同点なら平均遅延の短い順に並べるためのキー。
+
+        それでも並ぶ場合は、未知のデータに対して余裕のある（クールダウンと
+        none 待ちが長い）組を優先する。
+        """
+
+        latency = self.mean_latency
+        params = self.point.params
+        return (
+            -self.accuracy,
+            latency if latency is not None else float("inf"),
+            -params.cooldown_seconds,
+            -params.none_required_consecutive,
+        )
+
+
+def grid_points(
+    cooldowns: Sequence[float],
+    required: Sequence[int],
+    none_required: Sequence[int],
+    intervals: Sequence[Optional[float]] = (None,),
+    none_seconds: Sequence[Optional[float]] = (None,),
+) -> list[SweepPoint]:
+    """各パラメータ候補の直積を返す。"""
+
+    return [
+        SweepPoint(ReplayParams(cooldown, req, none, seconds), interval)
+        for cooldown, req, none, seconds, interval in product(
+            cooldowns, required, none_required, none_seconds, intervals
+        )
+    ]
+
+
+def random_points(
+    count: int,
+    cooldowns: Sequence[float],
+    required: Sequence[int],
+    none_required: Sequence[int],
+    intervals: Sequence[Optional[float]] = (None,),
+    seed: Optional[int] = None,
+    none_seconds: Sequence[Optional[float]] = (None,),
+) -> list[SweepPoint]:
+    """各パラメータの候補の最小〜最大から一様にサンプリングした ``count`` 組を返す。"""
+
+    rng = random.Random(seed)
+
+    def _float(values: Sequence[Optional[float]]) -> Optional[float]:
+        concrete = [value for value in values if value is not None]
+        if not concrete:
+            return None
+        return round(rng.uniform(min(concrete), max(concrete)), 2)
+
+    def _int(values: Sequence[int]) -> int:
+        return rng.randint(min(values), max(values))
+
+    return [
+        SweepPoint(
+            ReplayParams(
+                _float(cooldowns) or 0,
+                _int(required),
+                _int(none_required),
+                _float(none_seconds),
+            ),
+            _float(intervals),
+        )
+        for _ in range(count)
+    ]
+
+
+# ワーカープロセスごとに一度だけ読み込むデータセット
+_datasets: list[tuple[Trace, list[GroundTruth]]] = []
+_resampled: dict[tuple[int, Optional[float]], Trace] = {}
+
+
+def _init_sweep_worker(paths: Sequence[tuple[str, str]]) -> None:
+    _datasets[:] = [
+        (load_trace(Path(trace)), load_ground_truth(Path(truth)))
+        for trace, truth in paths
+    ]
+    _resampled.clear()
+
+
+def _run_point(point: SweepPoint, tolerance_seconds: float) -> SweepResult:
+    result = SweepResult(point)
+    for number, (trace, truth) in enumerate(_datasets):
+        key = (number, point.interval)
+        if key not in _resampled:
+            _resampled[key] = resample(trace, point.interval)
+        result.add(replay(_resampled[key], point.params, truth, tolerance_seconds))
+    return result
+
+
+def sweep(
+    datasets: Sequence[tuple[Path, Path]],
+    points: Sequence[SweepPoint],
+    workers: Optional[int] = None,
+    tolerance_seconds: float = 30.0,
+) -> list[SweepResult]:
+    """(トレース, 正解データ) の組すべてで各パラメータを評価し、良い順に並べて返す。
+
+    トレースは各ワーカーの起動時に一度だけ読み込み、タスクとしては
+    パラメータのみを送る。``workers=1`` の場合はプロセスを起動しない。
+    """
+
+    paths = [(str(trace), str(truth)) for trace, truth in datasets]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_sweep_worker(paths)
+        results = [_run_point(point, tolerance_seconds) for point in points]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_sweep_worker,
+            initargs=(paths,),
+        ) as pool:
+            results = list(
+                pool.map(
+                    _run_point,
+                    points,
+                    [tolerance_seconds] * len(points),
+                    chunksize=max(1, len(points) // (4 * workers)),
+                )
+            )
+    results.sort(key=SweepResult.sort_key)
+    return results
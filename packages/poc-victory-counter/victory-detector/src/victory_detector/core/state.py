@@ -2,18 +2,58 @@
 
 from __future__ import annotations
 
-import json
+import gzip
+import heapq
+import logging
+import mmap
+import os
+import re
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Iterable, Iterator, Literal, Optional, Sequence, TypedDict
+from contextlib import contextmanager
+from typing import (
+    IO,
+    Any,
+    Iterable,
+    Iterator,
+    Literal,
+    Optional,
+    Sequence,
+    TypedDict,
+)
 
+from . import codec
+from .clock import Clock, SystemClock
 from .vision import DetectionResult
+from .watch import DEFAULT_POLL_INTERVAL, FileWatcher
 
-EventType = Literal["result", "adjustment"]
+try:  # pragma: no cover - プラットフォーム依存
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+EventType = Literal["result", "adjustment", "session_start", "session_end"]
 Outcome = Literal["victory", "defeat", "draw"]
 CooldownState = Literal["COOLDOWN", "WAITING_FOR_NONE", "READY"]
 
+DEFAULT_ROLLING_WINDOW = 10
+EVENT_TYPES = ("result", "adjustment", "session_start", "session_end")
+OUTCOMES = ("victory", "defeat", "draw")
+SESSION_EVENT_TYPES = ("session_start", "session_end")
+
+logger = logging.getLogger(__name__)
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
 
 def utcnow_iso() -> str:
     """UTCのISO8601文字列を返す。"""
@@ -21,6 +61,38 @@ def utcnow_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def utcnow_us() -> int:
+    """現在時刻を UNIX エポックからのマイクロ秒で返す。"""
+
+    return datetime_to_us(datetime.now(timezone.utc))
+
+
+def datetime_to_us(value: datetime) -> int:
+    """datetime をエポックマイクロ秒へ変換する。タイムゾーンなしは UTC とみなす。"""
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def us_to_datetime(value: int) -> datetime:
+    """エポックマイクロ秒を UTC の datetime へ変換する。"""
+
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def parse_timestamp(value: str) -> int:
+    """ISO8601 文字列をエポックマイクロ秒へ変換する。"""
+
+    return datetime_to_us(datetime.fromisoformat(value))
+
+
+def format_timestamp(value: int) -> str:
+    """エポックマイクロ秒を ISO8601 文字列（UTC, ``+00:00``）へ変換する。"""
+
+    return us_to_datetime(value).isoformat()
+
+
 class EventDict(TypedDict, total=False):
     """イベントの永続化フォーマット。"""
 
@@ -34,22 +106,41 @@ class EventDict(TypedDict, total=False):
 
 @dataclass(slots=True)
 class Event:
-    """勝敗結果または手動補正イベント。"""
+    """勝敗結果・手動補正イベント、またはセッション境界マーカー。
+
+    セッション境界マーカー（``session_start`` / ``session_end``）は
+    ``value=None`` / ``delta=0`` で、``note`` にセッション名を持つ。
+    """
 
     type: EventType
-    value: Outcome
+    value: Optional[Outcome]
     delta: int
-    timestamp: str
+    timestamp: int
     confidence: float = 1.0
     note: str = ""
 
+    def __post_init__(self) -> None:
+        # 時刻は内部ではエポックマイクロ秒の int で保持し、ISO8601 への整形は
+        # シリアライズ時にのみ行う。互換のため ISO 文字列・datetime も受け付ける。
+        if isinstance(self.timestamp, str):
+            self.timestamp = parse_timestamp(self.timestamp)
+        elif isinstance(self.timestamp, datetime):
+            self.timestamp = datetime_to_us(self.timestamp)
+
+    @property
+    def iso_timestamp(self) -> str:
+        return format_timestamp(self.timestamp)
+
+    @property
+    def datetime_utc(self) -> datetime:
+        return us_to_datetime(self.timestamp)
+
     def to_dict(self) -> EventDict:
-        data: EventDict = {
-            "type": self.type,
-            "value": self.value,
-            "delta": self.delta,
-            "timestamp": self.timestamp,
-        }
+        data: EventDict = {"type": self.type}
+        if self.value is not None:
+            data["value"] = self.value
+        data["delta"] = self.delta
+        data["timestamp"] = format_timestamp(self.timestamp)
         if self.type == "result":
             data["confidence"] = self.confidence
         if self.note:
@@ -62,14 +153,93 @@ class Event:
 
         return cls(
             type=payload["type"],
-            value=payload["value"],
-            delta=payload.get("delta", 1),
-            timestamp=payload.get("timestamp", utcnow_iso()),
+            value=payload.get("value"),
+            delta=payload.get(
+                "delta", 0 if payload["type"] in SESSION_EVENT_TYPES else 1
+            ),
+            timestamp=payload.get("timestamp", utcnow_us()),
             confidence=payload.get("confidence", 1.0),
             note=payload.get("note", ""),
         )
 
 
+class EventDecodeError(ValueError):
+    """イベントログの 1 行がイベントのスキーマを満たさない場合の例外。"""
+
+
+def decode_event(line: bytes | str) -> Event:
+    """ログの 1 行（JSON）をスキーマ検証しつつ Event へ直接デコードする。
+
+    Raises:
+        EventDecodeError: JSON として不正、またはフィールドの型・値が不正な場合。
+    """
+
+    try:
+        payload = codec.loads(line)
+    except ValueError as exc:
+        raise EventDecodeError(f"invalid JSON: {exc}") from exc
+    if not isinstance(payload, dict):
+        raise EventDecodeError("event must be a JSON object")
+
+    event_type = payload.get("type")
+    if event_type not in EVENT_TYPES:
+        raise EventDecodeError(f"invalid event type: {event_type!r}")
+    value = payload.get("value")
+    if event_type in SESSION_EVENT_TYPES:
+        if value is not None and value not in OUTCOMES:
+            raise EventDecodeError(f"invalid value: {value!r}")
+    elif value not in OUTCOMES:
+        raise EventDecodeError(f"invalid value: {value!r}")
+    delta = payload.get("delta", 0 if event_type in SESSION_EVENT_TYPES else 1)
+    if not isinstance(delta, int) or isinstance(delta, bool):
+        raise EventDecodeError(f"invalid delta: {delta!r}")
+    timestamp = payload.get("timestamp")
+    if timestamp is None:
+        timestamp_us = utcnow_us()
+    elif isinstance(timestamp, str):
+        try:
+            timestamp_us = parse_timestamp(timestamp)
+        except ValueError as exc:
+            raise EventDecodeError(f"invalid timestamp: {timestamp!r}") from exc
+    else:
+        raise EventDecodeError(f"invalid timestamp: {timestamp!r}")
+    confidence = payload.get("confidence", 1.0)
+    if not isinstance(confidence, (int, float)) or isinstance(confidence, bool):
+        raise EventDecodeError(f"invalid confidence: {confidence!r}")
+    note = payload.get("note", "")
+    if not isinstance(note, str):
+        raise EventDecodeError(f"invalid note: {note!r}")
+
+    return Event(
+        type=event_type,
+        value=value,
+        delta=delta,
+        timestamp=timestamp_us,
+        confidence=float(confidence),
+        note=note,
+    )
+
+
+def encode_event(event: Event) -> bytes:
+    """Event を改行なしの JSON バイト列へエンコードする。"""
+
+    return codec.dumps(event.to_dict())
+
+
+def encode_events(events: Iterable[Event]) -> bytes:
+    """Event 列を JSON Lines のバイト列へまとめてエンコードする。"""
+
+    dumps = codec.dumps
+    return b"".join(dumps(event.to_dict()) + b"\n" for event in events)
+
+
+def encode_event_array(events: Iterable[Event]) -> bytes:
+    """Event 列を JSON 配列のバイト列へエンコードする（HTTP API の応答用）。"""
+
+    dumps = codec.dumps
+    return b"[" + b",".join(dumps(event.to_dict()) for event in events) + b"]"
+
+
 @dataclass(slots=True)
 class DetectionResponse:
     """検知結果のレスポンス（連続検知対応）。"""
@@ -79,29 +249,97 @@ class DetectionResponse:
     is_first_detection: bool
 
 
+@dataclass(slots=True)
+class DetectionStep:
+    """record_detections() で、イベントの確定またはクールダウン状態の遷移が起きたフレーム。"""
+
+    index: int
+    timestamp: int
+    cooldown_state: CooldownState
+    event: Optional[Event] = None
+
+
+def _event_time(event: Event) -> int:
+    return event.timestamp
+
+
 @dataclass(slots=True)
 class CounterState:
-    """勝敗カウンタの集計結果。"""
+    """勝敗カウンタの集計結果。
+
+    カウントに加えて連勝・連敗数と直近 ``window_size`` 試合のローリング集計を
+    イベント適用時に逐次更新する。いずれも 1 イベントあたり O(1) で、
+    ``results`` を走査し直す必要はない。
+    """
 
     victories: int = 0
     defeats: int = 0
     draws: int = 0
     adjustments: list[Event] = field(default_factory=list)
     results: list[Event] = field(default_factory=list)
+    window_size: int = DEFAULT_ROLLING_WINDOW
+    streak_outcome: Optional[Outcome] = None
+    current_streak: int = 0
+    best_victory_streak: int = 0
+    best_defeat_streak: int = 0
+    recent_victories: int = 0
+    recent_defeats: int = 0
+    recent_draws: int = 0
+    recent: deque[Outcome] = field(default_factory=deque, repr=False)
+    # merge 用: 先頭から途切れずに続く同一結果の件数
+    leading_outcome: Optional[Outcome] = None
+    leading_streak: int = 0
+    last_detection: Optional[int] = None
 
     @property
     def total(self) -> int:
         return self.victories + self.defeats + self.draws
 
+    @property
+    def win_rate(self) -> Optional[float]:
+        """全試合の勝率。試合がなければ None。"""
+
+        total = self.total
+        return self.victories / total if total else None
+
+    @property
+    def recent_total(self) -> int:
+        return len(self.recent)
+
+    @property
+    def recent_win_rate(self) -> Optional[float]:
+        """直近 ``window_size`` 試合の勝率。試合がなければ None。"""
+
+        total = len(self.recent)
+        return self.recent_victories / total if total else None
+
+    def results_between(self, start: int, end: int) -> list[Event]:
+        """時刻が ``[start, end)``（エポックマイクロ秒）の result イベントを返す。
+
+        results は追記順＝時刻順のため、整数時刻の二分探索で範囲を切り出す。
+        """
+
+        lo = bisect_left(self.results, start, key=_event_time)
+        hi = bisect_left(self.results, end, lo=lo, key=_event_time)
+        return self.results[lo:hi]
+
     def apply(self, event: Event) -> None:
+        # セッション境界マーカーは集計対象外
+        if event.type in SESSION_EVENT_TYPES:
+            return
+
         # delta > 0の場合のみカウントを更新
-        if event.delta > 0:
+        if event.delta > 0 and event.value is not None:
             if event.value == "victory":
                 self.victories += event.delta
             elif event.value == "defeat":
                 self.defeats += event.delta
             else:
                 self.draws += event.delta
+            # 手動補正の加算も「取りこぼした試合」として連勝・直近集計に反映する
+            self._record_games(event.value, event.delta)
+            if event.type == "result":
+                self.last_detection = event.timestamp
 
         # delta=0でもイベントリストには追加（ログとして保持）
         if event.type == "result":
@@ -109,40 +347,710 @@ class CounterState:
         else:
             self.adjustments.append(event)
 
+    def _record_games(self, value: Outcome, count: int) -> None:
+        """``value`` の試合を ``count`` 件、連勝数とローリング集計へ積む。"""
+
+        # apply() でカウント加算済みのため、直前までの試合数は total - count
+        if self.leading_outcome is None:
+            self.leading_outcome = value
+            self.leading_streak = count
+        elif (
+            value == self.leading_outcome
+            and self.leading_streak == self.total - count
+        ):
+            self.leading_streak += count
+
+        if value == self.streak_outcome:
+            self.current_streak += count
+        else:
+            self.streak_outcome = value
+            self.current_streak = count
+        if value == "victory":
+            self.best_victory_streak = max(
+                self.best_victory_streak, self.current_streak
+            )
+        elif value == "defeat":
+            self.best_defeat_streak = max(self.best_defeat_streak, self.current_streak)
+
+        self._push_recent(value, count)
+
+    def _push_recent(self, value: Outcome, count: int) -> None:
+        if self.window_size <= 0:
+            return
+        # ウィンドウを超える分は押し出されるだけなので最大 window_size 件で十分
+        for _ in range(min(count, self.window_size)):
+            if len(self.recent) >= self.window_size:
+                self._bump_recent(self.recent.popleft(), -1)
+            self.recent.append(value)
+            self._bump_recent(value, 1)
+
+    def merge(self, other: "CounterState") -> "CounterState":
+        """``other`` を自身の後ろに続くイベント列の集計として結合する。
+
+        ``aggregate(a + b)`` と ``aggregate(a).merge(aggregate(b))`` は同じ結果になる。
+        """
+
+        self.results.extend(other.results)
+        self.adjustments.extend(other.adjustments)
+        if other.last_detection is not None:
+            self.last_detection = other.last_detection
+        if other.total == 0:
+            return self
+
+        before = self.total
+        other_uniform = other.leading_streak == other.total
+
+        # 境界をまたぐ連続結果の長さ
+        joined = other.leading_streak
+        if self.streak_outcome == other.leading_outcome:
+            joined += self.current_streak
+        self.best_victory_streak = max(
+            self.best_victory_streak, other.best_victory_streak
+        )
+        self.best_defeat_streak = max(
+            self.best_defeat_streak, other.best_defeat_streak
+        )
+        if other.leading_outcome == "victory":
+            self.best_victory_streak = max(self.best_victory_streak, joined)
+        elif other.leading_outcome == "defeat":
+            self.best_defeat_streak = max(self.best_defeat_streak, joined)
+
+        if before == 0:
+            self.leading_outcome = other.leading_outcome
+            self.leading_streak = other.leading_streak
+        elif (
+            self.leading_streak == before
+            and self.leading_outcome == other.leading_outcome
+        ):
+            self.leading_streak += other.leading_streak
+
+        if other_uniform and self.streak_outcome == other.streak_outcome:
+            self.current_streak += other.current_streak
+        else:
+            self.streak_outcome = other.streak_outcome
+            self.current_streak = other.current_streak
+
+        self.victories += other.victories
+        self.defeats += other.defeats
+        self.draws += other.draws
+        for value in other.recent:
+            self._push_recent(value, 1)
+        return self
+
+    def _bump_recent(self, value: Outcome, step: int) -> None:
+        if value == "victory":
+            self.recent_victories += step
+        elif value == "defeat":
+            self.recent_defeats += step
+        else:
+            self.recent_draws += step
+
+    def to_snapshot(self) -> dict[str, Any]:
+        """イベント一覧を除いた集計値を JSON 化できる dict で返す（ログ圧縮用）。"""
+
+        return {
+            "victories": self.victories,
+            "defeats": self.defeats,
+            "draws": self.draws,
+            "window_size": self.window_size,
+            "streak_outcome": self.streak_outcome,
+            "current_streak": self.current_streak,
+            "best_victory_streak": self.best_victory_streak,
+            "best_defeat_streak": self.best_defeat_streak,
+            "recent": list(self.recent),
+            "leading_outcome": self.leading_outcome,
+            "leading_streak": self.leading_streak,
+            "last_detection": self.last_detection,
+        }
+
+    @classmethod
+    def from_snapshot(
+        cls, payload: dict[str, Any], window_size: Optional[int] = None
+    ) -> "CounterState":
+        """to_snapshot() の出力から復元する。``results`` / ``adjustments`` は空になる。
+
+        ``window_size`` を指定した場合はローリング集計をその幅に詰め直す。
+        """
+
+        state = cls(
+            victories=int(payload["victories"]),
+            defeats=int(payload["defeats"]),
+            draws=int(payload["draws"]),
+            window_size=window_size or int(payload["window_size"]),
+            streak_outcome=payload.get("streak_outcome"),
+            current_streak=int(payload.get("current_streak", 0)),
+            best_victory_streak=int(payload.get("best_victory_streak", 0)),
+            best_defeat_streak=int(payload.get("best_defeat_streak", 0)),
+            leading_outcome=payload.get("leading_outcome"),
+            leading_streak=int(payload.get("leading_streak", 0)),
+            last_detection=payload.get("last_detection"),
+        )
+        for value in payload.get("recent", []):
+            state._push_recent(value, 1)
+        return state
+
+
+@dataclass(slots=True)
+class Session:
+    """ログ上のセッション境界マーカーで区切られた区間とその集計。
+
+    ``start_index`` / ``end_index`` はイベントログ内の位置（0 始まり）で、
+    区間は ``[start_index, end_index)``。進行中のセッションは ``end_index`` が None。
+    """
+
+    id: int
+    name: str
+    started_at: int
+    start_index: int
+    state: CounterState
+    end_index: Optional[int] = None
+    ended_at: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        return self.end_index is None
+
+
+class SessionIndex:
+    """イベント列からセッションごとの集計を逐次構築するインデックス。
+
+    各セッションは自前の CounterState を持つため、任意のセッションの集計は
+    過去のセッションを走査せずに ID から O(1) で参照できる。
+    """
+
+    def __init__(
+        self, window_size: int = DEFAULT_ROLLING_WINDOW, partial: bool = False
+    ) -> None:
+        """
+        Args:
+            window_size: 各セッションの CounterState に渡すローリング集計幅
+            partial: ログの途中から構築する場合に True。最初のマーカーより前の
+                イベントは直前のチャンクで進行中だったセッションの分として
+                仮セッションに集計し、merge() 時に引き継ぐ。
+        """
+
+        self._window_size = window_size
+        self._sessions: list[Session] = []
+        self._current: Optional[Session] = None
+        self._event_count = 0
+        self._carry: Optional[Session] = None
+        if partial:
+            self._carry = Session(
+                id=0,
+                name="",
+                started_at=0,
+                start_index=0,
+                state=CounterState(window_size=window_size),
+            )
+            self._current = self._carry
+
+    @property
+    def sessions(self) -> list[Session]:
+        return list(self._sessions)
+
+    @property
+    def current(self) -> Optional[Session]:
+        return self._current
+
+    @property
+    def event_count(self) -> int:
+        """これまでに適用したイベント数（次のイベントのログ内位置）。"""
+
+        return self._event_count
+
+    def get(self, session_id: int) -> Optional[Session]:
+        if 1 <= session_id <= len(self._sessions):
+            return self._sessions[session_id - 1]
+        return None
+
+    def apply(self, event: Event) -> None:
+        index = self._event_count
+        self._event_count += 1
+        if event.type == "session_start":
+            # 終了マーカーなしで次のセッションが始まった場合は暗黙に閉じる
+            self._close(index, event.timestamp)
+            self._current = Session(
+                id=len(self._sessions) + 1,
+                name=event.note,
+                started_at=event.timestamp,
+                start_index=index,
+                state=CounterState(window_size=self._window_size),
+            )
+            self._sessions.append(self._current)
+        elif event.type == "session_end":
+            self._close(index + 1, event.timestamp)
+        elif self._current is not None:
+            self._current.state.apply(event)
+
+    def _close(self, end_index: int, timestamp: int) -> None:
+        if self._current is None:
+            return
+        self._current.end_index = end_index
+        self._current.ended_at = timestamp
+        self._current = None
+
+    def merge(self, other: "SessionIndex") -> "SessionIndex":
+        """``partial=True`` で構築した後続チャンクのインデックスを結合する。"""
+
+        offset = self._event_count
+        carry = other._carry
+        if carry is not None and self._current is not None:
+            self._current.state.merge(carry.state)
+            if carry.end_index is not None:
+                self._current.end_index = carry.end_index + offset
+                self._current.ended_at = carry.ended_at
+                self._current = None
+        elif carry is None and other._sessions:
+            # 完結したインデックス同士の結合では進行中のセッションを暗黙に閉じる
+            self._close(offset, other._sessions[0].started_at)
+
+        for session in other._sessions:
+            session.id = len(self._sessions) + 1
+            session.start_index += offset
+            if session.end_index is not None:
+                session.end_index += offset
+            self._sessions.append(session)
+        if other._sessions:
+            self._current = other._current
+        self._event_count += other._event_count
+        return self
+
+    def to_snapshot(self) -> dict[str, Any]:
+        """セッション一覧と集計を JSON 化できる dict で返す（ログ圧縮用）。"""
+
+        return {
+            "event_count": self._event_count,
+            "current": self._current.id if self._current is not None else None,
+            "sessions": [
+                {
+                    "id": session.id,
+                    "name": session.name,
+                    "started_at": session.started_at,
+                    "start_index": session.start_index,
+                    "end_index": session.end_index,
+                    "ended_at": session.ended_at,
+                    "state": session.state.to_snapshot(),
+                }
+                for session in self._sessions
+            ],
+        }
+
+    @classmethod
+    def from_snapshot(
+        cls, payload: dict[str, Any], window_size: int = DEFAULT_ROLLING_WINDOW
+    ) -> "SessionIndex":
+        index = cls(window_size=window_size)
+        index._event_count = int(payload.get("event_count", 0))
+        for item in payload.get("sessions", []):
+            index._sessions.append(
+                Session(
+                    id=int(item["id"]),
+                    name=item.get("name", ""),
+                    started_at=int(item["started_at"]),
+                    start_index=int(item["start_index"]),
+                    state=CounterState.from_snapshot(item["state"], window_size),
+                    end_index=item.get("end_index"),
+                    ended_at=item.get("ended_at"),
+                )
+            )
+        current = payload.get("current")
+        if current is not None:
+            index._current = index.get(int(current))
+        return index
+
+
+@contextmanager
+def _locked(fp: IO[bytes]) -> Iterator[None]:
+    """ファイル全体に排他的なアドバイザリロックをかける。
+
+    同じログへ追記する別プロセス（OBS スクリプトのサーバと推論プロセスなど）の
+    書き込みが行の途中で混ざらないようにする。
+    """
+
+    if fcntl is not None:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+        return
+
+    # Windows: 先頭 1 バイトの範囲ロックをミューテックスとして使う（EOF 超えも可）
+    position = fp.tell()
+    fp.seek(0)
+    msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+    fp.seek(position)
+    try:
+        yield
+    finally:
+        fp.flush()
+        fp.seek(0)
+        msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+SUMMARY_VERSION = 1
+
+
+def _iter_file(
+    path: Path, offset: int = 0, complete_only: bool = True
+) -> Iterator[tuple[Event, int]]:
+    """ログファイル（``.gz`` も可）の ``offset`` 以降を (イベント, 次の行の開始位置) で返す。
+
+    ``complete_only`` が True の場合、改行で終わっていない末尾の行は書き込み途中と
+    みなして読まない。
+    """
+
+    opener = gzip.open if path.suffix == ".gz" else open
+    try:
+        fp = opener(path, "rb")
+    except FileNotFoundError:
+        return
+    with fp:
+        if offset:
+            fp.seek(offset)
+        position = offset
+        for line in fp:
+            if complete_only and not line.endswith(b"\n"):
+                break
+            position += len(line)
+            if line.strip():
+                yield decode_event(line), position
+
 
 class EventLog:
-    """JSON Lines形式でイベントを永続化するロガー。"""
+    """JSON Lines形式でイベントを永続化するロガー。
+
+    追記はロックファイル（``<ログ名>.lock``）の排他ロックの下で 1 回の write として
+    行うため、複数プロセスから同じログへ追記しても行が混ざらない。
+
+    ``max_segment_bytes`` / ``rotate_daily`` を指定するとログをセグメントに分割する。
+    追記先（アクティブセグメント）は常に ``path`` で、ローテーション時に
+    ``<stem>.000001<suffix>`` のような連番ファイルへ改名して封印する。
+    封印済みセグメントは ``compact()`` で集計スナップショット
+    （``<stem>.summary.json``）へ畳み込み、``archive=True`` なら gzip で保存する。
+    ローテーション設定は追記時にのみ使われ、読み込みは設定に関係なく
+    既存のセグメント・サマリを認識する。
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_segment_bytes: Optional[int] = None,
+        rotate_daily: bool = False,
+        compact_on_rotate: bool = True,
+        archive: bool = True,
+    ) -> None:
+        """
+        Args:
+            max_segment_bytes: アクティブセグメントがこのサイズ以上になったら
+                次の追記前にローテーションする。
+            rotate_daily: アクティブセグメントの最終更新日（ローカル日付）が
+                今日でなければ次の追記前にローテーションする。
+            compact_on_rotate: ローテーション直後に封印済みセグメントを圧縮する。
+            archive: 圧縮したセグメントを gzip で残す。False なら削除する。
+        """
 
-    def __init__(self, path: Path) -> None:
         self._path = path
         self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_segment_bytes = max_segment_bytes
+        self._rotate_daily = rotate_daily
+        self._compact_on_rotate = compact_on_rotate
+        self._archive = archive
+        stem, suffix = path.stem, path.suffix
+        self._segment_pattern = re.compile(
+            rf"^{re.escape(stem)}\.(\d+){re.escape(suffix)}(\.gz)?$"
+        )
+        self._summary_path = path.with_name(f"{stem}.summary.json")
+        self._lock_path = path.with_name(path.name + ".lock")
 
     @property
     def path(self) -> Path:
+        """アクティブセグメント（追記先）のパス。"""
+
         return self._path
 
+    @property
+    def summary_path(self) -> Path:
+        return self._summary_path
+
+    def segment_path(self, sequence: int, archived: bool = False) -> Path:
+        name = f"{self._path.stem}.{sequence:06d}{self._path.suffix}"
+        return self._path.with_name(name + ".gz" if archived else name)
+
+    @contextmanager
+    def _writer(self) -> Iterator[IO[bytes]]:
+        """ロックを取得し、必要ならローテーションしてから追記先を開く。
+
+        末尾が改行で終わっていなければ（手で編集したログなど）先に改行を書き、
+        追記する行が直前の行とつながらないようにする。
+        """
+
+        with self._lock_path.open("a+b") as lock_fp, _locked(lock_fp):
+            if self._should_rotate():
+                self._rotate_locked()
+            with self._path.open("a+b") as fp:
+                if fp.seek(0, os.SEEK_END) > 0:
+                    fp.seek(-1, os.SEEK_END)
+                    if fp.read(1) != b"\n":
+                        fp.seek(0, os.SEEK_END)
+                        fp.write(b"\n")
+                yield fp
+                fp.flush()
+
+    def repair(self) -> bool:
+        """アクティブセグメントの改行で終わっていない末尾の行を直す。
+
+        そのような行は読み込みでは書き込み途中とみなされ、カウントされない。
+        ロックの下では書き込み途中の行はありえないため、イベントとして読めれば
+        改行を足し、読めなければ（書き込み中に落ちた断片として）切り詰める。
+        直した場合は True を返す。
+        """
+
+        with self._lock_path.open("a+b") as lock_fp, _locked(lock_fp):
+            try:
+                fp = self._path.open("r+b")
+            except FileNotFoundError:
+                return False
+            with fp:
+                size = fp.seek(0, os.SEEK_END)
+                if size == 0:
+                    return False
+                fp.seek(-1, os.SEEK_END)
+                if fp.read(1) == b"\n":
+                    return False
+                # 最後の改行の直後（末尾の行の先頭）を後ろから探す
+                start = size
+                while start > 0:
+                    step = min(start, 4096)
+                    fp.seek(start - step)
+                    index = fp.read(step).rfind(b"\n")
+                    if index >= 0:
+                        start += index + 1 - step
+                        break
+                    start -= step
+                fp.seek(start)
+                tail = fp.read()
+                try:
+                    decode_event(tail)
+                except EventDecodeError:
+                    logger.warning(
+                        "dropping incomplete line at end of %s: %r", self._path, tail
+                    )
+                    fp.truncate(start)
+                else:
+                    fp.seek(0, os.SEEK_END)
+                    fp.write(b"\n")
+                return True
+
     def append(self, event: Event) -> None:
-        with self._path.open("a", encoding="utf-8") as fp:
-            fp.write(json.dumps(event.to_dict(), ensure_ascii=False))
-            fp.write("\n")
+        with self._writer() as fp:
+            fp.write(encode_event(event) + b"\n")
+
+    def extend(self, events: Iterable[Event], batch_size: int = 1024) -> int:
+        """複数イベントをまとめて追記し、書き込んだ件数を返す。
+
+        ``events`` はイテレータのまま ``batch_size`` 件ずつエンコードして書き込むため、
+        件数が多くてもメモリ使用量は一定。
+        """
+
+        written = 0
+        batch: list[Event] = []
+        for event in events:
+            batch.append(event)
+            if len(batch) >= batch_size:
+                with self._writer() as fp:
+                    fp.write(encode_events(batch))
+                written += len(batch)
+                batch.clear()
+        if batch:
+            with self._writer() as fp:
+                fp.write(encode_events(batch))
+            written += len(batch)
+        return written
+
+    def _should_rotate(self) -> bool:
+        if self._max_segment_bytes is None and not self._rotate_daily:
+            return False
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return False
+        if st.st_size == 0:
+            return False
+        if self._max_segment_bytes is not None and st.st_size >= self._max_segment_bytes:
+            return True
+        return (
+            self._rotate_daily
+            and datetime.fromtimestamp(st.st_mtime).date() != datetime.now().date()
+        )
+
+    def rotate(self) -> Optional[Path]:
+        """アクティブセグメントを封印する。封印したセグメントのパスを返す。"""
+
+        with self._lock_path.open("a+b") as lock_fp, _locked(lock_fp):
+            return self._rotate_locked()
+
+    def _rotate_locked(self) -> Optional[Path]:
+        if not self._path.exists() or self._path.stat().st_size == 0:
+            return None
+        target = self.segment_path(self._next_sequence())
+        try:
+            os.rename(self._path, target)
+        except PermissionError:  # pragma: no cover - Windows で他プロセスが開いている
+            logger.warning("event log rotation deferred: %s is in use", self._path)
+            return None
+        if self._compact_on_rotate:
+            self._compact_locked(self._archive)
+        return target
+
+    def _scan(self) -> tuple[list[tuple[int, Path]], list[tuple[int, Path]]]:
+        """(封印済みセグメント, gzip アーカイブ) を連番順に列挙する。"""
+
+        segments: list[tuple[int, Path]] = []
+        archives: list[tuple[int, Path]] = []
+        for entry in os.scandir(self._path.parent):
+            match = self._segment_pattern.match(entry.name)
+            if match is None:
+                continue
+            item = (int(match.group(1)), Path(entry.path))
+            (archives if match.group(2) else segments).append(item)
+        return sorted(segments), sorted(archives)
+
+    def _next_sequence(self) -> int:
+        segments, archives = self._scan()
+        summary = self.load_summary()
+        last = summary["last_segment"] if summary else 0
+        return max([last, *(seq for seq, _ in segments + archives)]) + 1
+
+    def segments(self) -> list[Path]:
+        """まだ圧縮されていない封印済みセグメントを古い順に返す。"""
+
+        summary = self.load_summary()
+        last = summary["last_segment"] if summary else 0
+        return [path for seq, path in self._scan()[0] if seq > last]
 
-    def read_events(self) -> Iterator[Event]:
-        if not self._path.exists():
-            return iter(())
+    def archives(self) -> list[Path]:
+        """圧縮済みセグメントの gzip アーカイブを古い順に返す。"""
+
+        summary = self.load_summary()
+        last = summary["last_segment"] if summary else 0
+        return [path for seq, path in self._scan()[1] if seq <= last]
+
+    def load_summary(self) -> Optional[dict[str, Any]]:
+        """圧縮済みセグメントの集計スナップショット。未圧縮なら None。"""
+
+        try:
+            data = self._summary_path.read_bytes()
+        except FileNotFoundError:
+            return None
+        summary = codec.loads(data)
+        if summary.get("version") != SUMMARY_VERSION:
+            raise ValueError(f"unsupported event log summary: {self._summary_path}")
+        return summary
+
+    def compact(self, archive: Optional[bool] = None) -> Optional[dict[str, Any]]:
+        """封印済みセグメントをサマリへ畳み込み、更新後のサマリを返す。"""
+
+        with self._lock_path.open("a+b") as lock_fp, _locked(lock_fp):
+            return self._compact_locked(self._archive if archive is None else archive)
+
+    def _compact_locked(self, archive: bool) -> Optional[dict[str, Any]]:
+        summary = self.load_summary()
+        last = summary["last_segment"] if summary else 0
+        pending = [(seq, path) for seq, path in self._scan()[0] if seq > last]
+        if not pending:
+            return summary
+
+        window_size = (
+            summary["counter"]["window_size"] if summary else DEFAULT_ROLLING_WINDOW
+        )
+        if summary:
+            counter = CounterState.from_snapshot(summary["counter"])
+            sessions = SessionIndex.from_snapshot(summary["sessions"], window_size)
+        else:
+            counter = CounterState(window_size=window_size)
+            sessions = SessionIndex(window_size=window_size)
+        for _, path in pending:
+            for event, _ in _iter_file(path, complete_only=False):
+                counter.apply(event)
+                sessions.apply(event)
+            # サマリにはイベント一覧を持たせないので、集計済みの分は捨てる
+            counter.results.clear()
+            counter.adjustments.clear()
+            if archive:
+                archived = path.with_name(path.name + ".gz")
+                partial = archived.with_name(archived.name + ".tmp")
+                with path.open("rb") as src, gzip.open(partial, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(partial, archived)
+
+        summary = {
+            "version": SUMMARY_VERSION,
+            "last_segment": pending[-1][0],
+            "event_count": sessions.event_count,
+            "counter": counter.to_snapshot(),
+            "sessions": sessions.to_snapshot(),
+            "updated_at": utcnow_iso(),
+        }
+        # サマリを書き換えてからセグメントを消すため、途中で落ちても二重集計しない
+        partial = self._summary_path.with_name(self._summary_path.name + ".tmp")
+        partial.write_bytes(codec.dumps(summary))
+        os.replace(partial, self._summary_path)
+        for _, path in pending:
+            path.unlink()
+        return summary
+
+    def identity(self) -> Optional[tuple[int, int]]:
+        """アクティブセグメントの (デバイス, inode)。置き換え・ローテーションの判定に使う。"""
+
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def iter_from(self, offset: int = 0) -> Iterator[tuple[Event, int]]:
+        """アクティブセグメントの ``offset`` 以降の完結した行を返す。
+
+        改行で終わっていない末尾の行は書き込み途中とみなし、次回以降に読む。
+        """
+
+        return _iter_file(self._path, offset)
+
+    def _files(self, include_archives: bool = True) -> list[Path]:
+        files = self.archives() if include_archives else []
+        files.extend(self.segments())
+        files.append(self._path)
+        return files
+
+    def read_events(self, include_archives: bool = True) -> Iterator[Event]:
+        """全セグメントのイベントを古い順に遅延読み込みで返す。
+
+        ``include_archives=False`` の場合は圧縮済みのアーカイブを読まない。
+        """
 
         def _iter() -> Iterator[Event]:
-            with self._path.open("r", encoding="utf-8") as fp:
-                for line in fp:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    payload = json.loads(line)
-                    yield Event.from_dict(payload)
+            for path in self._files(include_archives):
+                for event, _ in _iter_file(path, complete_only=False):
+                    yield event
 
         return _iter()
 
     def tail(self, limit: int) -> list[Event]:
-        return list(self.read_events())[-limit:]
+        """末尾 ``limit`` 件。新しいセグメントから必要な分だけ読む。"""
+
+        if limit <= 0:
+            return []
+        chunks: list[list[Event]] = []
+        remaining = limit
+        for path in reversed(self._files()):
+            events = [event for event, _ in _iter_file(path, complete_only=False)]
+            if events:
+                chunks.append(events[-remaining:])
+                remaining -= len(chunks[-1])
+            if remaining <= 0:
+                break
+        return [event for chunk in reversed(chunks) for event in chunk]
 
 
 class StateManager:
@@ -154,21 +1062,50 @@ class StateManager:
         cooldown_seconds: int = 180,
         required_consecutive: int = 2,
         none_required_consecutive: int = 50,
+        rolling_window: int = DEFAULT_ROLLING_WINDOW,
+        replay_workers: int = 1,
+        clock: Optional[Clock] = None,
+        none_required_seconds: Optional[float] = None,
     ) -> None:
+        """
+        Args:
+            none_required_seconds: 指定すると WAITING_FOR_NONE から READY への遷移を
+                none の連続回数ではなく、none が途切れずに続いた時間（秒）で判定する。
+                キャプチャ間隔や処理負荷でフレームレートが変わっても意味が変わらない。
+            replay_workers: 起動・reload 時のログ再生に使うプロセス数。
+                2 以上でファイルをチャンク分割して並列に再生する。
+            clock: 検知・補正の時刻に使う時計。省略時は壁時計。トレースの再生や
+                テストでは ManualClock を渡して時刻を制御する。
+        """
+
         self._log = event_log
         self._cooldown_seconds = cooldown_seconds
+        self._cooldown_us = int(cooldown_seconds * 1_000_000)
         self._required_consecutive = required_consecutive
         self._none_required_consecutive = none_required_consecutive
-        self._state = CounterState()
-        for event in self._log.read_events():
-            self._state.apply(event)
-        self._last_detection_time = self._find_last_detection_time()
+        self._none_required_us = (
+            int(none_required_seconds * 1_000_000)
+            if none_required_seconds is not None
+            else None
+        )
+        self._rolling_window = rolling_window
+        self._replay_workers = replay_workers
+        self._clock: Clock = clock or SystemClock()
+        # 他プロセスの追記を取り込むスレッドと API スレッドからの同時更新を直列化する
+        self._lock = threading.RLock()
+        self._watcher: Optional[FileWatcher] = None
+        self._log.repair()
+        self._state, self._sessions, self._offset = self._replay()
+        self._log_identity = self._log.identity()
+        # 最後にカウントした検知の時刻（エポックマイクロ秒）
+        self._last_detection_time = self._state.last_detection
         # 連続検知追跡用（勝敗判定用）
         self._consecutive_outcome: Optional[Outcome] = None
         self._consecutive_count: int = 0
         # 2段階クールダウン用
         self._cooldown_state: CooldownState = "READY"
         self._none_consecutive_count: int = 0
+        self._none_since: int = 0
         # 初期状態の設定
         if self._last_detection_time is not None:
             self._cooldown_state = "COOLDOWN"
@@ -177,42 +1114,302 @@ class StateManager:
     def summary(self) -> CounterState:
         return self._state
 
-    def _find_last_detection_time(self) -> Optional[datetime]:
-        """イベントログから最後の検知時刻（delta > 0のresult）を取得。"""
-        events = list(self._log.read_events())
-        for event in reversed(events):
-            if event.type == "result" and event.delta > 0:
-                return datetime.fromisoformat(event.timestamp)
+    @property
+    def sessions(self) -> list[Session]:
+        return self._sessions.sessions
+
+    @property
+    def current_session(self) -> Optional[Session]:
+        return self._sessions.current
+
+    def get_session(self, session_id: int) -> Optional[Session]:
+        return self._sessions.get(session_id)
+
+    def start_session(self, name: str = "") -> Session:
+        """新しいセッションを開始する。進行中のセッションは暗黙に終了する。"""
+
+        self._persist(
+            Event(
+                type="session_start",
+                value=None,
+                delta=0,
+                timestamp=self._clock.now_us(),
+                note=name,
+            )
+        )
+        session = self._sessions.current
+        assert session is not None
+        return session
+
+    def end_session(self) -> Optional[Session]:
+        """進行中のセッションを終了する。セッションがなければ None を返す。"""
+
+        session = self._sessions.current
+        if session is None:
+            return None
+        self._persist(
+            Event(
+                type="session_end",
+                value=None,
+                delta=0,
+                timestamp=self._clock.now_us(),
+                note=session.name,
+            )
+        )
+        return session
+
+    def _replay(self) -> tuple[CounterState, "SessionIndex", int]:
+        """サマリ（圧縮済みセグメントの集計）に未圧縮のセグメントを順に積む。
+
+        戻り値の 3 要素目はアクティブセグメントを読み終えたバイト位置。
+        """
+
+        summary = self._log.load_summary()
+        if summary is not None:
+            counter = CounterState.from_snapshot(
+                summary["counter"], self._rolling_window
+            )
+            sessions = SessionIndex.from_snapshot(
+                summary["sessions"], self._rolling_window
+            )
+        else:
+            counter = CounterState(window_size=self._rolling_window)
+            sessions = SessionIndex(window_size=self._rolling_window)
+
+        offset = 0
+        for path in [*self._log.segments(), self._log.path]:
+            if self._replay_workers > 1:
+                part_counter, part_sessions, offset = replay_parallel(
+                    path,
+                    workers=self._replay_workers,
+                    window_size=self._rolling_window,
+                    partial=True,
+                )
+                counter.merge(part_counter)
+                sessions.merge(part_sessions)
+                continue
+            offset = 0
+            # 封印済みのセグメントにはもう追記されないので末尾の行も読む
+            complete_only = path == self._log.path
+            for event, offset in _iter_file(path, complete_only=complete_only):
+                counter.apply(event)
+                sessions.apply(event)
+        return counter, sessions, offset
+
+    def sync(self) -> int:
+        """前回読み込んだ位置以降の追記（他プロセス分を含む）を取り込む。
+
+        アクティブセグメントがローテーションされた場合は、封印されたセグメントの
+        残りと新しいアクティブセグメントを続けて読む。封印済みセグメントが既に
+        圧縮されていた場合や、ログが置き換えられた・切り詰められた場合は
+        全体（サマリ + 未圧縮セグメント）を再読込する。取り込んだイベント数を返す。
+        """
+
+        with self._lock:
+            identity = self._log.identity()
+            if identity != self._log_identity:
+                pending = self._rotated_segments()
+                if pending is None:
+                    self._reload_locked()
+                    return self._sessions.event_count
+                applied = 0
+                for index, path in enumerate(pending):
+                    start = self._offset if index == 0 else 0
+                    for event, _ in _iter_file(path, start, complete_only=False):
+                        self._apply(event)
+                        applied += 1
+                self._log_identity = identity
+                self._offset = 0
+                return applied + self._sync_active()
+            size = self._log.path.stat().st_size if identity is not None else 0
+            if size < self._offset:
+                self._reload_locked()
+                return self._sessions.event_count
+            return self._sync_active()
+
+    def _sync_active(self) -> int:
+        applied = 0
+        for event, offset in self._log.iter_from(self._offset):
+            self._apply(event)
+            self._offset = offset
+            applied += 1
+        return applied
+
+    def _rotated_segments(self) -> Optional[list[Path]]:
+        """前回読んでいたアクティブセグメントが封印された先と、それ以降のセグメント。
+
+        見つからない（圧縮済み・置き換え）場合は None。
+        """
+
+        if self._log_identity is None:
+            return None
+        segments = self._log.segments()
+        for index, path in enumerate(segments):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return None
+            if (st.st_dev, st.st_ino) == self._log_identity:
+                return segments[index:]
         return None
 
+    def follow(
+        self, poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True
+    ) -> FileWatcher:
+        """ログの変更監視を開始し、他プロセスの追記を自動で取り込む。"""
+
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = FileWatcher(
+                    self._log.path,
+                    self.sync,
+                    poll_interval=poll_interval,
+                    use_inotify=use_inotify,
+                ).start()
+            return self._watcher
+
+    def stop_following(self) -> None:
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.stop()
+
+    def _apply(self, event: Event) -> None:
+        self._state.apply(event)
+        self._sessions.apply(event)
+        if event.type == "result" and event.delta > 0:
+            # 他プロセスがカウントした場合もクールダウンを共有する
+            self._last_detection_time = event.timestamp
+            self._cooldown_state = "COOLDOWN"
+
+    @property
+    def cooldown_state(self) -> CooldownState:
+        return self._cooldown_state
+
+    @property
+    def pending_outcome(self) -> Optional[Outcome]:
+        """READY で連続検知を数えている途中の勝敗（なければ None）。"""
+
+        return self._consecutive_outcome
+
+    def cooldown_until(self) -> Optional[int]:
+        """COOLDOWN が明ける時刻（エポックマイクロ秒）。COOLDOWN 以外では None。"""
+
+        with self._lock:
+            if self._cooldown_state != "COOLDOWN" or self._last_detection_time is None:
+                return None
+            return self._last_detection_time + self._cooldown_us
+
+    def cooldown_remaining(self) -> float:
+        """COOLDOWN の残り秒数。COOLDOWN 以外、または経過済みなら 0。"""
+
+        until = self.cooldown_until()
+        if until is None:
+            return 0.0
+        return max(0, until - self._clock.now_us()) / 1_000_000
+
     def record_detection(
         self, detection: DetectionResult, note: str = ""
     ) -> DetectionResponse:
+        """判定結果を2段階クールダウンと連続検知で処理する。"""
+
+        with self._lock:
+            event, consecutive_count, is_first = self._step(
+                detection, self._clock.now_us(), note
+            )
+        return DetectionResponse(
+            event=event,
+            consecutive_count=consecutive_count,
+            is_first_detection=is_first,
+        )
+
+    def record_detections(
+        self,
+        detections: Sequence[DetectionResult],
+        timestamps: Optional[Sequence[int]] = None,
+        note: str = "",
+    ) -> list[DetectionStep]:
+        """フレーム列をまとめて状態機械に流し、イベントか状態遷移を起こしたフレームを返す。
+
+        Args:
+            detections: フレームごとの判定結果
+            timestamps: 各フレームの時刻（エポックマイクロ秒、昇順）。
+                省略時はすべて現在時刻として扱う。
+            note: 確定したイベントに付けるメモ
+
+        COOLDOWN 中のフレームは判定に影響しないため、クールダウン明けの時刻を
+        二分探索して一括で読み飛ばす。録画済みトレースの再生では、1 試合あたり
+        数フレームしか状態機械を通らない。
+        """
+
+        count = len(detections)
+        if timestamps is None:
+            timestamps = [self._clock.now_us()] * count
+        elif len(timestamps) != count:
+            raise ValueError("detections and timestamps must have the same length")
+
+        steps: list[DetectionStep] = []
+        with self._lock:
+            index = 0
+            while index < count:
+                if (
+                    self._cooldown_state == "COOLDOWN"
+                    and self._last_detection_time is not None
+                ):
+                    index = bisect_left(
+                        timestamps,
+                        self._last_detection_time + self._cooldown_us,
+                        lo=index,
+                    )
+                    if index >= count:
+                        break
+                before = self._cooldown_state
+                if (
+                    before == "READY"
+                    and self._consecutive_outcome is None
+                    and detections[index].outcome not in OUTCOMES
+                ):
+                    # 連続カウントがリセット済みなら unknown は何も変えない
+                    index += 1
+                    continue
+                now = int(timestamps[index])
+                event, _, _ = self._step(detections[index], now, note)
+                if event is not None or self._cooldown_state != before:
+                    steps.append(
+                        DetectionStep(
+                            index=index,
+                            timestamp=now,
+                            cooldown_state=self._cooldown_state,
+                            event=event,
+                        )
+                    )
+                index += 1
+        return steps
+
+    def _step(
+        self, detection: DetectionResult, now: int, note: str
+    ) -> tuple[Optional[Event], int, bool]:
         """判定結果を2段階クールダウンと連続検知で処理する。
 
         2段階クールダウン:
         1. COOLDOWN: すべての検知を無視（0〜cooldown_seconds）
         2. WAITING_FOR_NONE: none をカウント、victory/defeat は無視
-        3. READY: 次の勝敗判定が可能（none が規定回数検知後）
+        3. READY: 次の勝敗判定が可能（none が規定回数、または規定時間続いた後）
 
         連続検知:
         - 同じ結果が required_consecutive 回検知されたらカウント
         - 異なる結果が出たら連続カウントをリセット
-        """
 
-        now = datetime.now(timezone.utc)
+        Returns:
+            (確定したイベント, 連続検知回数, 新しい結果の初回検知か)
+        """
 
         # 状態1: COOLDOWN（時間経過待ち）
         if self._cooldown_state == "COOLDOWN":
             if self._last_detection_time is not None:
-                elapsed = (now - self._last_detection_time).total_seconds()
-                if elapsed < self._cooldown_seconds:
+                if now - self._last_detection_time < self._cooldown_us:
                     # クールダウン中はすべての検知を無視
-                    return DetectionResponse(
-                        event=None,
-                        consecutive_count=0,
-                        is_first_detection=False,
-                    )
+                    return None, 0, False
                 else:
                     # 時間経過 → WAITING_FOR_NONE へ遷移
                     self._cooldown_state = "WAITING_FOR_NONE"
@@ -222,38 +1419,28 @@ class StateManager:
         if self._cooldown_state == "WAITING_FOR_NONE":
             if detection.outcome not in ("victory", "defeat", "draw"):
                 # unknown/none を検知
+                if self._none_consecutive_count == 0:
+                    self._none_since = now
                 self._none_consecutive_count += 1
-                if self._none_consecutive_count >= self._none_required_consecutive:
+                if self._none_requirement_met(now):
                     # none が規定回数 → READY へ遷移
                     self._cooldown_state = "READY"
                     self._none_consecutive_count = 0
                     # 勝敗判定用カウントもリセット
                     self._consecutive_outcome = None
                     self._consecutive_count = 0
-                return DetectionResponse(
-                    event=None,
-                    consecutive_count=0,
-                    is_first_detection=False,
-                )
+                return None, 0, False
             else:
                 # victory/defeat/draw を検知 → カウントリセット（まだ判定不可）
                 self._none_consecutive_count = 0
-                return DetectionResponse(
-                    event=None,
-                    consecutive_count=0,
-                    is_first_detection=False,
-                )
+                return None, 0, False
 
         # 状態3: READY（通常の勝敗判定）
         if detection.outcome not in ("victory", "defeat", "draw"):
             # unknown の場合は連続カウントをリセット
             self._consecutive_outcome = None
             self._consecutive_count = 0
-            return DetectionResponse(
-                event=None,
-                consecutive_count=0,
-                is_first_detection=False,
-            )
+            return None, 0, False
 
         # 連続検知の判定
         is_first = False
@@ -273,7 +1460,7 @@ class StateManager:
                 type="result",
                 value=detection.outcome,
                 delta=1,
-                timestamp=now.isoformat(),
+                timestamp=now,
                 confidence=detection.confidence,
                 note=note,
             )
@@ -284,25 +1471,22 @@ class StateManager:
             # 連続カウントをリセット
             self._consecutive_outcome = None
             self._consecutive_count = 0
-            return DetectionResponse(
-                event=event,
-                consecutive_count=self._required_consecutive,
-                is_first_detection=is_first,
-            )
+            return event, self._required_consecutive, is_first
 
         # まだ確定していない
-        return DetectionResponse(
-            event=None,
-            consecutive_count=self._consecutive_count,
-            is_first_detection=is_first,
-        )
+        return None, self._consecutive_count, is_first
+
+    def _none_requirement_met(self, now: int) -> bool:
+        if self._none_required_us is not None:
+            return now - self._none_since >= self._none_required_us
+        return self._none_consecutive_count >= self._none_required_consecutive
 
     def record_adjustment(self, value: Outcome, delta: int, note: str = "") -> Event:
         event = Event(
             type="adjustment",
             value=value,
             delta=delta,
-            timestamp=utcnow_iso(),
+            timestamp=self._clock.now_us(),
             confidence=1.0,
             note=note,
         )
@@ -310,27 +1494,228 @@ class StateManager:
         return event
 
     def _persist(self, event: Event) -> None:
-        self._log.append(event)
-        self._state.apply(event)
+        # 自分の追記も sync() 経由で取り込むことで、他プロセスの追記と
+        # ログ上の順序どおりに適用される
+        with self._lock:
+            self._log.append(event)
+            self.sync()
 
-    def history(self, limit: int) -> list[Event]:
-        """直近のイベントを取得する。"""
+    def history(self, limit: int, session: Optional[Session] = None) -> list[Event]:
+        """直近のイベントを取得する。
+
+        ``session`` を指定した場合はそのセッション区間内のイベントに絞り込む。
+        """
 
         if limit <= 0:
             return []
-        return self._log.tail(limit)
+        if session is None:
+            return self._log.tail(limit)
+        end = session.end_index
+        if end is None:
+            end = self._sessions.event_count
+        start = max(session.start_index, end - limit)
+        if start >= end:
+            return []
+        # tail はログ末尾からの件数指定のため、区間末尾までを含む件数を取得して切り出す。
+        # アーカイブを残さずに圧縮した区間は読めないので、取得できた分だけ返す。
+        count = self._sessions.event_count
+        events = self._log.tail(count - start)
+        first = count - len(events)
+        return events[max(start, first) - first : max(end - first, 0)]
 
     def reload(self) -> CounterState:
-        self._state = CounterState()
-        for event in self._log.read_events():
-            self._state.apply(event)
+        with self._lock:
+            return self._reload_locked()
+
+    def _reload_locked(self) -> CounterState:
+        self._log_identity = self._log.identity()
+        self._state, self._sessions, self._offset = self._replay()
         return self._state
 
 
-def aggregate(events: Sequence[Event]) -> CounterState:
+def aggregate(
+    events: Sequence[Event], window_size: int = DEFAULT_ROLLING_WINDOW
+) -> CounterState:
     """イベント列を集計し CounterState を返す。"""
 
-    state = CounterState()
+    state = CounterState(window_size=window_size)
     for event in events:
         state.apply(event)
     return state
+
+
+@dataclass(slots=True)
+class MergeStats:
+    """merge_event_logs の結果。"""
+
+    written: int = 0
+    duplicates: int = 0
+
+
+def iter_merged_events(
+    logs: Sequence[EventLog],
+    dedupe_window_seconds: float = 180,
+    stats: Optional[MergeStats] = None,
+) -> Iterator[Event]:
+    """時刻順に並んだ複数のログを k-way マージしたイベント列を返す。
+
+    各ログの先頭 1 件だけをヒープに保持するため、メモリ使用量はログ本数に比例し
+    イベント数には依存しない。別マシンのログに ``dedupe_window_seconds`` 以内で
+    同じ結果のカウント（delta > 0 の result）やセッションマーカーがある場合は
+    同一試合の重複検知とみなし、先に現れたものだけを残す。
+    """
+
+    window = int(dedupe_window_seconds * 1_000_000)
+    # 重複判定用: (type, value or note) -> (最後に採用した時刻, 出力元ログ)
+    last_seen: dict[tuple[str, Optional[str]], tuple[int, int]] = {}
+
+    def _tagged(source: int, log: EventLog) -> Iterator[tuple[int, int, Event]]:
+        for event in log.read_events():
+            yield event.timestamp, source, event
+
+    streams = [_tagged(source, log) for source, log in enumerate(logs)]
+    for timestamp, source, event in heapq.merge(*streams, key=_merge_key):
+        key: Optional[tuple[str, Optional[str]]] = None
+        if event.type == "result" and event.delta > 0:
+            key = (event.type, event.value)
+        elif event.type in SESSION_EVENT_TYPES:
+            key = (event.type, event.note)
+
+        if key is not None:
+            previous = last_seen.get(key)
+            if (
+                previous is not None
+                and previous[1] != source
+                and timestamp - previous[0] <= window
+            ):
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            last_seen[key] = (timestamp, source)
+
+        if stats is not None:
+            stats.written += 1
+        yield event
+
+
+def _merge_key(item: tuple[int, int, Event]) -> tuple[int, int]:
+    return item[0], item[1]
+
+
+def merge_event_logs(
+    sources: Sequence[EventLog],
+    output: EventLog,
+    dedupe_window_seconds: float = 180,
+) -> MergeStats:
+    """複数マシンのログを 1 本のログへストリーミングでマージする。
+
+    出力はそのまま ``StateManager(output)`` で読み込める。各入力ログは
+    追記順（＝時刻順）に並んでいることを前提とする。
+    """
+
+    if any(source.path.resolve() == output.path.resolve() for source in sources):
+        raise ValueError("output log must differ from the source logs")
+    stats = MergeStats()
+    output.extend(iter_merged_events(sources, dedupe_window_seconds, stats))
+    return stats
+
+
+# 並列再生でチャンクを分ける最小サイズ。これより小さいログは単一プロセスで再生する。
+MIN_PARALLEL_CHUNK_BYTES = 1 << 20
+
+
+def split_log_ranges(path: Path, chunks: int) -> list[tuple[int, int]]:
+    """ログファイルを改行位置で揃えた ``chunks`` 個以下のバイト範囲に分割する。"""
+
+    size = path.stat().st_size if path.exists() else 0
+    if size == 0:
+        return []
+    chunks = max(1, min(chunks, size))
+    with path.open("rb") as fp, mmap.mmap(
+        fp.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        # 改行で終わっていない末尾の行は書き込み途中とみなして範囲に含めない
+        size = mm.rfind(b"\n") + 1
+        if size == 0:
+            return []
+        bounds = [0]
+        for i in range(1, chunks):
+            nominal = max(size * i // chunks, bounds[-1])
+            newline = mm.find(b"\n", nominal, size)
+            if newline < 0:
+                break
+            if newline + 1 > bounds[-1]:
+                bounds.append(newline + 1)
+        if bounds[-1] != size:
+            bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _replay_range(
+    path: str, start: int, end: int, window_size: int, partial: bool = False
+) -> tuple[CounterState, SessionIndex]:
+    """バイト範囲 ``[start, end)`` を再生する（ProcessPoolExecutor のワーカー）。"""
+
+    counter = CounterState(window_size=window_size)
+    sessions = SessionIndex(window_size=window_size, partial=partial or start > 0)
+    with open(path, "rb") as fp, mmap.mmap(
+        fp.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        for line in mm[start:end].splitlines():
+            if not line.strip():
+                continue
+            event = decode_event(line)
+            counter.apply(event)
+            sessions.apply(event)
+    return counter, sessions
+
+
+def replay_parallel(
+    path: Path,
+    workers: Optional[int] = None,
+    window_size: int = DEFAULT_ROLLING_WINDOW,
+    min_chunk_bytes: int = MIN_PARALLEL_CHUNK_BYTES,
+    partial: bool = False,
+) -> tuple[CounterState, SessionIndex, int]:
+    """イベントログをチャンク単位で並列に再生し、部分集計を順に merge する。
+
+    ファイルを改行で揃えたバイト範囲に分割し、各範囲をプロセスプールで
+    パースして CounterState / SessionIndex を作り、ログ順に結合する。
+    戻り値の 3 要素目は再生し終えたバイト位置（``StateManager.sync`` の起点）。
+    ``partial=True`` は前のセグメントに続くファイルを再生する場合に指定し、
+    先頭のセッションを SessionIndex.merge() で引き継げるようにする。
+    """
+
+    workers = workers or os.cpu_count() or 1
+    size = path.stat().st_size if path.exists() else 0
+    chunks = min(workers, max(1, size // max(1, min_chunk_bytes)))
+    ranges = split_log_ranges(path, chunks)
+    if len(ranges) <= 1:
+        if not ranges:
+            return (
+                CounterState(window_size=window_size),
+                SessionIndex(window_size, partial=partial),
+                0,
+            )
+        counter, sessions = _replay_range(
+            str(path), 0, ranges[0][1], window_size, partial
+        )
+        return counter, sessions, ranges[0][1]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        partials = list(
+            pool.map(
+                _replay_range,
+                [str(path)] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges],
+                [window_size] * len(ranges),
+                [partial] * len(ranges),
+            )
+        )
+
+    counter, sessions = partials[0]
+    for part_counter, part_sessions in partials[1:]:
+        counter.merge(part_counter)
+        sessions.merge(part_sessions)
+    return counter, sessions, ranges[-1][1]
@@ -0,0 +1,114 @@
+"""テンプレートマッチングによる勝敗バナーの判定（torch に依存しない）。
+
+前処理（グレースケール → ぼかし → 大津の二値化）と正規化相関係数は
+``scripts/poc_detect.py`` と同じで、``<root>/<label>/<variant>/*.png`` の
+テンプレートと比べる。テンプレートは起動時に一度だけ読み込んで前処理しておき、
+1 枚あたりの判定はクロップ領域とのマッチングだけになる。
+
+ラベルのないライブのスクリーンショットを判定するため、``poc_detect.py`` とは
+次の点が異なる。
+
+- クロップはサンプルごとの ``template_bbox`` ではなく固定の領域（既定は
+  ``DEFAULT_CROP``、フレームの解像度に合わせて変換）
+- メタデータのバリアントだけでなく、全バリアント（``variants`` で絞り込み可）の
+  テンプレートと比べて最も類似度の高いものを選ぶ
+- テンプレートはクロップより大きい場合だけ縮小し、小さい場合は縮小せずに
+  クロップ内を走査する（``poc_detect.py`` は形が違えば常にクロップの大きさへ
+  変形する）
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import cv2  # type: ignore
+import numpy as np
+
+from .geometry import DEFAULT_CROP, FrameGeometry, RegionLike
+from .vision import DetectionResult
+
+LABELS = ("victory", "defeat", "draw")
+
+
+def preprocess(image: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, binary = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+@dataclass(frozen=True, slots=True)
+class Template:
+    label: str
+    variant: str
+    path: Path
+    image: np.ndarray
+
+
+class TemplateMatcher:
+    """前処理済みのテンプレートを保持し、画像ごとに最も近いラベルを返す。"""
+
+    def __init__(
+        self,
+        root: Path,
+        threshold: float = 0.85,
+        crop_region: Optional[RegionLike] = DEFAULT_CROP,
+        variants: Optional[list[str]] = None,
+    ) -> None:
+        """
+        Args:
+            root: ``<label>/<variant>/*.png`` を格納したテンプレートのルート
+            threshold: 類似度がこの値以上なら一致とみなす
+            crop_region: 比べる領域。None なら画像全体
+            variants: 使うバリアント（未指定時はすべて）
+        """
+
+        self.threshold = threshold
+        self.geometry = FrameGeometry.create(crop_region, None)
+        self.templates: list[Template] = []
+        for label in LABELS:
+            for variant_dir in sorted((root / label).glob("*")):
+                if not variant_dir.is_dir():
+                    continue
+                if variants is not None and variant_dir.name not in variants:
+                    continue
+                for path in sorted(variant_dir.glob("*.png")):
+                    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+                    if image is None:
+                        continue
+                    self.templates.append(
+                        Template(label, variant_dir.name, path, preprocess(image))
+                    )
+        if not self.templates:
+            raise ValueError(f"no templates found under {root}")
+
+    def match(self, image: np.ndarray) -> tuple[Optional[Template], float]:
+        """最も類似度の高いテンプレートとその類似度。"""
+
+        crop = self.geometry.resolve(image.shape).crop
+        if crop is not None:
+            x, y, width, height = crop
+            image = image[y : y + height, x : x + width]
+        target = preprocess(image)
+        best: Optional[Template] = None
+        best_score = -1.0
+        for template in self.templates:
+            pattern = template.image
+            if pattern.shape[0] > target.shape[0] or pattern.shape[1] > target.shape[1]:
+                # テンプレートの方が大きいと走査できないため領域へ合わせる
+                # （小さい場合は変形せずに走査し、バナーの位置のずれを吸収する）
+                pattern = cv2.resize(pattern, (target.shape[1], target.shape[0]))
+            result = cv2.matchTemplate(target, pattern, cv2.TM_CCOEFF_NORMED)
+            score = float(result.max())
+            if score > best_score:
+                best, best_score = template, score
+        return best, best_score
+
+    def predict(self, image: np.ndarray) -> DetectionResult:
+        template, score = self.match(image)
+        if template is None or score < self.threshold:
+            return DetectionResult("unknown", max(score, 0.0))
+        label = template.label
+        return DetectionResult(label, score, label)  # type: ignore[arg-type]
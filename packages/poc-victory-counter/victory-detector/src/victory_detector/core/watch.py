@@ -0,0 +1,349 @@
+"""ファイル変更の監視ユーティリティ。
+
+Linux では inotify（ctypes 経由、追加依存なし）で変更を待ち受け、利用できない環境
+（Windows / macOS など）では ``os.stat`` のポーリングにフォールバックする。
+単一ファイルの追記は ``FileWatcher``、ディレクトリに現れる新しいファイルは
+``DirectoryWatcher`` で監視する。
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import fnmatch
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+DEFAULT_POLL_INTERVAL = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:  # pragma: no cover - libc が見つからない環境
+        return None
+    if not hasattr(libc, "inotify_init1"):  # pragma: no cover
+        return None
+    return libc
+
+
+class Inotify:
+    """inotify ファイルディスクリプタの薄いラッパー。"""
+
+    def __init__(self) -> None:
+        libc = _load_libc()
+        if libc is None:
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.fd = fd
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return wd
+
+    def read(self, timeout: float) -> list[tuple[int, str]]:
+        """イベントを待ち、(mask, ファイル名) のリストを返す。タイムアウト時は空。"""
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events: list[tuple[int, str]] = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            raw_name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append((mask, os.fsdecode(raw_name)))
+        return events
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class FileWatcher:
+    """単一ファイルの変更（追記・置き換え）を検知してコールバックを呼ぶ。
+
+    コールバックはバックグラウンドスレッドから呼ばれる。inotify 利用時も
+    ``poll_interval`` ごとに stat を確認するため、通知の取りこぼしがあっても
+    最大 ``poll_interval`` 秒で追従する。
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        callback: Callable[[], None],
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        use_inotify: bool = True,
+    ) -> None:
+        self._path = path
+        self._callback = callback
+        self._poll_interval = poll_interval
+        self._use_inotify = use_inotify
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify: Optional[Inotify] = None
+        self._last_stat: Optional[tuple[int, int, int, int]] = None
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._inotify is not None else "polling"
+
+    def start(self) -> "FileWatcher":
+        if self._thread is not None:
+            return self
+        if self._use_inotify:
+            try:
+                self._inotify = Inotify()
+                self._inotify.add_watch(
+                    self._path.parent,
+                    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE,
+                )
+            except OSError:
+                if self._inotify is not None:
+                    self._inotify.close()
+                self._inotify = None
+        self._last_stat = self._stat()
+        self._thread = threading.Thread(
+            target=self._run, name=f"watch:{self._path.name}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(1.0, self._poll_interval * 2))
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self) -> "FileWatcher":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _stat(self) -> Optional[tuple[int, int, int, int]]:
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                names = self._inotify.read(self._poll_interval)
+                notified = any(name == self._path.name for _, name in names)
+            else:
+                self._stop.wait(self._poll_interval)
+                notified = False
+            current = self._stat()
+            if notified or current != self._last_stat:
+                self._last_stat = current
+                try:
+                    self._callback()
+                except Exception:  # noqa: BLE001 - 監視スレッドを止めない
+                    logger.exception("watch callback failed: %s", self._path)
+
+
+class ProcessedFiles:
+    """処理済みのファイル名の集合。``path`` を指定すると追記で永続化する。
+
+    1 行 1 ファイル名のテキストファイルで、再起動しても同じファイルを
+    二度処理しない。
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self._names: set[str] = set()
+        if path is not None and path.exists():
+            with path.open(encoding="utf-8") as handle:
+                self._names.update(line.rstrip("\n") for line in handle if line.strip())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, names: Iterable[str]) -> None:
+        new = [name for name in names if name not in self._names]
+        if not new:
+            return
+        self._names.update(new)
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.writelines(f"{name}\n" for name in new)
+
+
+class DirectoryWatcher:
+    """ディレクトリに現れた新しいファイルを検知してコールバックを呼ぶ。
+
+    inotify 利用時は書き込みが閉じられた（``IN_CLOSE_WRITE``）か移動してきた
+    （``IN_MOVED_TO``）ファイルをすぐに渡す。通知の取りこぼしに備えて
+    ``rescan_interval`` ごとにディレクトリも走査し、ポーリング時はこの走査だけで
+    検知する。走査では書き込み途中のファイルを避けるため、前回の走査から
+    サイズと更新時刻が変わっていないものだけを渡す。
+
+    起動時には ``processed`` に含まれない既存のファイルもまとめて渡す。
+    コールバックが戻ったファイルは（例外でも）処理済みとして記録する。
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        callback: Callable[[list[Path]], None],
+        pattern: str = "*",
+        processed: Optional[ProcessedFiles] = None,
+        rescan_interval: float = 2.0,
+        use_inotify: bool = True,
+    ) -> None:
+        self.directory = directory
+        self.processed = processed if processed is not None else ProcessedFiles()
+        self._callback = callback
+        self._pattern = pattern
+        self._rescan_interval = rescan_interval
+        self._use_inotify = use_inotify
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify: Optional[Inotify] = None
+        # 前回の走査で見つけた未処理ファイルの (サイズ, 更新時刻)
+        self._pending: dict[str, tuple[int, int]] = {}
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._inotify is not None else "polling"
+
+    def start(self) -> "DirectoryWatcher":
+        if self._thread is not None:
+            return self
+        if self._use_inotify:
+            try:
+                self._inotify = Inotify()
+                self._inotify.add_watch(self.directory, IN_CLOSE_WRITE | IN_MOVED_TO)
+            except OSError:
+                if self._inotify is not None:
+                    self._inotify.close()
+                self._inotify = None
+        # 起動前からあるファイルは書き込みが終わっているものとして扱う
+        self._dispatch([path.name for path in self._scan()])
+        self._thread = threading.Thread(
+            target=self._run, name=f"watch:{self.directory.name}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(1.0, self._rescan_interval * 2))
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self) -> "DirectoryWatcher":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _scan(self) -> list[os.DirEntry[str]]:
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            (
+                entry
+                for entry in entries
+                if entry.name not in self.processed
+                and fnmatch.fnmatch(entry.name, self._pattern)
+                and entry.is_file()
+            ),
+            key=lambda entry: entry.name,
+        )
+
+    def _rescan(self) -> list[str]:
+        """前回の走査から変化していない未処理ファイルを返す。"""
+
+        pending: dict[str, tuple[int, int]] = {}
+        ready: list[str] = []
+        for entry in self._scan():
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if self._pending.get(entry.name) == signature:
+                ready.append(entry.name)
+            else:
+                pending[entry.name] = signature
+        self._pending = pending
+        return ready
+
+    def _dispatch(self, names: list[str]) -> None:
+        names = [name for name in dict.fromkeys(names) if name not in self.processed]
+        if not names:
+            return
+        for name in names:
+            self._pending.pop(name, None)
+        try:
+            self._callback([self.directory / name for name in names])
+        except Exception:  # noqa: BLE001 - 監視スレッドを止めない
+            logger.exception("watch callback failed: %s", self.directory)
+        self.processed.add(names)
+
+    def _run(self) -> None:
+        next_rescan = time.monotonic() + self._rescan_interval
+        while not self._stop.is_set():
+            timeout = max(0.0, next_rescan - time.monotonic())
+            if self._inotify is not None:
+                names = [
+                    name
+                    for _, name in self._inotify.read(timeout)
+                    if fnmatch.fnmatch(name, self._pattern)
+                ]
+                self._dispatch(sorted(names))
+            else:
+                self._stop.wait(timeout)
+            if time.monotonic() >= next_rescan and not self._stop.is_set():
+                self._dispatch(self._rescan())
+                next_rescan = time.monotonic() + self._rescan_interval
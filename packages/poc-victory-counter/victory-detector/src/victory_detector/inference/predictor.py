@@ -2,17 +2,27 @@
 
 from __future__ import annotations
 
+import time
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Literal, Sequence
 
 import cv2  # type: ignore
 import numpy as np
 import torch
 import torch.nn.functional as F
 
+from victory_detector.core.geometry import (
+    DEFAULT_CROP,
+    REFERENCE_SIZE,
+    FrameGeometry,
+    RegionLike,
+)
 from victory_detector.core.vision import DetectionResult
 from victory_detector.training.model import VictoryClassifier
 
+if TYPE_CHECKING:
+    from victory_detector.capture.metrics import StageTimers
+
 # 5クラス分類結果から勝敗へのマッピング
 CLASS_TO_OUTCOME: dict[str, Literal["victory", "defeat", "unknown"]] = {
     "victory_text": "victory",
@@ -49,22 +59,30 @@ class VictoryPredictor:
         self,
         model_path: Path,
         device: str = "auto",
-        crop_region: tuple[int, int, int, int] = (460, 378, 995, 550),
+        crop_region: RegionLike | None = DEFAULT_CROP,
         image_size: int | None = None,
-        mask_regions: list[tuple[int, int, int, int]] | None = None,
+        mask_regions: Sequence[RegionLike] | None = None,
+        reference_size: tuple[int, int] = REFERENCE_SIZE,
     ) -> None:
         """VictoryPredictorを初期化する。
 
         Args:
             model_path: 学習済みモデル(.pth)のパス（label_map含む）
             device: 使用デバイス ("auto", "cpu", "cuda")
-            crop_region: クロップ領域 (x, y, width, height)
+            crop_region: クロップ領域 (x, y, width, height)。Noneの場合はクロップしない
             image_size: リサイズ後の画像サイズ（長辺）。Noneの場合はリサイズしない
+                （基準解像度以外のフレームではクロップを基準解像度での大きさに戻す）
             mask_regions: マスク領域のリスト [(x, y, width, height), ...]。Noneの場合はマスクなし
+            reference_size: 領域のピクセル値の基準解像度 (width, height)。
+                値は build_dataset.py と同様に 0〜1 の比率でも指定でき、
+                実際のフレームサイズに合わせて変換される。
         """
         self.crop_region = crop_region
         self.image_size = image_size
         self.mask_regions = mask_regions
+        self.geometry = FrameGeometry.create(crop_region, mask_regions, reference_size)
+        # 設定すると前処理と forward の所要時間を記録する（capture.metrics）
+        self.timers: StageTimers | None = None
 
         # デバイス設定
         if device == "auto":
@@ -93,33 +111,27 @@ class VictoryPredictor:
         Returns:
             前処理済みテンソル (1, C, H', W')
         """
+        # 領域はフレームの形ごとにピクセル座標へ変換済みのものを使う
+        geometry = self.geometry.resolve(image.shape)
+
         # 1. マスク適用（元画像の座標）
-        if self.mask_regions:
+        if geometry.masks:
             image = image.copy()  # 元画像を変更しないようコピー
-            for mx, my, mw, mh in self.mask_regions:
-                height, width = image.shape[:2]
-                # マスク領域のクリッピング
-                mx = max(0, min(mx, width - 1))
-                my = max(0, min(my, height - 1))
-                mw = max(1, min(mw, width - mx))
-                mh = max(1, min(mh, height - my))
+            for mx, my, mw, mh in geometry.masks:
                 image[my : my + mh, mx : mx + mw] = 0  # 黒で塗りつぶす
 
         # 2. クロップ
-        x, y, w, h = self.crop_region
-        height, width = image.shape[:2]
-
-        # クロップ領域のクリッピング
-        x = max(0, min(x, width - 1))
-        y = max(0, min(y, height - 1))
-        w = max(1, min(w, width - x))
-        h = max(1, min(h, height - y))
-
-        cropped = image[y : y + h, x : x + w]
+        if geometry.crop is not None:
+            x, y, w, h = geometry.crop
+            cropped = image[y : y + h, x : x + w]
+        else:
+            cropped = image
 
-        # 3. アスペクト比維持リサイズ（image_size指定時のみ）
+        # 3. アスペクト比維持リサイズ（image_size指定時）、または基準解像度での大きさに戻す
         if self.image_size is not None:
             resized = _resize_keep_aspect_ratio(cropped, self.image_size)
+        elif geometry.crop_size is not None:
+            resized = cv2.resize(cropped, geometry.crop_size, interpolation=cv2.INTER_LINEAR)
         else:
             resized = cropped
 
@@ -155,16 +167,24 @@ class VictoryPredictor:
         Returns:
             推論結果（全クラスの確率分布を含む）
         """
+        timers = self.timers
+        started = time.perf_counter_ns()
+
         # 前処理
         input_tensor = self._preprocess(image).to(self.device)
+        if timers is not None:
+            forward_started = time.perf_counter_ns()
+            timers.record("preprocess", forward_started - started)
 
         # 推論
         with torch.no_grad():
             logits = self.model(input_tensor)
             probabilities = F.softmax(logits, dim=1)[0]
 
-        # 最高確率のクラスを取得
+        # 最高確率のクラスを取得（GPU では .item() で完了を待つため forward に含める）
         predicted_idx = probabilities.argmax().item()
+        if timers is not None:
+            timers.record("forward", time.perf_counter_ns() - forward_started)
         confidence = probabilities[predicted_idx].item()
         class_name = self.idx_to_label[predicted_idx]
 
@@ -4,28 +4,121 @@ from __future__ import annotations
 
 import argparse
 import html
-import json
 import logging
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Any, Tuple, cast
+from typing import Any, Callable, Tuple, cast
 from urllib.parse import parse_qs, urlparse
 
-from .core import state
+from .core import codec, state
 
 logger = logging.getLogger(__name__)
 
 
+class EncodedJson(bytes):
+    """エンコード済みの JSON。``encode_json`` がそのまま埋め込む。"""
+
+
+def encode_json(payload: dict[str, Any]) -> bytes:
+    """応答の辞書を codec で JSON バイト列へエンコードする。
+
+    値が ``EncodedJson`` のキー（``state.encode_event_array`` でまとめてエンコードした
+    イベント列など）はそのまま埋め込み、値が辞書のキーは再帰的にエンコードする。
+    """
+
+    plain: dict[str, Any] = {}
+    encoded: list[tuple[str, bytes]] = []
+    for key, value in payload.items():
+        if isinstance(value, EncodedJson):
+            encoded.append((key, value))
+        elif isinstance(value, dict):
+            encoded.append((key, encode_json(value)))
+        else:
+            plain[key] = value
+    body = codec.dumps(plain)
+    if not encoded:
+        return body
+    parts = [body[:-1]]
+    for key, value in encoded:
+        parts.append(b"," if len(parts) > 1 or plain else b"")
+        parts.append(codec.dumps(key) + b":" + value)
+    parts.append(b"}")
+    return b"".join(parts)
+
+
 def serialize_summary(counter: state.CounterState) -> dict[str, Any]:
     """CounterState を JSON 変換可能な辞書へシリアライズする。"""
 
+    return _summary(counter, lambda events: [event.to_dict() for event in events])
+
+
+def _encoded_summary(counter: state.CounterState) -> dict[str, Any]:
+    """``serialize_summary`` と同じ内容で、イベント列をエンコード済みにした辞書。
+
+    HTTP 応答専用（``encode_json`` でエンコードする）。
+    """
+
+    return _summary(
+        counter, lambda events: EncodedJson(state.encode_event_array(events))
+    )
+
+
+def _summary(
+    counter: state.CounterState, events: Callable[[list[state.Event]], Any]
+) -> dict[str, Any]:
+    return {
+        "victories": counter.victories,
+        "defeats": counter.defeats,
+        "draws": counter.draws,
+        "total": counter.total,
+        "results": events(counter.results),
+        "adjustments": events(counter.adjustments),
+        "stats": serialize_stats(counter),
+    }
+
+
+def serialize_stats(counter: state.CounterState) -> dict[str, Any]:
+    """CounterState が逐次保持している連勝・勝率の派生統計を辞書化する。"""
+
     return {
+        "streak": {
+            "outcome": counter.streak_outcome,
+            "count": counter.current_streak,
+        },
+        "best_victory_streak": counter.best_victory_streak,
+        "best_defeat_streak": counter.best_defeat_streak,
+        "win_rate": counter.win_rate,
+        "recent": {
+            "window": counter.window_size,
+            "total": counter.recent_total,
+            "victories": counter.recent_victories,
+            "defeats": counter.recent_defeats,
+            "draws": counter.recent_draws,
+            "win_rate": counter.recent_win_rate,
+        },
+    }
+
+
+def serialize_session(session: state.Session) -> dict[str, Any]:
+    """Session をイベント範囲と集計を含む辞書へシリアライズする。"""
+
+    counter = session.state
+    return {
+        "id": session.id,
+        "name": session.name,
+        "active": session.active,
+        "started_at": state.format_timestamp(session.started_at),
+        "ended_at": (
+            state.format_timestamp(session.ended_at)
+            if session.ended_at is not None
+            else None
+        ),
+        "start_index": session.start_index,
+        "end_index": session.end_index,
         "victories": counter.victories,
         "defeats": counter.defeats,
         "draws": counter.draws,
         "total": counter.total,
-        "results": [event.to_dict() for event in counter.results],
-        "adjustments": [event.to_dict() for event in counter.adjustments],
     }
 
 
@@ -37,7 +130,10 @@ class StateRequestHandler(BaseHTTPRequestHandler):
     def do_GET(self) -> None:  # noqa: N802 (BaseHTTPRequestHandler 命名準拠)
         parsed = urlparse(self.path)
         if parsed.path == "/state":
-            self._handle_state()
+            self._handle_state(parsed)
+            return
+        if parsed.path == "/sessions":
+            self._handle_sessions()
             return
         if parsed.path == "/history":
             self._handle_history(parsed)
@@ -50,10 +146,10 @@ class StateRequestHandler(BaseHTTPRequestHandler):
 
     def do_OPTIONS(self) -> None:  # noqa: N802 - プリフライト要求への対応
         parsed = urlparse(self.path)
-        if parsed.path in {"/state", "/history", "/overlay"}:
+        if parsed.path in {"/state", "/history", "/overlay", "/sessions"}:
             self._send_empty(204, allow_methods="GET, OPTIONS")
             return
-        if parsed.path == "/adjust":
+        if parsed.path in {"/adjust", "/sessions/start", "/sessions/end"}:
             self._send_empty(204, allow_methods="POST, OPTIONS")
             return
         self._send_empty(404, allow_methods="OPTIONS")
@@ -63,12 +159,48 @@ class StateRequestHandler(BaseHTTPRequestHandler):
         if parsed.path == "/adjust":
             self._handle_adjust()
             return
+        if parsed.path == "/sessions/start":
+            self._handle_session_start()
+            return
+        if parsed.path == "/sessions/end":
+            self._handle_session_end()
+            return
         self._send_json(404, {"error": "not_found"})
 
-    def _handle_state(self) -> None:
+    def _resolve_session(self, query: dict[str, list[str]]) -> tuple[bool, Any]:
+        """クエリ ``session`` を解決する。
+
+        Returns:
+            (セッション指定の有無, Session | None)。値が不正な場合は ValueError。
+        """
+
+        raw = query.get("session", [""])[0]
+        if not raw:
+            return False, None
+        if raw == "current":
+            return True, self.server.manager.current_session
+        session = self.server.manager.get_session(int(raw))
+        if session is None:
+            raise ValueError(f"unknown session: {raw}")
+        return True, session
+
+    def _handle_state(self, parsed_url) -> None:
+        try:
+            scoped, session = self._resolve_session(parse_qs(parsed_url.query))
+        except (ValueError, TypeError):
+            self._send_json(400, {"error": "invalid_session"})
+            return
+
         try:
-            summary = self.server.manager.summary
-            payload = serialize_summary(summary)
+            if not scoped:
+                payload = _encoded_summary(self.server.manager.summary)
+            elif session is None:
+                # 進行中のセッションがない場合は空の集計を返す
+                payload = _encoded_summary(state.CounterState())
+                payload["session"] = None
+            else:
+                payload = _encoded_summary(session.state)
+                payload["session"] = serialize_session(session)
         except Exception:  # pragma: no cover - 例外メッセージはログで確認
             logger.exception("Failed to serialize state response")
             self._send_json(500, {"error": "internal_server_error"})
@@ -76,6 +208,56 @@ class StateRequestHandler(BaseHTTPRequestHandler):
 
         self._send_json(200, payload)
 
+    def _handle_sessions(self) -> None:
+        try:
+            manager = self.server.manager
+            current = manager.current_session
+            payload = {
+                "current": current.id if current is not None else None,
+                "sessions": [serialize_session(item) for item in manager.sessions],
+            }
+        except Exception:  # pragma: no cover
+            logger.exception("Failed to serialize sessions response")
+            self._send_json(500, {"error": "internal_server_error"})
+            return
+
+        self._send_json(200, payload)
+
+    def _handle_session_start(self) -> None:
+        length = int(self.headers.get("Content-Length", "0"))
+        raw = self.rfile.read(length) if length > 0 else b"{}"
+        try:
+            payload = codec.loads(raw)
+            name = payload.get("name", "")
+            if not isinstance(name, str):
+                raise ValueError("invalid name")
+        except (ValueError, TypeError, AttributeError) as exc:
+            logger.warning("Invalid session payload: %s", exc)
+            self._send_json(400, {"error": "invalid_payload"})
+            return
+
+        try:
+            session = self.server.manager.start_session(name)
+        except Exception:  # pragma: no cover
+            logger.exception("Failed to start session")
+            self._send_json(500, {"error": "internal_server_error"})
+            return
+
+        self._send_json(202, {"session": serialize_session(session)})
+
+    def _handle_session_end(self) -> None:
+        try:
+            session = self.server.manager.end_session()
+        except Exception:  # pragma: no cover
+            logger.exception("Failed to end session")
+            self._send_json(500, {"error": "internal_server_error"})
+            return
+
+        if session is None:
+            self._send_json(409, {"error": "no_active_session"})
+            return
+        self._send_json(202, {"session": serialize_session(session)})
+
     def _handle_history(self, parsed_url) -> None:
         try:
             query = parse_qs(parsed_url.query)
@@ -85,8 +267,17 @@ class StateRequestHandler(BaseHTTPRequestHandler):
             return
 
         try:
-            events = self.server.manager.history(limit)
-            payload = [event.to_dict() for event in events]
+            scoped, session = self._resolve_session(query)
+        except (ValueError, TypeError):
+            self._send_json(400, {"error": "invalid_session"})
+            return
+
+        try:
+            if scoped and session is None:
+                events = []
+            else:
+                events = self.server.manager.history(limit, session=session)
+            payload = EncodedJson(state.encode_event_array(events))
         except Exception:  # pragma: no cover
             logger.exception("Failed to read history response")
             self._send_json(500, {"error": "internal_server_error"})
@@ -98,13 +289,13 @@ class StateRequestHandler(BaseHTTPRequestHandler):
         length = int(self.headers.get("Content-Length", "0"))
         raw = self.rfile.read(length) if length > 0 else b"{}"
         try:
-            payload = json.loads(raw.decode("utf-8"))
+            payload = codec.loads(raw)
             value = payload.get("value")
             if value not in ("victory", "defeat", "draw"):
                 raise ValueError("invalid value")
             delta = int(payload.get("delta", 1))
             note = payload.get("note", "")
-        except (json.JSONDecodeError, ValueError, TypeError) as exc:
+        except (ValueError, TypeError, AttributeError) as exc:
             logger.warning("Invalid adjust payload: %s", exc)
             self._send_json(400, {"error": "invalid_payload"})
             return
@@ -116,7 +307,7 @@ class StateRequestHandler(BaseHTTPRequestHandler):
             self._send_json(500, {"error": "internal_server_error"})
             return
 
-        self._send_json(202, {"event": event.to_dict()})
+        self._send_json(202, {"event": EncodedJson(state.encode_event(event))})
 
     def _handle_overlay(self, parsed_url) -> None:
         query = parse_qs(parsed_url.query)
@@ -132,10 +323,25 @@ class StateRequestHandler(BaseHTTPRequestHandler):
         except ValueError:
             history_limit = 3
         show_draw = (query.get("showDraw", ["true"])[0]).lower() != "false"
+        show_stats = (query.get("showStats", ["true"])[0]).lower() != "false"
+        try:
+            scoped, session = self._resolve_session(query)
+        except (ValueError, TypeError):
+            scoped, session = False, None
+        session_param = query.get("session", [""])[0] if scoped else ""
 
         try:
-            summary = serialize_summary(self.server.manager.summary)
-            events = self.server.manager.history(max(1, history_limit))
+            if not scoped:
+                summary = _encoded_summary(self.server.manager.summary)
+                events = self.server.manager.history(max(1, history_limit))
+            elif session is None:
+                summary = _encoded_summary(state.CounterState())
+                events = []
+            else:
+                summary = _encoded_summary(session.state)
+                events = self.server.manager.history(
+                    max(1, history_limit), session=session
+                )
         except Exception:  # pragma: no cover - 想定外の例外はログで確認
             logger.exception("Failed to prepare overlay payload")
             self._send_json(500, {"error": "internal_server_error"})
@@ -155,6 +361,8 @@ class StateRequestHandler(BaseHTTPRequestHandler):
             show_draw,
             max(1, history_limit),
             poll_seconds,
+            show_stats,
+            session_param,
         )
         self._send_html(200, html_body)
 
@@ -167,6 +375,8 @@ class StateRequestHandler(BaseHTTPRequestHandler):
         show_draw,
         history_limit,
         poll_seconds,
+        show_stats=True,
+        session_param="",
     ):
         palette = {
             "dark": {
@@ -204,17 +414,29 @@ class StateRequestHandler(BaseHTTPRequestHandler):
             else ""
         )
 
+        stats_block = (
+            "<div class='overlay-stats'>"
+            "<span class='overlay-stats__item'>Streak <span id='overlay-stats-streak'>-</span></span>"
+            "<span class='overlay-stats__item'>Win <span id='overlay-stats-winrate'>-</span></span>"
+            "<span class='overlay-stats__item'>Last <span id='overlay-stats-window'>0</span>"
+            " <span id='overlay-stats-recent'>-</span></span>"
+            "</div>"
+            if show_stats
+            else ""
+        )
+
         initial_payload = {
             "summary": summary,
-            "events": [event.to_dict() for event in events],
+            "events": EncodedJson(state.encode_event_array(events)),
             "config": {
                 "history": history_limit,
                 "showDraw": show_draw,
                 "pollInterval": poll_seconds,
+                "session": session_param,
             },
         }
-        initial_json = json.dumps(initial_payload, ensure_ascii=False).replace(
-            "</", "<\\/"
+        initial_json = (
+            encode_json(initial_payload).decode("utf-8").replace("</", "<\\/")
         )
         scale_clamped = max(0.5, min(scale, 2.0))
         cols = 3 if show_draw else 2
@@ -269,6 +491,18 @@ class StateRequestHandler(BaseHTTPRequestHandler):
       .overlay-card--victory {{ border-left: 4px solid {palette['accent_victory']}; }}
       .overlay-card--defeat {{ border-left: 4px solid {palette['accent_defeat']}; }}
       .overlay-card--draw {{ border-left: 4px solid {palette['accent_draw']}; }}
+      .overlay-stats {{
+        display: flex;
+        justify-content: space-between;
+        gap: 8px;
+        padding: 6px 10px;
+        border-radius: 8px;
+        background: {palette['card']};
+        font-size: 0.75rem;
+        letter-spacing: 0.04em;
+        font-variant-numeric: tabular-nums;
+      }}
+      .overlay-stats__item span {{ font-weight: 700; }}
       .overlay-history {{
         list-style: none;
         margin: 0;
@@ -301,6 +535,7 @@ class StateRequestHandler(BaseHTTPRequestHandler):
         <div class='overlay-card overlay-card--defeat'><span class='overlay-card__label'>Defeat</span><span id='overlay-count-defeat' class='overlay-card__value'>0</span></div>
         {draws_card}
       </div>
+      {stats_block}
       <ul id=\"overlay-history\" class=\"overlay-history\">
         <li class='overlay-history__item overlay-history__item--draw'><span class='overlay-history__value'>Loading...</span></li>
       </ul>
@@ -314,14 +549,21 @@ class StateRequestHandler(BaseHTTPRequestHandler):
         const config = initialData.config || {{}};
         const historyLimit = Math.max(1, config.history || 3);
         const pollMs = Math.max(1000, (config.pollInterval || 5) * 1000);
+        const sessionQuery = config.session ? 'session=' + encodeURIComponent(config.session) : '';
 
         const elements = {{
           victory: document.getElementById('overlay-count-victory'),
           defeat: document.getElementById('overlay-count-defeat'),
           draw: document.getElementById('overlay-count-draw'),
           history: document.getElementById('overlay-history'),
+          streak: document.getElementById('overlay-stats-streak'),
+          winRate: document.getElementById('overlay-stats-winrate'),
+          window: document.getElementById('overlay-stats-window'),
+          recent: document.getElementById('overlay-stats-recent'),
         }};
 
+        const formatRate = (rate) => (typeof rate === 'number' ? Math.round(rate * 100) + '%' : '-');
+
         const formatTime = (timestamp) => {{
           const date = new Date(timestamp);
           if (Number.isNaN(date.getTime())) {{
@@ -334,6 +576,20 @@ class StateRequestHandler(BaseHTTPRequestHandler):
           if (elements.victory) {{ elements.victory.textContent = summary.victories ?? 0; }}
           if (elements.defeat) {{ elements.defeat.textContent = summary.defeats ?? 0; }}
           if (elements.draw) {{ elements.draw.textContent = summary.draws ?? 0; }}
+          renderStats(summary.stats || {{}});
+        }};
+
+        const renderStats = (stats) => {{
+          const streak = stats.streak || {{}};
+          if (elements.streak) {{
+            elements.streak.textContent = streak.outcome
+              ? streak.outcome.charAt(0).toUpperCase() + streak.count
+              : '-';
+          }}
+          if (elements.winRate) {{ elements.winRate.textContent = formatRate(stats.win_rate); }}
+          const recent = stats.recent || {{}};
+          if (elements.window) {{ elements.window.textContent = recent.total ?? 0; }}
+          if (elements.recent) {{ elements.recent.textContent = formatRate(recent.win_rate); }}
         }};
 
         const renderHistory = (events) => {{
@@ -345,6 +601,16 @@ class StateRequestHandler(BaseHTTPRequestHandler):
             return;
           }}
           for (const event of items) {{
+            if ((event.type || '').startsWith('session_')) {{
+              const li = document.createElement('li');
+              li.className = 'overlay-history__item overlay-history__item--draw';
+              const labelEl = document.createElement('span');
+              labelEl.className = 'overlay-history__value';
+              labelEl.textContent = (event.type === 'session_start' ? 'SESSION START ' : 'SESSION END ') + (event.note || '');
+              li.appendChild(labelEl);
+              elements.history.appendChild(li);
+              continue;
+            }}
             const value = (event.value || 'draw').toLowerCase();
             const li = document.createElement('li');
             li.className = 'overlay-history__item overlay-history__item--' + value;
@@ -386,8 +652,8 @@ class StateRequestHandler(BaseHTTPRequestHandler):
         const refresh = async () => {{
           try {{
             const [summaryRes, historyRes] = await Promise.all([
-              fetch('/state'),
-              fetch('/history?limit=' + historyLimit),
+              fetch('/state' + (sessionQuery ? '?' + sessionQuery : '')),
+              fetch('/history?limit=' + historyLimit + (sessionQuery ? '&' + sessionQuery : '')),
             ]);
             const summaryPayload = await summaryRes.json();
             const historyPayload = await historyRes.json();
@@ -410,7 +676,7 @@ class StateRequestHandler(BaseHTTPRequestHandler):
         logger.info("%s - %s", self.address_string(), format % args)
 
     def _send_json(self, status: int, payload: dict[str, Any]) -> None:
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        body = encode_json(payload)
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(body)))
@@ -488,12 +754,27 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         default=Path("events.log"),
         help="Path to JSONL event log (default: ./events.log)",
     )
+    parser.add_argument(
+        "--segment-bytes",
+        type=int,
+        default=None,
+        help="Rotate the event log into segments of this size and compact old ones",
+    )
+    parser.add_argument(
+        "--rotate-daily",
+        action="store_true",
+        help="Rotate the event log when the date changes",
+    )
     return parser.parse_args(argv)
 
 
 def main(argv: list[str] | None = None) -> None:
     args = parse_args(argv)
-    event_log = state.EventLog(args.event_log)
+    event_log = state.EventLog(
+        args.event_log,
+        max_segment_bytes=args.segment_bytes,
+        rotate_daily=args.rotate_daily,
+    )
     manager = state.StateManager(event_log)
 
     logging.basicConfig(level=logging.INFO)
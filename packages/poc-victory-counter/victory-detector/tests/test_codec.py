@@ -0,0 +1,79 @@
+import importlib
+
+import pytest
+
+from victory_detector.core import codec, state
+
+
+@pytest.mark.parametrize("name", codec.available_backends())
+def test_backends_produce_identical_bytes(name: str) -> None:
+    backend = codec.get_codec(name)
+    payload = {"type": "result", "value": "victory", "delta": 1, "note": "勝利"}
+    encoded = backend.dumps(payload)
+    assert encoded == codec.get_codec("json").dumps(payload)
+    assert backend.loads(encoded) == payload
+
+
+def test_get_codec_rejects_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        codec.get_codec("yaml")
+
+
+def test_unavailable_env_backend_falls_back(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    monkeypatch.setenv(codec.BACKEND_ENV, "orjsn")
+    assert codec.get_codec().name == codec.available_backends()[0]
+    assert "orjsn" in caplog.text
+    # 既定のバックエンドを決める import 時にも失敗しない
+    try:
+        importlib.reload(codec)
+        assert codec.backend() == codec.available_backends()[0]
+    finally:
+        monkeypatch.delenv(codec.BACKEND_ENV)
+        importlib.reload(codec)
+    # 明示的な指定は従来どおりエラー
+    with pytest.raises(ValueError):
+        codec.set_backend("orjsn")
+
+
+def test_decode_event_round_trip() -> None:
+    event = state.Event(
+        type="result",
+        value="defeat",
+        delta=1,
+        timestamp="2024-01-01T00:00:00+00:00",
+        confidence=0.5,
+        note="auto",
+    )
+    assert state.decode_event(state.encode_event(event)) == event
+    lines = state.encode_events([event, event]).splitlines()
+    assert [state.decode_event(line) for line in lines] == [event, event]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        b"not json",
+        b"[]",
+        b'{"type": "result", "value": "win"}',
+        b'{"type": "bogus", "value": "victory"}',
+        b'{"type": "result", "value": "victory", "delta": "1"}',
+        b'{"type": "adjustment", "value": "draw", "note": 3}',
+    ],
+)
+def test_decode_event_validates_schema(line: bytes) -> None:
+    with pytest.raises(state.EventDecodeError):
+        state.decode_event(line)
+
+
+def test_decode_event_accepts_legacy_lines() -> None:
+    event = state.decode_event(
+        '{"type": "adjustment", "value": "draw", "delta": 2, '
+        '"timestamp": "2024-01-01T00:00:00Z", "note": "手動"}'
+    )
+    assert event.delta == 2
+    assert event.note == "手動"
+    marker = state.decode_event(b'{"type": "session_start", "note": "s1"}')
+    assert marker.value is None
+    assert marker.delta == 0
@@ -0,0 +1,44 @@
+import pytest
+
+from victory_detector.core.geometry import (
+    DEFAULT_CROP,
+    DEFAULT_MASK,
+    FrameGeometry,
+    Region,
+)
+
+
+def test_pixel_and_ratio_regions_resolve_to_same_area() -> None:
+    pixels = Region.from_values(DEFAULT_CROP)
+    ratios = Region.parse("0.2395833,0.35,0.5182292,0.5092593")
+    for width, height in [(1920, 1080), (1280, 720), (480, 270)]:
+        assert pixels.resolve(width, height) == ratios.resolve(width, height)
+
+    assert pixels.resolve(1920, 1080) == DEFAULT_CROP
+    assert pixels.resolve(960, 540) == (230, 189, 497, 275)
+    # 画像外にはみ出す部分は切り詰める
+    overflow = Region.from_values((0, 534, 1920, 600))
+    assert overflow.resolve(960, 540) == (0, 267, 960, 273)
+
+    with pytest.raises(ValueError):
+        Region.parse("1,2,3")
+    with pytest.raises(ValueError):
+        Region.parse("a,b,c,d")
+
+
+def test_frame_geometry_caches_per_shape() -> None:
+    geometry = FrameGeometry.create(DEFAULT_CROP, [DEFAULT_MASK])
+
+    full = geometry.resolve((1080, 1920, 3))
+    assert full.crop == DEFAULT_CROP
+    assert full.masks == (DEFAULT_MASK,)
+    assert full.crop_size is None
+    assert geometry.resolve((1080, 1920, 3)) is full
+
+    half = geometry.resolve((540, 960, 3))
+    assert half.crop == (230, 189, 497, 275)
+    assert half.masks == ((0, 267, 960, 148),)
+    # 基準解像度での大きさに戻すためのサイズ
+    assert half.crop_size == (995, 550)
+
+    assert FrameGeometry.create(None).resolve((540, 960)).crop is None
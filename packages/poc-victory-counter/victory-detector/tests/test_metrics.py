@@ -0,0 +1,128 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from victory_detector.capture.metrics import (
+    Histogram,
+    JsonlMetricsHook,
+    MetricsReporter,
+    StageTimers,
+)
+from victory_detector.capture.pipeline import EndOfStream, Frame, Pipeline, Stage
+
+
+def test_histogram_quantiles_within_bucket_error() -> None:
+    histogram = Histogram()
+    for value in range(1, 10_001):
+        histogram.record(value * 1_000)
+
+    assert histogram.count == 10_000
+    assert histogram.max_ns == 10_000_000
+    assert histogram.quantile(0.5) == pytest.approx(5_000_000, rel=0.07)
+    assert histogram.quantile(0.95) == pytest.approx(9_500_000, rel=0.07)
+    assert histogram.quantile(1.0) == 10_000_000
+    assert histogram.mean_ns == pytest.approx(5_000_500)
+    assert Histogram().quantile(0.5) == 0
+
+    # 小さな値は正確に数える
+    small = Histogram()
+    for value in (3, 3, 7, 15):
+        small.record(value)
+    assert [small.quantile(q) for q in (0.25, 0.5, 0.75, 1.0)] == [3, 3, 7, 15]
+
+    merged = Histogram()
+    merged.merge(histogram)
+    merged.merge(small)
+    assert merged.count == 10_004 and merged.max_ns == 10_000_000
+
+
+def test_stage_timers_roll_windows() -> None:
+    timers = StageTimers()
+    timers.record("decode", 2_000_000)
+    with timers.time("infer"):
+        time.sleep(0.002)
+
+    window = timers.roll()
+    assert sorted(window) == ["decode", "infer"]
+    assert window["decode"].count == 1
+    assert window["infer"].max_ns >= 2_000_000
+    assert timers.roll() == {}
+
+
+def test_stage_timers_never_record_into_a_rolled_window() -> None:
+    import threading
+
+    timers = StageTimers()
+    stop = threading.Event()
+
+    def recorder() -> None:
+        while not stop.is_set():
+            timers.record("infer", 1_000)
+
+    threads = [threading.Thread(target=recorder) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    # roll() した時点の件数を控え、あとから増えていないことを確かめる
+    windows = []
+    for _ in range(200):
+        window = timers.roll()
+        windows.append((window, sum(h.count for h in window.values())))
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert all(
+        sum(h.count for h in window.values()) == counted for window, counted in windows
+    )
+
+
+def test_reporter_summarizes_pipeline_and_calls_hooks(tmp_path: Path) -> None:
+    frames = iter(range(20))
+    timers = StageTimers()
+
+    def source() -> int:
+        try:
+            return next(frames)
+        except StopIteration:
+            raise EndOfStream
+
+    def decode(frame: Frame) -> int:
+        with timers.time("base64"):
+            time.sleep(0.001)
+        return frame.payload
+
+    pipeline = Pipeline(
+        [Stage("capture", source), Stage("decode", decode), Stage("state", lambda f: True)],
+        lossless=True,
+        timers=timers,
+    )
+    reporter = MetricsReporter(pipeline, timers, order=["capture", "base64", "decode"])
+    snapshots = []
+    reporter.add_hook(snapshots.append)
+    reporter.add_hook(JsonlMetricsHook(tmp_path / "metrics" / "pipeline.jsonl"))
+    reporter.add_hook(lambda snapshot: 1 / 0)  # 失敗するフックは無視される
+
+    pipeline.start()
+    assert pipeline.wait(10)
+    pipeline.stop()
+    snapshot = reporter.collect()
+
+    assert snapshot.frames == 20 and snapshot.dropped == 0 and snapshot.errors == 0
+    assert snapshot.fps > 0
+    assert [stage.name for stage in snapshot.stages] == [
+        "capture", "base64", "decode", "latency", "state"
+    ]
+    decode_summary = snapshot.stages[2]
+    assert decode_summary.count == 20
+    assert 1.0 <= decode_summary.p50_ms <= decode_summary.p95_ms <= decode_summary.max_ms
+    assert "decode p50=" in snapshot.format()
+    assert snapshots == [snapshot]
+
+    line = json.loads((tmp_path / "metrics" / "pipeline.jsonl").read_text())
+    assert line["frames"] == 20
+    assert line["stages"][0]["name"] == "capture"
+
+    # 次の集計は前回からの差分
+    empty = reporter.collect()
+    assert empty.frames == 0 and empty.stages == []
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from victory_detector.capture import obsws
+from victory_detector.capture.screenshot import ScreenshotOptions
+
+websockets_server = pytest.importorskip("websockets.asyncio.server")
+
+PASSWORD = "secret"
+SALT = "salt"
+CHALLENGE = "challenge"
+
+
+class StubObs:
+    """要求を 3 件ためてから逆順に応答する obs-websocket のスタブ。"""
+
+    def __init__(self) -> None:
+        self.max_outstanding = 0
+        self.identified = threading.Event()
+        self.port = 0
+        self._ready = threading.Event()
+        self._stop: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "StubObs":
+        self._thread.start()
+        assert self._ready.wait(5)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        assert self._loop is not None and self._stop is not None
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(5)
+
+    def _run(self) -> None:
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        async with websockets_server.serve(
+            self._handler, "127.0.0.1", 0, subprotocols=[obsws.SUBPROTOCOL]
+        ) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    async def _handler(self, ws) -> None:
+        await ws.send(
+            json.dumps(
+                {
+                    "op": obsws.OP_HELLO,
+                    "d": {
+                        "rpcVersion": 1,
+                        "authentication": {"salt": SALT, "challenge": CHALLENGE},
+                    },
+                }
+            )
+        )
+        identify = json.loads(await ws.recv())
+        expected = obsws.auth_string(PASSWORD, SALT, CHALLENGE)
+        if identify["d"].get("authentication") != expected:
+            await ws.close(4009, "Authentication failed")
+            return
+        await ws.send(json.dumps({"op": obsws.OP_IDENTIFIED, "d": {}}))
+        self.identified.set()
+
+        outstanding: list[dict] = []
+        async for message in ws:
+            request = json.loads(message)["d"]
+            outstanding.append(request)
+            self.max_outstanding = max(self.max_outstanding, len(outstanding))
+            if len(outstanding) < 3:
+                continue
+            for item in reversed(outstanding):
+                request_id = item["requestId"]
+                ok = request_id != "5"
+                status = {"result": ok, "code": 100 if ok else 600}
+                await ws.send(
+                    json.dumps(
+                        {
+                            "op": obsws.OP_REQUEST_RESPONSE,
+                            "d": {
+                                "requestType": item["requestType"],
+                                "requestId": request_id,
+                                "requestStatus": status,
+                                "responseData": {
+                                    "imageData": f"data:image/jpg;base64,{request_id}"
+                                },
+                            },
+                        }
+                    )
+                )
+            outstanding.clear()
+
+
+def test_async_client_keeps_requests_in_flight_and_reorders() -> None:
+    with StubObs() as stub:
+        client = obsws.AsyncScreenshotClient(
+            "Game",
+            ScreenshotOptions("jpg", 960, 540, quality=80),
+            port=stub.port,
+            password=PASSWORD,
+            in_flight=3,
+            queue_size=16,
+        )
+        with client:
+            frames = []
+            while len(frames) < 8:
+                frame = client.get(timeout=5)
+                assert frame is not None
+                frames.append(frame)
+
+        assert stub.identified.is_set()
+        assert stub.max_outstanding == 3
+        ids = [int(frame.payload.rsplit(",", 1)[1]) for frame in frames]
+        # 逆順の応答が送信順に並べ直され、失敗した要求（5）は飛ばされる
+        assert ids == [1, 2, 3, 4, 6, 7, 8, 9]
+        timestamps = [frame.timestamp for frame in frames]
+        assert timestamps == sorted(timestamps)
+        assert client.failed >= 1
+
+
+def test_async_client_wakes_when_interval_shortens() -> None:
+    with StubObs() as stub:
+        client = obsws.AsyncScreenshotClient(
+            "Game", port=stub.port, password=PASSWORD, in_flight=3, interval=10.0
+        )
+        with client:
+            # 1 件目を送ったあと 10 秒待っている途中で間隔を縮める
+            assert stub.identified.wait(5)
+            assert client.get(timeout=0.2) is None
+            client.interval = 0.01
+            # スタブは 3 件そろうと応答するので、残りの 2 件がすぐ送られればよい
+            assert client.get(timeout=2) is not None
+        assert client.sent >= 3
+
+
+def test_async_client_reports_authentication_failure() -> None:
+    with StubObs() as stub:
+        client = obsws.AsyncScreenshotClient("Game", port=stub.port, password="wrong")
+        with pytest.raises(obsws.ObsError):
+            client.start(timeout=5)
+        client.stop()
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from victory_detector.capture.pipeline import DropOldestQueue, Frame, Pipeline, Stage
+
+
+def test_drop_oldest_queue_keeps_newest() -> None:
+    queue: DropOldestQueue[int] = DropOldestQueue(2)
+    assert queue.put(1) is None
+    assert queue.put(2) is None
+    assert queue.put(3) == 1
+    assert queue.dropped == 1
+    assert [queue.get(0), queue.get(0), queue.get(0)] == [2, 3, None]
+    queue.close()
+    assert queue.get() is None
+
+
+def _sleeper(seconds: float):
+    def stage(frame: Frame) -> object:
+        time.sleep(seconds)
+        return frame.payload
+
+    return stage
+
+
+def test_pipeline_overlaps_stages() -> None:
+    counter = iter(range(10_000))
+    done: list[int] = []
+
+    def source() -> int:
+        time.sleep(0.01)
+        return next(counter)
+
+    def sink(frame: Frame) -> bool:
+        done.append(frame.payload)
+        return True
+
+    with Pipeline(
+        [
+            Stage("capture", source),
+            Stage("decode", _sleeper(0.01)),
+            Stage("infer", _sleeper(0.01)),
+            Stage("state", sink),
+        ]
+    ) as pipeline:
+        time.sleep(0.5)
+    # 直列なら 1 フレーム 30ms 以上かかるが、各段が重なるため 10ms 強で流れる
+    assert len(done) > 25
+    assert done == sorted(done)
+    stats = pipeline.stats()
+    assert [s.name for s in stats.stages] == ["capture", "decode", "infer", "state"]
+    assert stats.latency_max is not None and stats.latency_max < 0.2
+
+
+def test_pipeline_drops_oldest_when_a_stage_is_slow() -> None:
+    counter = iter(range(10_000))
+    seen: list[int] = []
+    lock = threading.Lock()
+
+    def slow(frame: Frame) -> bool:
+        time.sleep(0.05)
+        with lock:
+            seen.append(frame.payload)
+        return True
+
+    def failing(frame: Frame) -> object:
+        if frame.payload == 3:
+            raise RuntimeError("boom")
+        return frame.payload
+
+    with Pipeline(
+        [
+            Stage("capture", lambda: next(counter)),
+            Stage("check", failing),
+            Stage("infer", slow),
+        ],
+        queue_size=1,
+        interval=0.005,
+    ) as pipeline:
+        time.sleep(0.3)
+    stats = pipeline.stats()
+    assert stats.stages[2].dropped > 0
+    assert stats.stages[1].errors == 1
+    assert 3 not in seen
+    # 遅い段には常に最新のフレームが届く
+    assert seen[-1] > stats.stages[2].processed
+    assert "infer[q=" in stats.format()
@@ -0,0 +1,163 @@
+from pathlib import Path
+
+from victory_detector.core import codec, replay, state
+from victory_detector.core.clock import ManualClock
+from victory_detector.core.vision import DetectionResult
+
+START = state.parse_timestamp("2025-01-01T00:00:00+00:00")
+FPS = 10
+
+
+def _trace(
+    banners: list[tuple[int, str]], seconds: int, flicker: bool = False
+) -> replay.Trace:
+    """``banners`` の (開始秒, 結果) から 5 秒間バナーが出るトレースを作る。"""
+
+    trace = replay.Trace()
+    for frame in range(seconds * FPS):
+        t = frame / FPS
+        outcome = "unknown"
+        for start, value in banners:
+            if start <= t < start + 5:
+                # flicker: バナー表示中に 1 秒ごとに 1 フレームだけ判定が外れる
+                outcome = "unknown" if flicker and frame % FPS == 3 else value
+        trace.timestamps.append(START + frame * 1_000_000 // FPS)
+        trace.detections.append(DetectionResult(outcome, 0.9))
+    return trace
+
+
+def _truth(banners: list[tuple[int, str]]) -> list[replay.GroundTruth]:
+    return [
+        replay.GroundTruth(START + start * 1_000_000, value)
+        for start, value in banners
+    ]
+
+
+BANNERS = [(100, "victory"), (400, "defeat"), (700, "victory")]
+
+
+def test_replay_reports_hits_and_latency() -> None:
+    trace = _trace(BANNERS, seconds=900)
+    report = replay.replay(trace, ground_truth=_truth(BANNERS))
+
+    assert [event.value for event in report.events] == ["victory", "defeat", "victory"]
+    assert (report.hits, report.missed, report.errors) == (3, 0, 0)
+    # required_consecutive=2 なので 2 フレーム目で確定する
+    assert report.max_latency == 1 / FPS
+    assert report.elapsed_seconds < 1.0
+
+
+def test_replay_detects_double_counts_and_misses() -> None:
+    trace = _trace(BANNERS, seconds=900, flicker=True)
+    # クールダウンが短く none 待ちもないと、同じバナーを二重にカウントする
+    loose = replay.ReplayParams(cooldown_seconds=1, none_required_consecutive=1)
+    report = replay.replay(trace, loose, _truth(BANNERS))
+    assert report.hits == 3
+    assert report.double_counts > 0
+
+    # 正解にない試合は取りこぼしとして数える
+    extra = BANNERS + [(850, "defeat")]
+    report = replay.replay(_trace(BANNERS, 900), ground_truth=_truth(extra))
+    assert (report.hits, report.missed) == (3, 1)
+
+
+def test_load_trace_and_ground_truth_from_jsonl(tmp_path: Path) -> None:
+    trace_path = tmp_path / "trace.jsonl"
+    trace_path.write_bytes(
+        b"".join(
+            codec.dumps({"timestamp": START + i * 100_000, "outcome": outcome}) + b"\n"
+            for i, outcome in enumerate(["none", "victory", "victory", "none"])
+        )
+    )
+    trace = replay.load_trace(trace_path)
+    assert [d.outcome for d in trace.detections] == [
+        "unknown",
+        "victory",
+        "victory",
+        "unknown",
+    ]
+
+    # 確認済みのイベントログをそのまま正解データとして使える
+    log = state.EventLog(tmp_path / "truth.jsonl")
+    log.append(state.Event("result", "victory", 1, START + 100_000))
+    log.append(state.Event("result", "victory", 0, START + 200_000))
+    truth = replay.load_ground_truth(log.path)
+    assert truth == [replay.GroundTruth(START + 100_000, "victory")]
+
+    report = replay.replay(trace, ground_truth=truth)
+    assert report.hits == 1
+    assert report.latencies_us == [100_000]
+
+
+def test_manual_clock_drives_cooldown(tmp_path: Path) -> None:
+    clock = ManualClock(START)
+    manager = state.StateManager(
+        state.EventLog(tmp_path / "events.log"),
+        cooldown_seconds=10,
+        none_required_consecutive=1,
+        clock=clock,
+    )
+    victory = DetectionResult("victory", 0.9)
+    assert manager.record_detection(victory).event is None
+    assert manager.record_detection(victory).event is not None
+    assert manager.cooldown_state == "COOLDOWN"
+
+    clock.advance(9.9)
+    manager.record_detection(DetectionResult("unknown", 0.1))
+    assert manager.cooldown_state == "COOLDOWN"
+    clock.advance(0.1)
+    manager.record_detection(DetectionResult("unknown", 0.1))
+    assert manager.cooldown_state == "READY"
+
+
+def test_resample_keeps_frames_at_interval() -> None:
+    trace = _trace(BANNERS, seconds=60)
+    sampled = replay.resample(trace, 0.5)
+    assert len(sampled) == 120
+    assert sampled.timestamps[1] - sampled.timestamps[0] == 500_000
+    assert replay.resample(trace, None) is trace
+
+
+def _write_dataset(directory: Path, trace: replay.Trace) -> tuple[Path, Path]:
+    trace_path = directory / "trace.jsonl"
+    trace_path.write_bytes(
+        b"".join(
+            codec.dumps({"timestamp": t, "outcome": d.outcome, "confidence": 0.9})
+            + b"\n"
+            for t, d in zip(trace.timestamps, trace.detections)
+        )
+    )
+    truth_path = directory / "trace.truth.jsonl"
+    truth_path.write_bytes(
+        b"".join(
+            codec.dumps({"timestamp": item.timestamp, "outcome": item.outcome}) + b"\n"
+            for item in _truth(BANNERS)
+        )
+    )
+    return trace_path, truth_path
+
+
+def test_sweep_ranks_by_accuracy_then_latency(tmp_path: Path) -> None:
+    dataset = _write_dataset(tmp_path, _trace(BANNERS, seconds=900, flicker=True))
+    points = replay.grid_points(
+        cooldowns=[1, 180], required=[2], none_required=[1, 10], intervals=[None, 1.0]
+    )
+    assert len(points) == 8
+
+    serial = replay.sweep([dataset], points, workers=1)
+    parallel = replay.sweep([dataset], points, workers=2)
+    assert [r.point for r in serial] == [r.point for r in parallel]
+
+    best = serial[0]
+    assert best.accuracy == 1.0
+    # 同じ精度なら元のフレーム間隔の方が早く確定する
+    assert best.point.interval is None
+    assert best.mean_latency is not None and best.mean_latency < 1.0
+    worst = serial[-1]
+    assert worst.accuracy < 1.0
+    assert worst.double_counts > 0
+    assert worst.point == replay.SweepPoint(replay.ReplayParams(1, 2, 1))
+
+    sampled = replay.random_points(5, [60, 240], [1, 3], [5, 50], [0.1, 1.0], seed=1)
+    assert all(60 <= p.params.cooldown_seconds <= 240 for p in sampled)
+    assert all(1 <= p.params.required_consecutive <= 3 for p in sampled)
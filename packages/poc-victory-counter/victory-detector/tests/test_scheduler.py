@@ -0,0 +1,120 @@
+import threading
+from pathlib import Path
+
+from victory_detector.capture.scheduler import AdaptiveRate, FixedRateScheduler
+from victory_detector.core import state
+from victory_detector.core.clock import ManualClock
+from victory_detector.core.vision import DetectionResult
+
+
+class FakeMonotonic:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_scheduler_keeps_grid_without_drift() -> None:
+    clock = FakeMonotonic()
+    scheduler = FixedRateScheduler(0.25, monotonic=clock)
+
+    assert scheduler.next_delay() == 0.0
+    # 処理に 0.1 秒かかっても次の開始は格子点（開始 + 0.25）
+    clock.now += 0.1
+    assert abs(scheduler.next_delay() - 0.15) < 1e-9
+    clock.now = 100.25 + 0.2
+    assert abs(scheduler.next_delay() - 0.05) < 1e-9
+    assert scheduler.missed == 0
+
+
+def test_scheduler_skips_missed_ticks() -> None:
+    clock = FakeMonotonic()
+    scheduler = FixedRateScheduler(0.25, monotonic=clock)
+    scheduler.next_delay()
+
+    # 0.6 秒かかった → 0.25 と 0.5 を飛ばして 0.75 を待つ（連続発火しない）
+    clock.now += 0.6
+    assert abs(scheduler.next_delay() - 0.15) < 1e-9
+    assert scheduler.missed == 2
+
+
+def test_scheduler_wait_stops_on_event() -> None:
+    stop = threading.Event()
+    scheduler = FixedRateScheduler(0.01, stop)
+    assert scheduler.wait()
+    assert scheduler.wait()
+    stop.set()
+    assert not scheduler.wait()
+    assert scheduler.ticks == 2
+
+
+def test_scheduler_wakes_when_interval_shortens_mid_sleep() -> None:
+    import time
+
+    scheduler = FixedRateScheduler(10.0)
+    assert scheduler.wait()
+    ticked = threading.Event()
+    thread = threading.Thread(target=lambda: scheduler.wait() and ticked.set())
+    thread.start()
+    time.sleep(0.05)
+    assert not ticked.is_set()
+
+    # COOLDOWN の長い間隔から戻ったら、残りを眠らずに新しい間隔で起きる
+    started = time.monotonic()
+    scheduler.interval = 0.1
+    assert ticked.wait(2.0)
+    assert time.monotonic() - started < 1.0
+    thread.join()
+    assert scheduler.ticks == 2 and scheduler.missed == 0
+
+    # 次のティックも新しい間隔の格子に乗る
+    assert abs(scheduler.next_delay() - 0.1) < 0.05
+
+
+def test_scheduler_wake_stops_sleeping_wait() -> None:
+    stop = threading.Event()
+    scheduler = FixedRateScheduler(10.0, stop)
+    assert scheduler.wait()
+    result: list[bool] = []
+    thread = threading.Thread(target=lambda: result.append(scheduler.wait()))
+    thread.start()
+    stop.set()
+    scheduler.wake()
+    thread.join(2.0)
+    assert result == [False]
+
+
+def test_adaptive_rate_follows_cooldown_state(tmp_path: Path) -> None:
+    clock = ManualClock(state.parse_timestamp("2025-01-01T00:00:00+00:00"))
+    manager = state.StateManager(
+        state.EventLog(tmp_path / "events.log"),
+        cooldown_seconds=180,
+        required_consecutive=2,
+        none_required_seconds=5,
+        clock=clock,
+    )
+    rate = AdaptiveRate(0.25, waiting=1.0, cooldown_max=10.0)
+    assert rate.interval(manager) == 0.25
+
+    manager.record_detection(DetectionResult("victory", 0.9))
+    assert manager.pending_outcome == "victory"
+    assert rate.interval(manager) == 0.25
+    manager.record_detection(DetectionResult("victory", 0.9))
+
+    # COOLDOWN 中は長く休み、終了時刻に合わせて起きる
+    assert manager.cooldown_state == "COOLDOWN"
+    assert rate.interval(manager) == 10.0
+    clock.advance(176)
+    assert abs(rate.interval(manager) - 4.0) < 1e-6
+    clock.advance(4)
+    assert manager.cooldown_remaining() == 0.0
+
+    manager.record_detection(DetectionResult("unknown", 0.1))
+    assert manager.cooldown_state == "WAITING_FOR_NONE"
+    assert rate.interval(manager) == 1.0
+
+    clock.advance(5)
+    manager.record_detection(DetectionResult("unknown", 0.1))
+    assert manager.cooldown_state == "READY"
+    assert rate.interval(manager) == 0.25
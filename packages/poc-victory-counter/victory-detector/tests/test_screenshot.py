@@ -0,0 +1,45 @@
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+from victory_detector.capture.screenshot import (
+    ScreenshotOptions,
+    decode_base64,
+    decode_image,
+)
+
+
+def _encoded(image_format: str) -> bytes:
+    image = np.zeros((1080 // 4, 1920 // 4, 3), np.uint8)
+    image[:, : image.shape[1] // 2] = (0, 0, 255)
+    ok, buffer = cv2.imencode(f".{image_format}", image)
+    assert ok
+    return buffer.tobytes()
+
+
+@pytest.mark.parametrize("prefix", ["", "data:image/png;base64,"])
+def test_decode_base64_strips_data_url(prefix: str) -> None:
+    data = _encoded("png")
+    assert decode_base64(prefix + base64.b64encode(data).decode()) == data
+
+
+@pytest.mark.parametrize("image_format", ["png", "jpg", "bmp"])
+def test_decode_image_reduced(image_format: str) -> None:
+    data = _encoded(image_format)
+    assert decode_image(data).shape == (270, 480, 3)
+    reduced = decode_image(data, 2)
+    assert reduced.shape == (135, 240, 3)
+    # 左半分が赤のまま縮小されている
+    assert reduced[60, 10, 2] > 200 and reduced[60, 230, 2] < 50
+
+
+def test_screenshot_options_validate() -> None:
+    options = ScreenshotOptions("jpg", 960, 540, quality=80, reduce=2)
+    assert options.decoded_size == (480, 270)
+
+    with pytest.raises(ValueError):
+        ScreenshotOptions("webp")
+    with pytest.raises(ValueError):
+        ScreenshotOptions(reduce=3)
@@ -45,6 +45,28 @@ def test_serialize_summary_includes_events() -> None:
     assert payload["total"] == 4
     assert payload["results"][0]["note"] == "auto"
     assert payload["adjustments"][0]["note"] == "manual fix"
+    stats = payload["stats"]
+    assert stats["streak"] == {"outcome": "draw", "count": 1}
+    assert stats["best_defeat_streak"] == 2
+    assert stats["recent"]["total"] == 4
+    assert stats["win_rate"] == 0.25
+
+
+def test_encode_json_embeds_encoded_values() -> None:
+    events = [state.Event("result", "victory", 1, 1_000_000, note="</script>")]
+    payload = {
+        "events": server.EncodedJson(state.encode_event_array(events)),
+        "nested": {"empty": server.EncodedJson(state.encode_event_array([])), "n": 1},
+        "total": 1,
+    }
+    assert json.loads(server.encode_json(payload)) == {
+        "events": [events[0].to_dict()],
+        "nested": {"empty": [], "n": 1},
+        "total": 1,
+    }
+    assert json.loads(server.encode_json({"only": server.EncodedJson(b"[]")})) == {
+        "only": []
+    }
 
 
 @pytest.fixture()
@@ -205,6 +227,38 @@ def test_options_preflight_returns_cors_headers(running_server) -> None:
         connection.close()
 
 
+def test_sessions_endpoints_switch_scope(running_server) -> None:
+    httpd, manager = running_server
+    status, payload, _ = _request_json(
+        httpd.server_address, "POST", "/sessions/start", {"name": "stream"}
+    )
+    assert status == 202
+    assert payload["session"]["id"] == 1
+    manager.record_adjustment("victory", 1)
+
+    status, payload, _ = _request_json(
+        httpd.server_address, "GET", "/state?session=current"
+    )
+    assert status == 200
+    assert payload["victories"] == 1
+    assert payload["defeats"] == 0
+    assert payload["session"]["name"] == "stream"
+
+    status, payload, _ = _request_json(httpd.server_address, "POST", "/sessions/end", {})
+    assert status == 202
+    assert payload["session"]["active"] is False
+
+    status, payload, _ = _request_json(httpd.server_address, "GET", "/sessions")
+    assert status == 200
+    assert payload["current"] is None
+    assert payload["sessions"][0]["total"] == 1
+
+    status, payload, _ = _request_json(httpd.server_address, "POST", "/sessions/end", {})
+    assert status == 409
+    status, payload, _ = _request_json(httpd.server_address, "GET", "/state?session=9")
+    assert status == 400
+
+
 def _get_raw(address: Tuple[str, int], path: str) -> tuple[int, dict, str]:
     connection = http.client.HTTPConnection(address[0], address[1], timeout=2)
     try:
@@ -234,5 +288,6 @@ def test_overlay_endpoint_respects_query(running_server) -> None:
     assert status == 200
     assert "scale(1.5)" in body
     assert "overlay-theme--transparent" in body
-    assert '"pollInterval": 3' in body
+    data = body.split('id="overlay-data">', 1)[1].split("</script>", 1)[0]
+    assert json.loads(data)["config"]["pollInterval"] == 3
     assert headers["Content-Type"].startswith("text/html")
@@ -0,0 +1,115 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from victory_detector.capture.pipeline import EndOfStream
+from victory_detector.capture.shm import (
+    FrameRingReader,
+    FrameRingWriter,
+    SharedMemorySource,
+)
+
+
+@pytest.fixture
+def ring_name() -> str:
+    return f"vd-test-{uuid.uuid4().hex[:8]}"
+
+
+def _image(value: int, width: int = 32, height: int = 16) -> np.ndarray:
+    return np.full((height, width, 3), value, np.uint8)
+
+
+def test_reader_views_latest_frame_without_copy(ring_name: str) -> None:
+    with FrameRingWriter(ring_name, 32, 16, slots=3) as writer:
+        reader = FrameRingReader(ring_name)
+        assert reader.latest(copy=False) is None
+
+        writer.write(_image(10), timestamp=1_000)
+        frame = reader.latest(copy=False)
+        assert frame is not None
+        assert (frame.sequence, frame.timestamp) == (1, 1_000)
+        assert frame.image.shape == (16, 32, 3) and int(frame.image[0, 0, 0]) == 10
+        # 共有メモリへのビュー（読み取り専用）
+        assert not frame.image.flags.owndata and not frame.image.flags.writeable
+        assert reader.latest(copy=False) is None
+
+        # 追いつけなかったフレームは数えて最新だけを読む
+        for value in (20, 30, 40):
+            writer.write(_image(value), timestamp=value)
+        latest = reader.latest(copy=False)
+        assert latest is not None and int(latest.image[0, 0, 0]) == 40
+        assert reader.dropped == 2
+        # 1 フレーム目のスロットは上書き済み
+        assert not frame.valid() and latest.valid()
+
+        # スロットに収まる範囲で解像度が変わってもよい
+        writer.write(_image(50, width=16, height=8))
+        small = reader.latest(copy=False)
+        assert small is not None and small.image.shape == (8, 16, 3)
+        with pytest.raises(ValueError):
+            writer.write(_image(0, width=64, height=16))
+        del frame, latest, small
+        reader.close()
+
+
+def test_frame_survives_producer_lapping_the_ring(ring_name: str) -> None:
+    with FrameRingWriter(ring_name, 32, 16, slots=2) as writer:
+        source = SharedMemorySource(ring_name, timeout=0.01)
+        writer.write(_image(10), timestamp=1)
+        captured = source.grab()
+        view = source.reader.latest(copy=False)
+        assert captured is not None and view is None
+
+        # 推論が画素を読む前に書き込み側が一周してスロットを上書きする
+        writer.write(_image(20), timestamp=2)
+        view = source.reader.latest(copy=False)
+        writer.write(_image(30), timestamp=3)
+        writer.write(_image(40), timestamp=4)
+
+        # コピーした画素は変わらない
+        assert captured.payload.flags.owndata
+        assert np.array_equal(captured.payload, _image(10))
+        # ビューは上書きされ、valid() で検出できる
+        assert view is not None and int(view.image[0, 0, 0]) == 40
+        assert not view.valid()
+        del view
+        source.close()
+
+
+def test_writer_accepts_padded_rows(ring_name: str) -> None:
+    bgra = np.zeros((16, 32, 4), np.uint8)
+    bgra[..., 0] = 7
+    bgra[..., 3] = 255
+    with FrameRingWriter(ring_name, 32, 16) as writer, SharedMemorySource(ring_name) as source:
+        writer.write(bgra[:, :, :3], timestamp=5)
+        captured = source.grab()
+        assert captured is not None and captured.timestamp == 5
+        assert source.decode(captured.payload) is captured.payload
+        assert np.array_equal(captured.payload, bgra[:, :, :3])
+
+
+def test_source_ends_when_writer_closes(ring_name: str) -> None:
+    writer = FrameRingWriter(ring_name, 32, 16)
+    source = SharedMemorySource(ring_name, timeout=0.01)
+    assert source.grab() is None
+    writer.write(_image(1))
+    writer.close()
+
+    frames = list(source)
+    assert len(frames) == 1 and frames[0].payload.flags.owndata
+    with pytest.raises(EndOfStream):
+        source.grab()
+    source.close()
+
+
+def test_reader_rejects_foreign_memory(ring_name: str) -> None:
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=ring_name, create=True, size=128)
+    try:
+        with pytest.raises(ValueError):
+            FrameRingReader(ring_name)
+    finally:
+        shm.close()
+        shm.unlink()
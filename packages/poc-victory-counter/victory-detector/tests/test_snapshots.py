@@ -0,0 +1,71 @@
+import base64
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from victory_detector.capture.snapshots import SnapshotWriter
+
+
+def _image(value: int = 100) -> np.ndarray:
+    image = np.zeros((54, 96, 3), np.uint8)
+    image[10:40, 20:80] = value
+    return image
+
+
+def test_writer_reuses_encoded_bytes(tmp_path: Path) -> None:
+    ok, png = cv2.imencode(".png", _image())
+    assert ok
+    data_url = "data:image/png;base64," + base64.b64encode(png.tobytes()).decode()
+
+    with SnapshotWriter(tmp_path, format="source") as writer:
+        assert writer.save("a-victory-first", _image(), (data_url, "png"))
+        assert writer.save("b-victory-first", _image())
+        # 形式が違う場合は画像から再エンコードする
+        assert writer.save("c-victory-first", _image(), (png.tobytes(), "jpg"))
+
+    assert (tmp_path / "a-victory-first.png").read_bytes() == png.tobytes()
+    assert np.array_equal(cv2.imread(str(tmp_path / "b-victory-first.png")), _image())
+    assert (tmp_path / "c-victory-first.jpg").exists()
+    assert (writer.written, writer.reused, writer.dropped) == (3, 2, 0)
+
+
+@pytest.mark.parametrize("format", ["png", "jpg", "webp"])
+def test_writer_encodes_configured_format(tmp_path: Path, format: str) -> None:
+    with SnapshotWriter(tmp_path, format=format, compression=1, quality=80) as writer:
+        writer.save("shot", _image())
+
+    decoded = cv2.imread(str(tmp_path / f"shot.{format}"))
+    assert decoded is not None and decoded.shape == (54, 96, 3)
+    with pytest.raises(ValueError):
+        SnapshotWriter(tmp_path, format="gif")
+
+
+def test_writer_drops_when_queue_is_full(tmp_path: Path) -> None:
+    writer = SnapshotWriter(tmp_path, queue_size=2)
+    # スレッドを起動していないのでキューは消費されない
+    assert writer.save("a", _image()) and writer.save("b", _image())
+    assert not writer.save("c", _image())
+    assert writer.dropped == 1
+
+    writer.start()
+    writer.close()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.png", "b.png"]
+
+
+def test_writer_enforces_disk_cap(tmp_path: Path) -> None:
+    (tmp_path / "000-old.png").write_bytes(b"x" * 4000)
+    (tmp_path / "notes.txt").write_text("kept")
+    noise = np.random.default_rng(0).integers(0, 255, (54, 96, 3), np.uint8)
+
+    with SnapshotWriter(tmp_path, format="bmp", max_bytes=40_000) as writer:
+        for index in range(5):
+            writer.save(f"{index + 1:03d}-shot", noise)
+
+    size = noise.nbytes + 54
+    names = sorted(path.name for path in tmp_path.iterdir())
+    # bmp 1 枚 約 15.6 KB → 上限 40 KB には 2 枚まで
+    assert names == ["004-shot.bmp", "005-shot.bmp", "notes.txt"]
+    assert writer.total_bytes == 2 * size <= 40_000
+    assert writer.evicted == 4
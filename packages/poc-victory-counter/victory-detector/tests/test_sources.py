@@ -0,0 +1,94 @@
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from victory_detector.capture.pipeline import Pipeline, Stage
+from victory_detector.capture.sources import (
+    ImageDirectorySource,
+    VideoFileSource,
+    open_source,
+)
+
+
+def _image(value: int) -> np.ndarray:
+    return np.full((54, 96, 3), value, np.uint8)
+
+
+def test_image_directory_source(tmp_path: Path) -> None:
+    for index in range(5):
+        cv2.imwrite(str(tmp_path / f"{index:03d}.png"), _image(index * 40))
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    source = open_source(tmp_path, interval=0.5)
+    assert isinstance(source, ImageDirectorySource)
+    source.start_us = 1_000_000
+    frames = list(source)
+
+    assert [frame.timestamp for frame in frames] == [
+        1_000_000 + i * 500_000 for i in range(5)
+    ]
+    assert [int(frame.payload[0, 0, 0]) for frame in frames] == [0, 40, 80, 120, 160]
+
+
+def test_offline_sources_default_to_media_time(tmp_path: Path) -> None:
+    # 実行時刻ではなくファイルの時刻を起点にするため、何度流しても同じ時刻になる
+    for index in range(3):
+        cv2.imwrite(str(tmp_path / f"{index:03d}.png"), _image(index))
+    os.utime(tmp_path / "000.png", (1_700_000_000, 1_700_000_000))
+    source = ImageDirectorySource(tmp_path, interval=0.5)
+    assert source.start_us == 1_700_000_000_000_000
+
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (96, 54))
+    if not writer.isOpened():
+        pytest.skip("MJPG writer unavailable")
+    for index in range(20):
+        writer.write(_image(index))
+    writer.release()
+    os.utime(path, (1_700_000_100, 1_700_000_100))
+    with VideoFileSource(path) as video:
+        # 更新時刻は録画の終わりなので、長さ（2 秒）を引いた時刻から始まる
+        assert video.start_us == 1_700_000_098_000_000
+
+
+def test_video_file_source_samples_by_interval(tmp_path: Path) -> None:
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (96, 54))
+    if not writer.isOpened():
+        pytest.skip("MJPG writer unavailable")
+    for index in range(20):
+        writer.write(_image(index * 10))
+    writer.release()
+
+    with VideoFileSource(path, interval=0.5, start_us=0) as source:
+        assert source.fps == pytest.approx(10)
+        frames = list(source)
+
+    assert [frame.timestamp for frame in frames] == [i * 500_000 for i in range(4)]
+    assert all(frame.payload.shape == (54, 96, 3) for frame in frames)
+
+
+def test_pipeline_drains_offline_source_without_drops(tmp_path: Path) -> None:
+    for index in range(30):
+        cv2.imwrite(str(tmp_path / f"{index:03d}.png"), _image(index))
+    source = ImageDirectorySource(tmp_path, interval=0.25, start_us=0)
+    seen: list[int] = []
+
+    pipeline = Pipeline(
+        [
+            Stage("capture", source.grab),
+            Stage("decode", lambda frame: source.decode(frame.payload)),
+            Stage("collect", lambda frame: seen.append(frame.timestamp) or True),
+        ],
+        queue_size=1,
+        lossless=True,
+    )
+    pipeline.start()
+    assert pipeline.wait(10)
+    pipeline.stop()
+
+    assert seen == [i * 250_000 for i in range(30)]
+    assert all(stage.dropped == 0 for stage in pipeline.stats().stages)
@@ -3,6 +3,7 @@ from pathlib import Path
 import pytest
 
 from victory_detector.core import state
+from victory_detector.core.clock import ManualClock
 from victory_detector.core.vision import DetectionResult
 
 
@@ -55,3 +56,458 @@ def test_record_detection_accepts_draw(event_log: state.EventLog) -> None:
     event = manager.record_detection(DetectionResult("draw", 0.65))
     assert event is not None
     assert manager.summary.draws == 1
+
+
+def _result(value: str, delta: int = 1) -> state.Event:
+    return state.Event(
+        type="result", value=value, delta=delta, timestamp="2024-01-01T00:00:00Z"
+    )
+
+
+def test_counter_state_tracks_streaks() -> None:
+    counter = state.aggregate(
+        [
+            _result("victory"),
+            _result("victory"),
+            _result("victory"),
+            _result("defeat"),
+            _result("victory", delta=0),  # クールダウン中の検知は試合に数えない
+            _result("defeat"),
+        ]
+    )
+    assert counter.streak_outcome == "defeat"
+    assert counter.current_streak == 2
+    assert counter.best_victory_streak == 3
+    assert counter.best_defeat_streak == 2
+    assert counter.win_rate == 3 / 5
+
+
+def test_counter_state_rolling_window() -> None:
+    counter = state.CounterState(window_size=3)
+    for value in ("victory", "victory", "defeat", "defeat"):
+        counter.apply(_result(value))
+    assert list(counter.recent) == ["victory", "defeat", "defeat"]
+    assert counter.recent_victories == 1
+    assert counter.recent_defeats == 2
+    assert counter.recent_win_rate == 1 / 3
+
+
+def test_counter_state_adjustment_extends_streak() -> None:
+    counter = state.CounterState(window_size=4)
+    counter.apply(_result("victory"))
+    counter.apply(
+        state.Event(
+            type="adjustment",
+            value="victory",
+            delta=10,
+            timestamp="2024-01-01T00:00:00Z",
+        )
+    )
+    assert counter.current_streak == 11
+    assert counter.best_victory_streak == 11
+    assert counter.recent_total == 4
+    assert counter.recent_victories == 4
+
+
+def test_sessions_keep_independent_counters(event_log: state.EventLog) -> None:
+    manager = state.StateManager(event_log)
+    manager.record_adjustment("victory", 1)
+    first = manager.start_session("day1")
+    manager.record_adjustment("victory", 2)
+    second = manager.start_session("day2")
+    manager.record_adjustment("defeat", 1)
+    ended = manager.end_session()
+
+    assert ended is second
+    assert manager.current_session is None
+    assert first.state.victories == 2
+    assert first.end_index == second.start_index
+    assert second.state.defeats == 1
+    assert second.state.victories == 0
+    assert manager.summary.victories == 3
+
+    # マーカーはログに残り、再読込でも同じ区間が復元される
+    reloaded = state.StateManager(event_log)
+    sessions = reloaded.sessions
+    assert [item.name for item in sessions] == ["day1", "day2"]
+    assert sessions[0].state.victories == 2
+    assert sessions[1].end_index == 6
+    assert reloaded.summary.total == 4
+
+
+def test_history_filters_by_session(event_log: state.EventLog) -> None:
+    manager = state.StateManager(event_log)
+    manager.record_adjustment("victory", 1, note="before")
+    session = manager.start_session("stream")
+    manager.record_adjustment("defeat", 1, note="inside")
+
+    events = manager.history(10, session=session)
+    assert [event.type for event in events] == ["session_start", "adjustment"]
+    assert events[-1].note == "inside"
+    assert manager.end_session() is session
+    assert manager.end_session() is None
+
+
+def _summary_tuple(counter: state.CounterState) -> tuple:
+    return (
+        counter.victories,
+        counter.defeats,
+        counter.draws,
+        counter.streak_outcome,
+        counter.current_streak,
+        counter.best_victory_streak,
+        counter.best_defeat_streak,
+        list(counter.recent),
+        counter.recent_victories,
+        counter.leading_outcome,
+        counter.leading_streak,
+        len(counter.results),
+        len(counter.adjustments),
+    )
+
+
+def test_counter_state_merge_matches_sequential() -> None:
+    import random
+
+    rng = random.Random(1234)
+    for _ in range(200):
+        events = [
+            state.Event(
+                type=rng.choice(["result", "adjustment"]),
+                value=rng.choice(["victory", "victory", "defeat", "draw"]),
+                delta=rng.choice([0, 1, 1, 1, 2]),
+                timestamp="2024-01-01T00:00:00+00:00",
+            )
+            for _ in range(rng.randint(0, 12))
+        ]
+        cut = rng.randint(0, len(events))
+        merged = state.aggregate(events[:cut], window_size=4).merge(
+            state.aggregate(events[cut:], window_size=4)
+        )
+        assert _summary_tuple(merged) == _summary_tuple(
+            state.aggregate(events, window_size=4)
+        )
+
+
+def test_replay_parallel_matches_sequential(event_log: state.EventLog) -> None:
+    manager = state.StateManager(event_log)
+    for index in range(60):
+        if index % 17 == 0:
+            manager.start_session(f"s{index}")
+        if index == 40:
+            manager.end_session()
+        manager.record_adjustment("victory" if index % 3 else "defeat", 1)
+
+    counter, sessions, offset = state.replay_parallel(
+        event_log.path, workers=4, min_chunk_bytes=256
+    )
+    assert len(state.split_log_ranges(event_log.path, 4)) == 4
+    assert offset == event_log.path.stat().st_size
+    assert _summary_tuple(counter) == _summary_tuple(manager.summary)
+    assert sessions.event_count == len(list(event_log.read_events()))
+    assert [
+        (s.name, s.start_index, s.end_index, s.state.total) for s in sessions.sessions
+    ] == [
+        (s.name, s.start_index, s.end_index, s.state.total) for s in manager.sessions
+    ]
+
+
+def test_event_stores_epoch_microseconds() -> None:
+    event = _result("victory")
+    assert event.timestamp == 1_704_067_200_000_000
+    assert event.to_dict()["timestamp"] == "2024-01-01T00:00:00+00:00"
+
+    offset = state.Event(
+        type="adjustment",
+        value="draw",
+        delta=1,
+        timestamp="2024-01-01T09:00:00.250000+09:00",
+    )
+    assert offset.timestamp == event.timestamp + 250_000
+    assert state.decode_event(state.encode_event(offset)) == offset
+
+
+def test_results_between_uses_integer_range() -> None:
+    counter = state.CounterState()
+    for second in range(5):
+        counter.apply(
+            state.Event(
+                type="result",
+                value="victory",
+                delta=1,
+                timestamp=1_000_000 * second,
+            )
+        )
+    picked = counter.results_between(1_000_000, 3_000_000)
+    assert [event.timestamp for event in picked] == [1_000_000, 2_000_000]
+
+
+def test_merge_event_logs_collapses_cross_machine_duplicates(tmp_path: Path) -> None:
+    def _event(value: str, second: int, type_: str = "result") -> state.Event:
+        return state.Event(
+            type=type_, value=value, delta=1, timestamp=second * 1_000_000
+        )
+
+    main = state.EventLog(tmp_path / "main.jsonl")
+    backup = state.EventLog(tmp_path / "backup.jsonl")
+    main.extend([_event("victory", 100), _event("defeat", 600)])
+    backup.extend(
+        [
+            _event("victory", 102),  # 同一試合をバックアップ PC でも検知
+            _event("draw", 300, type_="adjustment"),
+            _event("defeat", 900),  # クールダウン外なので別試合
+        ]
+    )
+
+    merged = state.EventLog(tmp_path / "merged.jsonl")
+    stats = state.merge_event_logs([main, backup], merged, dedupe_window_seconds=180)
+
+    assert stats.written == 4
+    assert stats.duplicates == 1
+    events = list(merged.read_events())
+    assert [event.timestamp // 1_000_000 for event in events] == [100, 300, 600, 900]
+    assert state.StateManager(merged).summary.total == 4
+
+    with pytest.raises(ValueError):
+        state.merge_event_logs([main, merged], merged)
+
+
+def _append_adjustments(path: str, count: int) -> None:
+    log = state.EventLog(Path(path))
+    for _ in range(count):
+        log.append(
+            state.Event(
+                type="adjustment", value="victory", delta=1, timestamp=0, note="x" * 512
+            )
+        )
+
+
+def test_event_log_concurrent_appends_do_not_interleave(
+    event_log: state.EventLog,
+) -> None:
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_append_adjustments, [str(event_log.path)] * 4, [100] * 4))
+    assert len(list(event_log.read_events())) == 400
+
+
+def test_sync_picks_up_appends_from_other_writers(event_log: state.EventLog) -> None:
+    reader = state.StateManager(event_log)
+    writer = state.StateManager(state.EventLog(event_log.path))
+    writer.record_adjustment("victory", 1)
+    writer.start_session("other")
+    assert reader.summary.victories == 0
+
+    assert reader.sync() == 2
+    assert reader.summary.victories == 1
+    assert reader.current_session is not None
+    assert reader.sync() == 0
+
+    # 書き込み途中の行は改行が揃うまで取り込まない
+    with event_log.path.open("ab") as fp:
+        fp.write(b'{"type":"adjustment","value":"defeat"')
+    assert reader.sync() == 0
+    with event_log.path.open("ab") as fp:
+        fp.write(b',"delta":1,"timestamp":"2024-01-01T00:00:00+00:00"}\n')
+    assert reader.sync() == 1
+    assert reader.summary.defeats == 1
+
+    # ログが置き換えられた場合は全体を読み直す
+    replaced = event_log.path.with_suffix(".new")
+    replaced.write_bytes(b"")
+    replaced.replace(event_log.path)
+    reader.sync()
+    assert reader.summary.total == 0
+
+
+def test_newline_less_tail_is_kept_and_terminated(event_log: state.EventLog) -> None:
+    line = state.encode_event(state.Event("adjustment", "victory", 1, 1_000_000))
+    event_log.path.write_bytes(line)
+
+    # 追記は直前の行とつながらない
+    event_log.append(state.Event("adjustment", "defeat", 1, 2_000_000))
+    assert [event.value for event in event_log.read_events()] == ["victory", "defeat"]
+
+    # 起動時に改行を補い、末尾の行もカウントする
+    event_log.path.write_bytes(line)
+    manager = state.StateManager(event_log)
+    assert manager.summary.victories == 1
+    assert event_log.path.read_bytes() == line + b"\n"
+    manager.record_adjustment("draw", 1)
+    assert manager.reload().total == 2
+
+    # イベントとして読めない断片は切り詰める
+    event_log.path.write_bytes(line + b"\n" + line[:20])
+    assert state.StateManager(event_log).summary.victories == 1
+    assert event_log.path.read_bytes() == line + b"\n"
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_follow_converges_without_reload(
+    event_log: state.EventLog, use_inotify: bool
+) -> None:
+    import time
+
+    reader = state.StateManager(event_log)
+    watcher = reader.follow(poll_interval=0.02, use_inotify=use_inotify)
+    try:
+        state.StateManager(state.EventLog(event_log.path)).record_adjustment("draw", 2)
+        deadline = time.monotonic() + 2.0
+        while reader.summary.draws != 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert reader.summary.draws == 2
+        if not use_inotify:
+            assert watcher.backend == "polling"
+    finally:
+        reader.stop_following()
+
+
+def test_segmented_log_compacts_into_summary(tmp_path: Path) -> None:
+    log = state.EventLog(tmp_path / "events.log", max_segment_bytes=300)
+    manager = state.StateManager(log)
+    manager.start_session("s1")
+    for i in range(30):
+        manager.record_adjustment("victory" if i % 3 else "defeat", 1)
+        if i == 15:
+            manager.start_session("s2")
+
+    assert log.summary_path.exists()
+    assert log.archives()
+    assert log.segments() == []
+    assert log.path.stat().st_size < 300 * 2
+
+    events = list(log.read_events())
+    assert len(events) == 32
+    expected = state.aggregate(events)
+    restarted = state.StateManager(state.EventLog(log.path))
+    for current in (manager.summary, restarted.summary):
+        assert current.victories == expected.victories == 20
+        assert current.defeats == expected.defeats
+        assert current.best_victory_streak == expected.best_victory_streak
+        assert list(current.recent) == list(expected.recent)
+    assert [s.state.total for s in restarted.sessions] == [16, 14]
+    assert restarted.current_session is not None
+    assert restarted.current_session.name == "s2"
+    assert len(restarted.history(100, restarted.sessions[0])) == 17
+
+
+def test_compaction_without_archive_drops_old_events(tmp_path: Path) -> None:
+    log = state.EventLog(tmp_path / "events.log", archive=False)
+    manager = state.StateManager(log)
+    for _ in range(5):
+        manager.record_adjustment("draw", 1)
+    log.rotate()
+    manager.record_adjustment("draw", 1)
+
+    assert log.archives() == []
+    assert len(list(log.read_events())) == 1
+    restarted = state.StateManager(state.EventLog(log.path))
+    assert restarted.summary.draws == 6
+    assert len(restarted.history(10)) == 1
+
+
+def test_sync_follows_rotation_by_other_writer(tmp_path: Path) -> None:
+    path = tmp_path / "events.log"
+    reader = state.StateManager(state.EventLog(path))
+    writer_log = state.EventLog(path, compact_on_rotate=False)
+    writer = state.StateManager(writer_log)
+    writer.record_adjustment("victory", 1)
+    assert reader.sync() == 1
+
+    writer.record_adjustment("victory", 1)
+    writer_log.rotate()
+    writer.record_adjustment("defeat", 1)
+    # 封印されたセグメントの残りと新しいアクティブセグメントを続けて読む
+    assert reader.sync() == 2
+    assert (reader.summary.victories, reader.summary.defeats) == (2, 1)
+
+    writer_log.rotate()
+    writer_log.compact()
+    writer.record_adjustment("defeat", 1)
+    reader.sync()
+    assert (reader.summary.victories, reader.summary.defeats) == (2, 2)
+
+
+def _synthetic_trace(
+    matches: int, fps: int = 10, match_seconds: int = 300
+) -> tuple[list[DetectionResult], list[int]]:
+    """``match_seconds`` ごとに勝敗バナーが数秒表示されるフレーム列。"""
+
+    detections: list[DetectionResult] = []
+    timestamps: list[int] = []
+    start = state.parse_timestamp("2025-01-01T00:00:00+00:00")
+    step = 1_000_000 // fps
+    for frame in range(matches * match_seconds * fps):
+        second, phase = divmod(frame, match_seconds * fps)
+        if match_seconds * fps - 5 * fps <= phase:
+            outcome = "victory" if second % 2 == 0 else "defeat"
+            detections.append(DetectionResult(outcome, 0.9))
+        else:
+            detections.append(DetectionResult("unknown", 0.1))
+        timestamps.append(start + frame * step)
+    return detections, timestamps
+
+
+def test_record_detections_matches_per_frame(tmp_path: Path) -> None:
+    detections, timestamps = _synthetic_trace(matches=6)
+
+    clock = ManualClock(timestamps[0])
+    per_frame = state.StateManager(state.EventLog(tmp_path / "a.log"), clock=clock)
+    expected = []
+    for detection, timestamp in zip(detections, timestamps):
+        clock.set(timestamp)
+        response = per_frame.record_detection(detection)
+        if response.event is not None:
+            expected.append(response.event)
+
+    batched = state.StateManager(state.EventLog(tmp_path / "b.log"))
+    steps = batched.record_detections(detections, timestamps)
+    events = [step.event for step in steps if step.event is not None]
+
+    assert [(e.value, e.timestamp) for e in events] == [
+        (e.value, e.timestamp) for e in expected
+    ]
+    assert len(events) == 6
+    assert batched.summary.victories == per_frame.summary.victories == 3
+    assert batched.cooldown_state == per_frame.cooldown_state
+    # イベントと状態遷移のフレームだけが返る
+    assert len(steps) < 4 * len(events)
+    assert {step.cooldown_state for step in steps} <= {
+        "COOLDOWN",
+        "WAITING_FOR_NONE",
+        "READY",
+    }
+
+    with pytest.raises(ValueError):
+        batched.record_detections(detections, timestamps[:-1])
+
+
+def test_none_required_seconds_is_independent_of_frame_rate(tmp_path: Path) -> None:
+    clock = ManualClock(state.parse_timestamp("2025-01-01T00:00:00+00:00"))
+    manager = state.StateManager(
+        state.EventLog(tmp_path / "events.log"),
+        cooldown_seconds=10,
+        required_consecutive=1,
+        none_required_consecutive=1000,
+        none_required_seconds=3,
+        clock=clock,
+    )
+    assert manager.record_detection(DetectionResult("victory", 0.9)).event
+    clock.advance(11)
+    manager.record_detection(DetectionResult("unknown", 0.1))
+    assert manager.cooldown_state == "WAITING_FOR_NONE"
+
+    # 勝敗画面が残っていると none の継続時間は数え直し
+    clock.advance(2)
+    manager.record_detection(DetectionResult("victory", 0.9))
+    clock.advance(1)
+    manager.record_detection(DetectionResult("unknown", 0.1))
+    clock.advance(2)
+    manager.record_detection(DetectionResult("unknown", 0.1))
+    assert manager.cooldown_state == "WAITING_FOR_NONE"
+
+    # 回数は 3 回だけでも、3 秒続けば READY に戻る
+    clock.advance(1)
+    manager.record_detection(DetectionResult("unknown", 0.1))
+    assert manager.cooldown_state == "READY"
@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from victory_detector.capture import TraceRecorder, open_trace, read_traces
+from victory_detector.capture.trace import trace_files
+from victory_detector.core import replay
+
+CLASSES = ["defeat_text", "none", "victory_text"]
+OUTCOMES = ["defeat", "unknown", "victory"]
+START = 1_700_000_000_000_000
+
+
+def _record(recorder: TraceRecorder, frames: int) -> None:
+    for i in range(frames):
+        index = 2 if 50 <= i < 55 else 1
+        probabilities = [0.0, 0.0, 0.0]
+        probabilities[index] = 0.9
+        recorder.record(START + i * 100_000, index, probabilities, "READY", i % 3)
+
+
+def test_recorder_roundtrip_as_structured_array(tmp_path: Path) -> None:
+    with TraceRecorder(tmp_path, CLASSES, OUTCOMES) as recorder:
+        _record(recorder, 100)
+    assert recorder.written == 100 and recorder.dropped == 0
+
+    trace = open_trace(trace_files(tmp_path)[0])
+    assert isinstance(trace.records, np.memmap)
+    assert trace.classes == CLASSES
+    assert len(trace) == 100
+    assert trace.timestamps[1] - trace.timestamps[0] == 100_000
+    assert trace.probabilities.shape == (100, 3)
+    assert trace.records["class_index"][50] == 2
+    assert trace.records["consecutive"][:4].tolist() == [0, 1, 2, 0]
+
+    # 書き込み途中の末尾レコードは読まない
+    with trace_files(tmp_path)[0].open("ab") as fp:
+        fp.write(b"\x00" * 7)
+    assert len(open_trace(trace_files(tmp_path)[0])) == 100
+
+
+def test_recorder_rotates_and_reader_concatenates(tmp_path: Path) -> None:
+    with TraceRecorder(tmp_path, CLASSES, OUTCOMES, max_bytes=2048) as recorder:
+        _record(recorder, 100)
+    assert len(trace_files(tmp_path)) > 1
+
+    trace = read_traces(tmp_path)
+    assert len(trace) == 100
+    assert np.all(np.diff(trace.timestamps) == 100_000)
+
+    report = replay.replay(
+        trace.to_replay_trace(),
+        ground_truth=[replay.GroundTruth(START + 50 * 100_000, "victory")],
+    )
+    assert report.hits == 1
+    assert report.latencies_us == [100_000]
+
+
+def test_recorder_drops_instead_of_blocking(tmp_path: Path) -> None:
+    recorder = TraceRecorder(tmp_path, CLASSES, queue_size=4)
+    # スレッド開始前はキューが捌けないので溢れた分は捨てられる
+    _record(recorder, 10)
+    assert recorder.dropped == 6
+    recorder.start().close()
+    assert recorder.written == 4
+
+    with pytest.raises(ValueError):
+        read_traces(tmp_path / "empty")
+
+
+def test_replay_loads_binary_traces(tmp_path: Path) -> None:
+    with TraceRecorder(tmp_path, CLASSES, OUTCOMES) as recorder:
+        _record(recorder, 100)
+    from_dir = replay.load_trace(tmp_path)
+    from_file = replay.load_trace(trace_files(tmp_path)[0])
+    assert from_dir.timestamps == from_file.timestamps
+    assert [d.outcome for d in from_dir.detections[49:52]] == [
+        "unknown",
+        "victory",
+        "victory",
+    ]
@@ -0,0 +1,196 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from victory_detector.capture.vod import (
+    Sample,
+    ScanParams,
+    ShardedVodScanner,
+    ShardResult,
+    ScanStats,
+    VideoReader,
+    VodScanner,
+    feed_sample,
+    merge_shards,
+    plan_shards,
+)
+from victory_detector.core import state
+from victory_detector.core.vision import DetectionResult
+
+# 値 → 判定（1: victory, 2: defeat, それ以外: unknown）
+LABELS = {1: "victory", 2: "defeat"}
+BANNERS = [(100.0, 105.0, 1), (400.0, 404.0, 2), (700.0, 703.0, 1)]
+
+
+class FakeReader:
+    """時刻からバナーの有無を決める読み取り器（1 秒 30 フレーム相当）。"""
+
+    def __init__(self, duration: float = 900.0) -> None:
+        self.duration = duration
+        self.reads: list[float] = []
+
+    def read_at(self, seconds: float) -> np.ndarray | None:
+        if seconds >= self.duration:
+            return None
+        self.reads.append(seconds)
+        value = 0
+        for start, end, label in BANNERS:
+            if start <= seconds < end:
+                value = label
+        return np.full((1, 1, 3), value, np.uint8)
+
+
+def predict(image: np.ndarray) -> DetectionResult:
+    outcome = LABELS.get(int(image[0, 0, 0]), "unknown")
+    return DetectionResult(outcome, 0.9 if outcome != "unknown" else 0.1)
+
+
+def test_scanner_counts_banners_with_sparse_sampling(tmp_path: Path) -> None:
+    manager = state.StateManager(
+        state.EventLog(tmp_path / "events.log"),
+        cooldown_seconds=180,
+        required_consecutive=2,
+        none_required_seconds=10,
+    )
+    origin = state.parse_timestamp("2025-01-01T00:00:00+00:00")
+    reader = FakeReader()
+    scanner = VodScanner(predict, ScanParams(coarse_interval=2.0, fine_interval=0.25))
+
+    samples = list(scanner.scan(reader, state=manager, origin_us=origin, note="vod"))
+
+    events = [event for event in manager.history(100) if event.type == "result"]
+    assert [event.value for event in events] == ["victory", "defeat", "victory"]
+    # バナーの先頭から fine_interval 1 つ分（2 回連続）で確定する
+    offsets = [(event.timestamp - origin) / 1_000_000 for event in events]
+    assert offsets == [100.25, 400.25, 700.25]
+    assert all(event.note == "vod" for event in events)
+
+    # サンプルは時刻順で、クールダウン中は読まない
+    times = [sample.seconds for sample in samples]
+    assert times == sorted(times)
+    assert not any(100.25 < t < 280.25 for t in reader.reads)
+    assert scanner.stats.predicted == len(reader.reads) < 900 / 2
+    assert scanner.stats.refined_windows == 3
+    assert scanner.stats.skipped_seconds > 3 * 170
+
+
+def test_scanner_without_state_refines_every_candidate() -> None:
+    reader = FakeReader(duration=200.0)
+    scanner = VodScanner(predict, ScanParams(coarse_interval=2.0, fine_interval=0.5))
+
+    samples = list(scanner.scan(reader, start=50.0, end=150.0))
+
+    times = [sample.seconds for sample in samples]
+    assert times == sorted(times) and len(times) == len(set(times))
+    banner = [s.seconds for s in samples if s.detection.outcome == "victory"]
+    # 候補の前（粗い間隔 1 つ分）まで戻って見直すため、先頭のフレームを取りこぼさない
+    assert banner[0] == 100.0
+    assert banner == [100.0 + 0.5 * i for i in range(9)]
+
+
+def test_video_reader_seeks_and_grabs(tmp_path: Path) -> None:
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 16))
+    if not writer.isOpened():
+        pytest.skip("MJPG writer unavailable")
+    for index in range(100):
+        writer.write(np.full((16, 32, 3), index * 2, np.uint8))
+    writer.release()
+
+    with VideoReader(path, seek_seconds=2.0) as reader:
+        assert reader.duration == pytest.approx(10.0)
+        values = [reader.read_at(t) for t in (0.0, 0.5, 1.0, 6.0, 2.0)]
+        assert reader.read_at(10.0) is None
+
+    for value, index in zip(values, [0, 5, 10, 60, 20]):
+        assert abs(value.mean() - index * 2) < 3
+    assert reader.decoded == 5
+    # 近い位置は読み進め、離れた位置・後方はシークする
+    assert reader.grabbed == 4 + 4
+    assert reader.seeks == 2
+
+
+def test_plan_shards_aligns_to_coarse_grid() -> None:
+    params = ScanParams(coarse_interval=2.0, refine_after=4.0)
+
+    shards = plan_shards([("a.mkv", 45.0), ("b.mkv", 10.0)], 15.0, params)
+
+    # 区間の長さと重なり（2 + 4 = 6 秒）は粗い間隔の倍数に切り上げる
+    assert [(s.video, s.start, s.end, s.lead) for s in shards] == [
+        (0, 0.0, 16.0, 0.0),
+        (0, 16.0, 32.0, 6.0),
+        (0, 32.0, 45.0, 6.0),
+        (1, 0.0, 10.0, 0.0),
+    ]
+    with pytest.raises(ValueError):
+        plan_shards([("a.mkv", 45.0)], 0.0, params)
+
+
+def test_merge_shards_drops_overlap_per_video() -> None:
+    shards = plan_shards([("a.mkv", 8.0), ("b.mkv", 4.0)], 4.0, ScanParams(coarse_interval=1.0))
+    none = DetectionResult("none", 0.9)
+
+    def result(index: int, times: list[float]) -> ShardResult:
+        return ShardResult(shards[index], [Sample(t, none) for t in times], ScanStats())
+
+    merged = merge_shards(
+        [result(0, [0.0, 2.0, 4.5]), result(1, [1.0, 3.0, 4.5, 5.0, 7.0]), result(2, [0.0, 2.0])]
+    )
+
+    assert [(shard.video, sample.seconds) for shard, sample in merged] == [
+        (0, 0.0), (0, 2.0), (0, 4.5), (0, 5.0), (0, 7.0), (1, 0.0), (1, 2.0)
+    ]
+
+
+def write_banner_video(path: Path, banners: list[tuple[float, float, int]], seconds: int) -> bool:
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 16))
+    if not writer.isOpened():
+        return False
+    for index in range(seconds * 10):
+        value = 0
+        for start, end, label in banners:
+            if start <= index / 10 < end:
+                value = label * 100
+        writer.write(np.full((16, 32, 3), value, np.uint8))
+    writer.release()
+    return True
+
+
+def video_predict(image: np.ndarray) -> DetectionResult:
+    outcome = LABELS.get(int(round(image.mean() / 100)), "none")
+    return DetectionResult(outcome, 0.9)
+
+
+def make_video_predict():
+    return video_predict
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sharded_scanner_counts_banners_across_shard_edges(tmp_path: Path, workers: int) -> None:
+    # 2 つ目のバナーは区間の境目（20 秒）をまたぐ
+    banners = [(5.0, 9.0, 1), (18.5, 22.5, 2), (50.0, 54.0, 1)]
+    path = tmp_path / "vod.avi"
+    if not write_banner_video(path, banners, 60):
+        pytest.skip("MJPG writer unavailable")
+    manager = state.StateManager(
+        state.EventLog(tmp_path / "events.log"),
+        cooldown_seconds=5,
+        required_consecutive=2,
+        none_required_seconds=2,
+    )
+    params = ScanParams(coarse_interval=2.0, fine_interval=0.5, refine_after=3.0)
+    scanner = ShardedVodScanner(make_video_predict, params, workers=workers, shard_seconds=20.0)
+
+    merged = list(scanner.scan([(path, 60.0)]))
+    for _, sample in merged:
+        feed_sample(manager, sample, 0, note="vod")
+
+    times = [sample.seconds for _, sample in merged]
+    assert times == sorted(times) and len(times) == len(set(times))
+    events = [event for event in manager.history(100) if event.type == "result"]
+    assert [event.value for event in events] == ["victory", "defeat", "victory"]
+    assert [event.timestamp / 1_000_000 for event in events] == [5.5, 19.0, 50.5]
+    assert scanner.stats.video_seconds == pytest.approx(60.0)
+    assert scanner.stats.predicted > len(times)
@@ -0,0 +1,117 @@
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from victory_detector.core.templates import TemplateMatcher
+from victory_detector.core.watch import DirectoryWatcher, ProcessedFiles
+
+
+class Collector:
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        self.changed = threading.Condition()
+
+    def __call__(self, paths: list[Path]) -> None:
+        with self.changed:
+            self.names.extend(path.name for path in paths)
+            self.changed.notify_all()
+
+    def wait_for(self, count: int, timeout: float = 2.0) -> list[str]:
+        with self.changed:
+            self.changed.wait_for(lambda: len(self.names) >= count, timeout)
+            return list(self.names)
+
+
+def test_processed_files_persist(tmp_path: Path) -> None:
+    path = tmp_path / "state" / "processed.txt"
+    processed = ProcessedFiles(path)
+    processed.add(["a.png", "b.png"])
+    processed.add(["a.png"])
+
+    reloaded = ProcessedFiles(path)
+    assert "a.png" in reloaded and "b.png" in reloaded and "c.png" not in reloaded
+    assert len(reloaded) == 2
+    assert path.read_text().splitlines() == ["a.png", "b.png"]
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_directory_watcher_reports_only_new_files(
+    tmp_path: Path, use_inotify: bool
+) -> None:
+    capture_dir = tmp_path / "captures"
+    capture_dir.mkdir()
+    (capture_dir / "old.png").write_bytes(b"old")
+    (capture_dir / "done.png").write_bytes(b"done")
+    (capture_dir / "notes.txt").write_text("ignored")
+    processed = ProcessedFiles(tmp_path / "processed.txt")
+    processed.add(["done.png"])
+    collector = Collector()
+
+    watcher = DirectoryWatcher(
+        capture_dir,
+        collector,
+        pattern="*.png",
+        processed=processed,
+        rescan_interval=0.05,
+        use_inotify=use_inotify,
+    )
+    with watcher:
+        # 起動時に未処理の既存ファイルを渡す
+        assert collector.wait_for(1) == ["old.png"]
+        (capture_dir / "new.png").write_bytes(b"new")
+        # 別名で書いてから移動してきたファイルも拾う
+        (capture_dir / "moved.tmp").write_bytes(b"moved")
+        (capture_dir / "moved.tmp").rename(capture_dir / "moved.png")
+        names = collector.wait_for(3)
+        if not use_inotify:
+            assert watcher.backend == "polling"
+        time.sleep(0.2)
+
+    assert sorted(names) == ["moved.png", "new.png", "old.png"]
+    assert collector.names == names
+    reloaded = ProcessedFiles(tmp_path / "processed.txt")
+    assert len(reloaded) == 4
+    assert all(name in reloaded for name in ["done.png", "old.png", "new.png", "moved.png"])
+
+
+def test_template_matcher_finds_banner(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    banner = (rng.random((6, 16)) > 0.5).astype(np.uint8) * 255
+    banner = cv2.resize(banner, (128, 48), interpolation=cv2.INTER_NEAREST)
+    template_dir = tmp_path / "victory" / "default"
+    template_dir.mkdir(parents=True)
+    cv2.imwrite(str(template_dir / "banner.png"), cv2.cvtColor(banner, cv2.COLOR_GRAY2BGR))
+
+    matcher = TemplateMatcher(tmp_path, threshold=0.8, crop_region=None)
+    frame = np.zeros((120, 200, 3), np.uint8)
+    frame[40:88, 50:178] = banner[..., None]
+
+    detection = matcher.predict(frame)
+    assert detection.outcome == "victory" and detection.confidence > 0.9
+    assert matcher.predict(np.zeros((120, 200, 3), np.uint8)).outcome == "unknown"
+    with pytest.raises(ValueError):
+        TemplateMatcher(tmp_path / "missing")
+
+
+def test_template_matcher_scans_templates_smaller_than_crop(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    banner = (rng.random((6, 16)) > 0.5).astype(np.uint8) * 255
+    banner = cv2.resize(banner, (320, 120), interpolation=cv2.INTER_NEAREST)
+    template_dir = tmp_path / "defeat" / "default"
+    template_dir.mkdir(parents=True)
+    cv2.imwrite(str(template_dir / "banner.png"), cv2.cvtColor(banner, cv2.COLOR_GRAY2BGR))
+
+    # 既定のクロップ（995x550）より小さいテンプレートは変形せずにクロップ内を走査する。
+    # poc_detect.py のようにクロップの大きさへ変形すると類似度は 0 を下回る
+    matcher = TemplateMatcher(tmp_path, threshold=0.8)
+    frame = np.zeros((1080, 1920, 3), np.uint8)
+    frame[600:720, 800:1120] = banner[..., None]
+
+    template, score = matcher.match(frame)
+    assert template is not None and template.image.shape == (120, 320)
+    assert score == pytest.approx(0.9988, abs=1e-3)
+    assert matcher.predict(frame).outcome == "defeat"